@@ -0,0 +1,195 @@
+from __future__ import division
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import time
+import numpy as np
+import sys
+sys.path.append('../')
+from engine.bvh import BVH
+from engine.wavefront import PackedScene, trace_paths, scatter
+import scenes
+
+
+# standard scenes, as functions of the image dimensions
+STANDARD_SCENES = {
+    'simple_sphere':      scenes.simple_sphere,
+    'metal_spheres':      scenes.metal_spheres,
+    'dielectric_spheres': scenes.dielectric_spheres,
+    'depth_of_field':     scenes.depth_of_field,
+    'random_scene':       scenes.random_scene,
+}
+
+
+class CountingGeometry(object):
+    """
+    Wrapper of a scene geometry counting the rays passed to batched intersection queries.
+    """
+
+    def __init__(self, geometry):
+        self._geometry = geometry
+        self.materials = geometry.materials
+        self.material_index = geometry.material_index
+        self.num_rays = 0
+
+    def hit_batch(self, origins, directions, t_min, t_max):
+        self.num_rays += len(origins)
+        return self._geometry.hit_batch(origins, directions, t_min, t_max)
+
+    def normals(self, index, points):
+        return self._geometry.normals(index, points)
+
+
+def best_time(func, repeat):
+    """Minimum wall-clock time of `repeat` invocations of `func`, together with the last return value."""
+    tbest = np.inf
+    for _ in range(repeat):
+        tstart = time.perf_counter()
+        result = func()
+        tbest = min(tbest, time.perf_counter() - tstart)
+    return (tbest, result)
+
+
+def benchmark_scene(scene, camera, nx, ny, ns, accelerate, repeat, seed=42):
+    """
+    Measure the throughput of the individual rendering stages for a scene.
+
+    Returns:
+        dict: throughput of primary ray generation, intersection and scattering (rays/second),
+              and of full rendering (rays/second and samples/second)
+    """
+    geometry = BVH(scene) if accelerate else scene.compile()
+    packed = PackedScene(geometry)
+    nrays = nx * ny * ns
+
+    # primary ray generation
+    t, (origins, directions) = best_time(
+        lambda: camera.get_pixel_rays(nx, ny, ns, np.random.default_rng(seed)), repeat)
+    result = {'primary_rays_per_second': nrays / t}
+
+    # closest-hit queries of primary rays, within the ray parameter interval of the renderer
+    precision = packed.precision
+    t, (index, tpar) = best_time(lambda: geometry.hit_batch(origins, directions, precision.t_min, precision.t_max), repeat)
+    result['intersection_rays_per_second'] = nrays / t
+
+    # scattering at primary hit points
+    hit = index >= 0
+    if np.any(hit):
+        points = origins[hit] + tpar[hit, None]*directions[hit]
+        normals = geometry.normals(index[hit], points)
+        mat = geometry.material_index[index[hit]]
+        t, _ = best_time(lambda: scatter(packed, mat, directions[hit], points, normals, np.random.default_rng(seed)), repeat)
+        result['scatter_rays_per_second'] = np.count_nonzero(hit) / t
+
+    # full path tracing, counting all traced rays including secondary bounces
+    counting = CountingGeometry(geometry)
+    counting_packed = PackedScene(counting)
+    t, _ = best_time(lambda: trace_paths(origins, directions, counting_packed, 50, np.random.default_rng(seed)), repeat)
+    result['render_rays_per_second'] = counting.num_rays / repeat / t
+    result['render_samples_per_second'] = nrays / t
+    return result
+
+
+def run_benchmarks(quick=False, repeat=3):
+    """
+    Run the benchmark suite.
+
+    Returns:
+        dict: results per scene
+    """
+    nx, ny, ns = (40, 20, 2) if quick else (100, 50, 4)
+    results = {}
+    for name, make_scene in STANDARD_SCENES.items():
+        scene, camera = make_scene(nx, ny)
+        results[name] = benchmark_scene(scene, camera, nx, ny, ns, accelerate=False, repeat=repeat)
+        print_result(name, results[name])
+    for n in ([1000, 10000] if quick else [1000, 10000, 100000]):
+        scene, camera = scenes.synthetic_scene(n, nx, ny)
+        name = 'spheres_{}'.format(n)
+        results[name] = benchmark_scene(scene, camera, nx, ny, ns, accelerate=True, repeat=repeat)
+        print_result(name, results[name])
+    return results
+
+
+def print_result(name, result):
+    print('{:<20}'.format(name) + ' '.join('{}: {:.3g}'.format(k, v) for k, v in result.items()))
+
+
+def find_regressions(results, baseline, threshold):
+    """
+    Compare throughput results with a baseline.
+
+    Returns:
+        list: tuples `(scene, metric, value, baseline value)` of metrics
+              which dropped by more than the relative `threshold`
+    """
+    regressions = []
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            ref = baseline.get(name, {}).get(metric)
+            if ref is not None and value < (1 - threshold) * ref:
+                regressions.append((name, metric, value, ref))
+    return regressions
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Benchmark the ray tracing engine.')
+    parser.add_argument('--quick', action='store_true', help='use smaller images and scenes')
+    parser.add_argument('--repeat', type=int, default=3, help='number of repetitions per measurement')
+    parser.add_argument('--history', default='benchmark_history.json', help='JSON file collecting all runs')
+    parser.add_argument('--baseline', default='benchmark_baseline.json', help='JSON file with baseline results')
+    parser.add_argument('--save-baseline', action='store_true', help='store the results as new baseline')
+    parser.add_argument('--threshold', type=float, default=0.2, help='relative throughput drop flagged as regression')
+    args = parser.parse_args()
+
+    results = run_benchmarks(quick=args.quick, repeat=args.repeat)
+    record = {
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'quick': args.quick,
+        'results': results,
+    }
+
+    history = []
+    if os.path.exists(args.history):
+        with open(args.history) as f:
+            history = json.load(f)
+    history.append(record)
+    with open(args.history, 'w') as f:
+        json.dump(history, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(record, f, indent=2)
+        print('saved baseline to {}'.format(args.baseline))
+        return
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get('quick') != args.quick:
+            print('baseline was recorded with different settings, skipping comparison')
+            return
+        regressions = find_regressions(results, baseline['results'], args.threshold)
+        for name, metric, value, ref in regressions:
+            print('REGRESSION {} {}: {:.3g} (baseline {:.3g})'.format(name, metric, value, ref))
+        if regressions:
+            sys.exit(1)
+        print('no regressions compared to baseline')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+from __future__ import division
+import time
+import numpy as np
+import sys
+sys.path.append('../')
+from engine.bvh import BVH
+from engine.precision import FLOAT64
+from scenes import random_sphere_field
+
+
+def main():
+
+    rng = np.random.default_rng(42)
+
+    # number of rays per query batch
+    nrays = 4096
+
+    print('{:>8} | {:>10} | {:>6} | {:>6} | {:>14} | {:>14} | {:>8}'.format(
+        'spheres', 'build (s)', 'nodes', 'depth', 'linear (ray/s)', 'BVH (ray/s)', 'speedup'))
+    for n in [100, 1000, 10000, 100000]:
+        scene = random_sphere_field(n, rng)
+        compiled = scene.compile()
+        bvh = BVH(compiled)
+
+        # rays originating above the scene, pointing downwards
+        extent = 2*np.sqrt(n)
+        origins = np.tile(np.array([0., 0.2*extent, extent]), (nrays, 1))
+        directions = np.column_stack((extent*(rng.random(nrays) - 0.5), -0.2*extent*np.ones(nrays), -extent*rng.random(nrays)))
+
+        tstart = time.perf_counter()
+        index_lin, _ = compiled.hit_batch(origins, directions, FLOAT64.t_min, FLOAT64.t_max)
+        time_lin = time.perf_counter() - tstart
+
+        bvh.reset_query_stats()
+        index_bvh, _ = bvh.hit_batch(origins, directions, FLOAT64.t_min, FLOAT64.t_max)
+        time_bvh = bvh.query_stats['query_time']
+        assert np.array_equal(index_lin, index_bvh), 'BVH and linear assembly must report the same closest hits'
+
+        print('{:>8} | {:>10.3f} | {:>6} | {:>6} | {:>14.0f} | {:>14.0f} | {:>7.1f}x'.format(
+            n, bvh.build_stats['build_time'], bvh.build_stats['num_nodes'], bvh.build_stats['max_depth'],
+            nrays / time_lin, nrays / time_bvh, time_lin / time_bvh))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+from __future__ import division
+import argparse
+import json
+import os
+import subprocess
+import tempfile
+import time
+import sys
+sys.path.append('../')
+from engine.service import scene_spec
+import scenes
+
+
+# standalone script rendering one job and storing the image, as the example scripts do
+_SCRIPT = """
+import json, sys
+import numpy as np
+sys.path.append({root!r})
+from engine.service import scene_from_spec, camera_from_spec
+from engine.wavefront import render_image_wavefront
+spec = json.loads(sys.stdin.read())
+cam = camera_from_spec(spec['camera'], spec['nx'] / spec['ny'])
+im = render_image_wavefront(spec['nx'], spec['ny'], spec['ns'], scene_from_spec(spec['scene']), cam, max_depth=spec['max_depth'])
+np.save(sys.argv[1], im)
+"""
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Compare rendering thumbnails with one Python process per job and with a single raytrace invocation.')
+    parser.add_argument('--jobs', type=int, default=32, help='number of thumbnails')
+    parser.add_argument('--workers', type=int, default=1, help='number of worker processes of the raytrace command')
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    scene, _ = scenes.dielectric_spheres(32, 16)
+    spec = {'nx': 32, 'ny': 16, 'ns': 4, 'scene': scene_spec(scene), 'max_depth': 10, 'tile_size': 16,
+            'camera': {'lookfrom': [0., 0., 0.], 'lookat': [0., 0., -1.], 'vfov': 1.57, 'aperture': 0., 'focus_dist': 1.}}
+    jobs = [dict(spec, seed=k) for k in range(args.jobs)]
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        # one Python process per job
+        script = _SCRIPT.format(root=root)
+        tstart = time.perf_counter()
+        for k, job in enumerate(jobs):
+            subprocess.run([sys.executable, '-c', script, os.path.join(tmpdir, 'job_{:03d}.npy'.format(k))],
+                           input=json.dumps(job).encode('utf-8'), check=True)
+        tprocess = time.perf_counter() - tstart
+
+        # all jobs rendered by a single command
+        jobs_path = os.path.join(tmpdir, 'jobs.json')
+        with open(jobs_path, 'w') as f:
+            json.dump(jobs, f)
+        env = dict(os.environ, PYTHONPATH=root)
+        tstart = time.perf_counter()
+        subprocess.run([sys.executable, '-m', 'engine.cli', jobs_path, '--format', 'npy', '--workers', str(args.workers),
+                        '--output-dir', os.path.join(tmpdir, 'cli')], env=env, check=True, stdout=subprocess.DEVNULL)
+        tcli = time.perf_counter() - tstart
+
+    print('{} thumbnails of {}x{} pixels, {} samples per pixel'.format(args.jobs, spec['nx'], spec['ny'], spec['ns']))
+    print('process per job: {:.2f} s ({:.0f} ms per job)'.format(tprocess, 1000 * tprocess / args.jobs))
+    print('raytrace:        {:.2f} s ({:.0f} ms per job)'.format(tcli, 1000 * tcli / args.jobs))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+from __future__ import division
+import argparse
+import time
+import numpy as np
+import sys
+sys.path.append('../')
+from engine.wavefront import PackedScene
+from engine.samplers import SobolSampler
+from engine.denoise import render_buffers, denoise
+import scenes
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Compare the error of denoised low-sample renderings with plain renderings.')
+    parser.add_argument('--ns-ref', type=int, default=1024, help='number of samples per pixel of the reference image')
+    parser.add_argument('--max-depth', type=int, default=10, help='maximum number of bounces')
+    args = parser.parse_args()
+
+    nx, ny = 200, 100
+    for name in ['simple_sphere', 'metal_spheres', 'dielectric_spheres', 'depth_of_field']:
+        scene, camera = getattr(scenes, name)(nx, ny)
+        packed = PackedScene(scene)
+        ref, _ = render_buffers(nx, ny, args.ns_ref, packed, camera, max_depth=args.max_depth, sampler=SobolSampler(12345))
+        print('{}: RMSE of the gamma-corrected image compared to {} samples per pixel'.format(name, args.ns_ref))
+        print('{:>6}{:>12}{:>12}{:>12}{:>12}'.format('ns', 'noisy', 'denoised', 'render (s)', 'denoise (s)'))
+        for ns in [1, 4, 16, 64]:
+            rng = np.random.default_rng(42)
+            tstart = time.perf_counter()
+            col, aov = render_buffers(nx, ny, ns, packed, camera, max_depth=args.max_depth, rng=rng)
+            trender = time.perf_counter() - tstart
+            tstart = time.perf_counter()
+            filtered = denoise(col, aov['albedo'], aov['normal'], aov['depth'], aov['variance'] if ns > 1 else None)
+            tdenoise = time.perf_counter() - tstart
+            print('{:>6}{:>12.4f}{:>12.4f}{:>12.2f}{:>12.2f}'.format(ns, _rmse(col, ref), _rmse(filtered, ref), trender, tdenoise))
+
+
+def _rmse(col, ref):
+    # compare gamma-corrected values, as in the final image
+    return np.sqrt(np.mean((np.sqrt(np.clip(col, 0, 1)) - np.sqrt(np.clip(ref, 0, 1)))**2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+from __future__ import division
+import time
+import numpy as np
+import sys
+sys.path.append('../')
+from engine.surface import SurfaceAssembly, Plane
+from engine.material import Lambertian
+from engine.bvh import BVH
+from engine.precision import FLOAT64
+from engine.wavefront import render_image_wavefront
+import scenes
+
+
+def with_plane_floor(scene):
+    """Copy of the random scene with the large ground sphere replaced by an infinite plane."""
+    edited = SurfaceAssembly()
+    for obj in scene._objects[:-1]:
+        edited.add_object(obj)
+    edited.add_object(Plane(np.zeros(3), np.array([0., 1., 0.]), Lambertian(np.array([0.5, 0.5, 0.5]))))
+    return edited
+
+
+def main():
+
+    nx, ny, ns = 200, 100, 4
+    scene, camera = scenes.random_scene(nx, ny)
+    rng = np.random.default_rng(1)
+    # rays from the camera towards the ground
+    origins = np.tile(camera._origin, (100000, 1))
+    targets = np.column_stack((rng.uniform(-50, 50, 100000), np.zeros(100000), rng.uniform(-50, 50, 100000)))
+    directions = targets - origins
+    print('random scene, {}x{} pixels, {} samples per pixel'.format(nx, ny, ns))
+    for name, floor_scene in [('sphere floor', scene), ('plane floor', with_plane_floor(scene))]:
+        bvh = BVH(floor_scene)
+        tstart = time.perf_counter()
+        render_image_wavefront(nx, ny, ns, bvh, camera, max_depth=10, rng=np.random.default_rng(42))
+        trender = time.perf_counter() - tstart
+        index, t = bvh.hit_batch(origins, directions, FLOAT64.t_min, FLOAT64.t_max)
+        ground = index == len(bvh) - 1
+        points = origins[ground] + t[ground, None]*directions[ground]
+        # distance of the hit points from the ground surface
+        if name == 'sphere floor':
+            error = np.abs(np.linalg.norm(points - np.array([0., -1000., 0.]), axis=1) - 1000.)
+        else:
+            error = np.abs(points[:, 1])
+        print('{}: render {:.2f} s, hit point distance from surface max {:.2e}, mean {:.2e}'.format(
+            name, trender, np.max(error), np.mean(error)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+from __future__ import division
+import time
+import numpy as np
+import sys
+sys.path.append('../')
+from engine.surface import SurfaceAssembly, Sphere
+from engine.material import Lambertian
+from engine.incremental import IncrementalRenderer
+import scenes
+
+
+def main():
+
+    nx, ny, ns = 200, 100, 4
+    scene, camera = scenes.random_scene(nx, ny)
+    objects = list(scene._objects)
+    tstart = time.perf_counter()
+    renderer = IncrementalRenderer(nx, ny, ns, scene, camera, max_depth=10, accelerate=True)
+    print('random scene ({} spheres), {}x{} pixels, {} samples per pixel'.format(len(objects), nx, ny, ns))
+    print('complete rendering: {:.2f} s'.format(time.perf_counter() - tstart))
+
+    # small sphere in the foreground
+    k = min(range(3, len(objects) - 1), key=lambda k: np.linalg.norm(objects[k].center - np.array([8., 0., 2.])))
+    edits = [
+        ('re-color', Sphere(objects[k].center, objects[k].radius, Lambertian(np.array([0.9, 0.1, 0.1])))),
+        ('move',     Sphere(objects[k].center + np.array([0., 0., 0.5]), objects[k].radius, Lambertian(np.array([0.9, 0.1, 0.1])))),
+    ]
+    for name, sphere in edits:
+        objects[k] = sphere
+        edited = SurfaceAssembly()
+        for obj in objects:
+            edited.add_object(obj)
+        report = renderer.update(edited, [k])
+        print('{}: {}'.format(name, report))
+
+
+if __name__ == '__main__':
+    main()
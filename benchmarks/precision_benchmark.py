@@ -0,0 +1,45 @@
+from __future__ import division
+import time
+import tracemalloc
+import numpy as np
+import sys
+sys.path.append('../')
+from engine.bvh import BVH
+from engine.wavefront import PackedScene, render_image_wavefront, render_tile
+from engine.samplers import IndependentSampler
+import scenes
+
+
+def tile_memory(packed, camera, nx, ny, ns, tile_size, max_depth):
+    """Peak memory allocated by the arrays of a single image tile (bytes)."""
+    rng = IndependentSampler(0).tile_samples(0, tile_size, 0, tile_size, ny, ns)
+    tracemalloc.start()
+    render_tile(0, tile_size, 0, tile_size, nx, ny, ns, packed, camera, max_depth, rng)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+
+    nx, ny, ns, max_depth = 200, 100, 16, 10
+    print('{}x{} pixels, {} samples per pixel, same samples for both precisions'.format(nx, ny, ns))
+    for name in ['random_scene', 'depth_of_field', 'dielectric_spheres']:
+        scene, camera = getattr(scenes, name)(nx, ny)
+        bvh = BVH(scene)
+        images = {}
+        for precision in ['float64', 'float32']:
+            packed = PackedScene(bvh, precision)
+            memory = tile_memory(packed, camera, nx, ny, ns, 32, max_depth)
+            tstart = time.perf_counter()
+            images[precision] = render_image_wavefront(nx, ny, ns, packed, camera, max_depth=max_depth, sampler=IndependentSampler(1))
+            trender = time.perf_counter() - tstart
+            print('{} {}: render {:.2f} s ({:.0f} samples/s), peak memory per 32x32 tile {:.1f} MB'.format(
+                name, precision, trender, nx*ny*ns / trender, memory / 2**20))
+        diff = images['float32'].astype(float) - images['float64'].astype(float)
+        print('{} float32 vs float64: RMSE {:.3f} (8-bit values), differing pixels {:.2f}%, max difference {:.0f}'.format(
+            name, np.sqrt(np.mean(diff**2)), 100*np.mean(np.any(diff != 0, axis=2)), np.max(np.abs(diff))))
+
+
+if __name__ == '__main__':
+    main()
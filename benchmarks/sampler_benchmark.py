@@ -0,0 +1,46 @@
+from __future__ import division
+import argparse
+import numpy as np
+import sys
+sys.path.append('../')
+from engine.wavefront import PackedScene, render_tile
+from engine.samplers import IndependentSampler, StratifiedSampler, HaltonSampler, SobolSampler
+import scenes
+
+
+def render_radiance(nx, ny, ns, packed, camera, sampler, max_depth):
+    """Averaged radiance of shape `(nx, ny, 3)` using the samples of `sampler`."""
+    return render_tile(0, nx, 0, ny, nx, ny, ns, packed, camera, max_depth, sampler.tile_samples(0, nx, 0, ny, ny, ns))
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Compare the rendering error of the sampling strategies.')
+    parser.add_argument('--ns-ref', type=int, default=4096, help='number of samples per pixel of the reference image')
+    parser.add_argument('--seeds', type=int, default=4, help='number of seeds to average the error over')
+    args = parser.parse_args()
+
+    nx, ny, max_depth = 40, 20, 10
+    samplers = [
+        ('independent', lambda ns, seed: IndependentSampler(seed)),
+        ('stratified',  lambda ns, seed: StratifiedSampler(ns, seed)),
+        ('halton',      lambda ns, seed: HaltonSampler(seed)),
+        ('sobol',       lambda ns, seed: SobolSampler(seed)),
+    ]
+    for name in ['simple_sphere', 'depth_of_field', 'dielectric_spheres']:
+        scene, camera = getattr(scenes, name)(nx, ny)
+        packed = PackedScene(scene)
+        ref = render_radiance(nx, ny, args.ns_ref, packed, camera, SobolSampler(12345), max_depth)
+        print('{}: RMSE of the radiance compared to {} samples per pixel'.format(name, args.ns_ref))
+        print('{:<12}'.format('ns') + ''.join('{:>12}'.format(s) for s, _ in samplers))
+        for ns in [4, 16, 64]:
+            rmse = []
+            for _, make_sampler in samplers:
+                err = [np.sqrt(np.mean((render_radiance(nx, ny, ns, packed, camera, make_sampler(ns, seed), max_depth) - ref)**2))
+                       for seed in range(args.seeds)]
+                rmse.append(np.mean(err))
+            print('{:<12}'.format(ns) + ''.join('{:>12.4f}'.format(e) for e in rmse))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+from __future__ import division
+import argparse
+import time
+import sys
+sys.path.append('../')
+from engine import sampling
+from engine import utils
+from engine.rendering import render_image
+import scenes
+
+
+def time_per_ray(nx, ny, ns, scene, camera, repeat, **kwargs):
+    """Minimum time of `repeat` renderings via `render_image`, per camera ray (seconds)."""
+    tbest = float('inf')
+    for _ in range(repeat):
+        sampling.seed(42)
+        tstart = time.perf_counter()
+        render_image(nx, ny, ns, scene, camera, **kwargs)
+        tbest = min(tbest, time.perf_counter() - tstart)
+    return tbest / (nx * ny * ns)
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Benchmark the per-ray cost of the scalar ray tracing path.')
+    parser.add_argument('--repeat', type=int, default=3, help='number of repetitions per measurement')
+    args = parser.parse_args()
+
+    nx, ny, ns = 40, 20, 2
+    print('{:<20} {:>16} {:>16} {:>16} {:>8}'.format('scene', 'default (us/ray)', 'no checks', 'release', 'speedup'))
+    for name in ['simple_sphere', 'metal_spheres', 'dielectric_spheres', 'depth_of_field', 'random_scene']:
+        scene, camera = getattr(scenes, name)(nx, ny)
+        # the random scene is expensive in the default path
+        m = 4 if name == 'random_scene' else 1
+        utils.debug = True
+        t_default = time_per_ray(nx // m, ny // m, ns, scene, camera, args.repeat)
+        utils.debug = False
+        t_nocheck = time_per_ray(nx // m, ny // m, ns, scene, camera, args.repeat)
+        utils.debug = True
+        t_release = time_per_ray(nx // m, ny // m, ns, scene, camera, args.repeat, backend='release')
+        print('{:<20} {:>16.1f} {:>16.1f} {:>16.1f} {:>7.1f}x'.format(
+            name, 1e6*t_default, 1e6*t_nocheck, 1e6*t_release, t_default / t_release))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+from __future__ import division
+import numpy as np
+import sys
+sys.path.append('../')
+from engine.surface import SurfaceAssembly, Sphere
+from engine.material import Lambertian, Metal, Dielectric
+from engine.camera import Camera
+
+
+def simple_sphere(nx, ny):
+    """Scene of `examples/simple_sphere.py`."""
+    cam = Camera(np.zeros(3), np.array([0., 0., -1.]), np.array([0., 1., 0.]), np.pi/2, nx / ny, 0., 1.)
+    mat = Lambertian(0.5)
+    scene = SurfaceAssembly()
+    scene.add_object(Sphere(np.array([0.,    0.,  -1.]), 0.5, mat))
+    scene.add_object(Sphere(np.array([0., -100.5, -1.]), 100, mat))
+    return (scene, cam)
+
+
+def metal_spheres(nx, ny):
+    """Scene of `examples/metal_spheres.py`."""
+    cam = Camera(np.zeros(3), np.array([0., 0., -1.]), np.array([0., 1., 0.]), np.pi/2, nx / ny, 0., 1.)
+    scene = SurfaceAssembly()
+    scene.add_object(Sphere(np.array([ 0., 0., -1.]), 0.5, Lambertian(np.array([0.8, 0.3, 0.3]))))
+    scene.add_object(Sphere(np.array([ 1., 0., -1.]), 0.5, Metal(np.array([0.8, 0.6, 0.2]), 1.0)))
+    scene.add_object(Sphere(np.array([-1., 0., -1.]), 0.5, Metal(np.array([0.8, 0.8, 0.8]), 0.3)))
+    scene.add_object(Sphere(np.array([0., -100.5, -1.]), 100., Lambertian(np.array([0.8, 0.8, 0.0]))))
+    return (scene, cam)
+
+
+def dielectric_spheres(nx, ny):
+    """Scene of `examples/dielectric_spheres.py`."""
+    cam = Camera(np.zeros(3), np.array([0., 0., -1.]), np.array([0., 1., 0.]), np.pi/2, nx / ny, 0., 1.)
+    scene = SurfaceAssembly()
+    scene.add_object(Sphere(np.array([ 0., 0., -1.]), 0.5, Lambertian(np.array([0.1, 0.2, 0.5]))))
+    scene.add_object(Sphere(np.array([ 1., 0., -1.]), 0.5, Metal(np.array([0.8, 0.6, 0.2]), 1.0)))
+    scene.add_object(Sphere(np.array([-1., 0., -1.]),  0.5,  Dielectric(1.5)))
+    scene.add_object(Sphere(np.array([-1., 0., -1.]), -0.45, Dielectric(1.5)))
+    scene.add_object(Sphere(np.array([0., -100.5, -1.]), 100., Lambertian(np.array([0.8, 0.8, 0.0]))))
+    return (scene, cam)
+
+
+def depth_of_field(nx, ny):
+    """Scene of `examples/depth_of_field.py`."""
+    lookfrom = np.array([-3., 3., 3.])
+    lookat = np.array([0., 0., 0.])
+    focus_dist = np.linalg.norm(lookat - lookfrom)
+    cam = Camera(lookfrom, lookat, np.array([0., 1., 0.]), np.pi/9, nx / ny, 1., focus_dist)
+    scene = SurfaceAssembly()
+    scene.add_object(Sphere(np.array([ 0., 0., 0.]), 0.5, Lambertian(np.array([0.1, 0.2, 0.5]))))
+    scene.add_object(Sphere(np.array([ 1., 0., 0.]), 0.5, Metal(np.array([0.8, 0.6, 0.2]), 1.0)))
+    scene.add_object(Sphere(np.array([-1., 0., 0.]),  0.5,  Dielectric(1.5)))
+    scene.add_object(Sphere(np.array([-1., 0., 0.]), -0.45, Dielectric(1.5)))
+    scene.add_object(Sphere(np.array([0., -100.5, 0.]), 100., Lambertian(np.array([0.8, 0.8, 0.0]))))
+    return (scene, cam)
+
+
+def random_scene(nx, ny, rng=None):
+    """Scene of `examples/random_scene.py`, with reproducible random spheres."""
+    if rng is None:
+        rng = np.random.default_rng(42)
+    cam = Camera(np.array([13., 2., 3.]), np.zeros(3), np.array([0., 1., 0.]), np.pi/9, nx / ny, 0.1, 10.0)
+    scene = SurfaceAssembly()
+    scene.add_object(Sphere(np.array([ 4., 1., 0.]), 1.0, Metal(np.array([0.7, 0.6, 0.5]), 0.)))
+    scene.add_object(Sphere(np.array([ 0., 1., 0.]), 1.0, Dielectric(1.5)))
+    scene.add_object(Sphere(np.array([-4., 1., 0.]), 1.0, Lambertian(np.array([0.4, 0.2, 0.1]))))
+    for a in range(-11, 12):
+        for b in range(-11, 12):
+            center = np.array([a + 0.9*rng.random(), 0.2 + 0.1*rng.random(), b + 0.9*rng.random()])
+            choose_mat = rng.choice(3, p=[0.8, 0.15, 0.05])
+            if choose_mat == 0:
+                scene.add_object(Sphere(center, 0.2, Lambertian(rng.triangular(0., 0.2, 1., size=3))))
+            elif choose_mat == 1:
+                scene.add_object(Sphere(center, 0.2, Metal(0.5*(1 + rng.random(3)), 0.5*rng.random())))
+            else:
+                scene.add_object(Sphere(center, 0.2, Dielectric(1.5)))
+    scene.add_object(Sphere(np.array([0., -1000., 0.]), 1000., Lambertian(np.array([0.5, 0.5, 0.5]))))
+    return (scene, cam)
+
+
+def random_sphere_field(n, rng=None):
+    """
+    Scene consisting of `n` small spheres scattered above the ground,
+    with extent growing with the number of spheres.
+    """
+    if rng is None:
+        rng = np.random.default_rng(42)
+    mats = [Lambertian(np.array([0.5, 0.5, 0.5])), Metal(np.array([0.8, 0.8, 0.8]), 0.2), Dielectric(1.5)]
+    extent = 2*np.sqrt(n)
+    scene = SurfaceAssembly()
+    for _ in range(n):
+        center = np.array([extent*(rng.random() - 0.5), 0.2 + 0.1*rng.random(), extent*(rng.random() - 0.5)])
+        scene.add_object(Sphere(center, 0.2, mats[rng.choice(3, p=[0.8, 0.15, 0.05])]))
+    return scene
+
+
+def synthetic_scene(n, nx, ny, rng=None):
+    """
+    Random sphere field with `n` spheres on a large ground sphere,
+    viewed from above at an angle.
+    """
+    scene = random_sphere_field(n, rng)
+    scene.add_object(Sphere(np.array([0., -1e4, 0.]), 1e4, Lambertian(np.array([0.5, 0.5, 0.5]))))
+    extent = 2*np.sqrt(n)
+    cam = Camera(np.array([0., 0.15*extent + 2, 0.6*extent]), np.zeros(3), np.array([0., 1., 0.]),
+                 np.pi/4, nx / ny, 0., 1.)
+    return (scene, cam)
@@ -0,0 +1,67 @@
+from __future__ import division
+import argparse
+import asyncio
+import json
+import subprocess
+import time
+import sys
+sys.path.append('../')
+from engine.service import RenderService, RenderClient, scene_spec
+import scenes
+
+
+# standalone script rendering one job, as launched per job without the service
+_SCRIPT = """
+import json, sys
+sys.path.append('../')
+from engine.service import scene_from_spec, camera_from_spec
+from engine.wavefront import render_image_wavefront
+spec = json.loads(sys.stdin.read())
+cam = camera_from_spec(spec['camera'], spec['nx'] / spec['ny'])
+render_image_wavefront(spec['nx'], spec['ny'], spec['ns'], scene_from_spec(spec['scene']), cam, max_depth=spec['max_depth'])
+"""
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Compare rendering thumbnails via the render service with one process per job.')
+    parser.add_argument('--jobs', type=int, default=32, help='number of thumbnails')
+    parser.add_argument('--workers', type=int, default=4, help='number of worker processes and concurrent processes')
+    args = parser.parse_args()
+
+    scene, _ = scenes.dielectric_spheres(32, 16)
+    spec = {'nx': 32, 'ny': 16, 'ns': 4, 'scene': scene_spec(scene), 'max_depth': 10, 'tile_size': 16,
+            'camera': {'lookfrom': [0., 0., 0.], 'lookat': [0., 0., -1.], 'vfov': 1.57, 'aperture': 0., 'focus_dist': 1.}}
+    jobs = [dict(spec, seed=k) for k in range(args.jobs)]
+
+    # one Python process per job, at most `workers` at once
+    tstart = time.perf_counter()
+    running = []
+    for job in jobs:
+        if len(running) == args.workers:
+            running.pop(0).wait()
+        proc = subprocess.Popen([sys.executable, '-c', _SCRIPT], stdin=subprocess.PIPE)
+        proc.stdin.write(json.dumps(job).encode('utf-8'))
+        proc.stdin.close()
+        running.append(proc)
+    for proc in running:
+        proc.wait()
+    tprocess = time.perf_counter() - tstart
+
+    async def render_service():
+        async with RenderService(args.workers) as service:
+            server = await service.serve()
+            async with server:
+                async with await RenderClient.connect(port=server.sockets[0].getsockname()[1]) as client:
+                    tstart = time.perf_counter()
+                    await asyncio.gather(*[client.render(job) for job in jobs])
+                    return time.perf_counter() - tstart
+
+    tservice = asyncio.run(render_service())
+    print('{} thumbnails of {}x{} pixels, {} samples per pixel'.format(args.jobs, spec['nx'], spec['ny'], spec['ns']))
+    print('process per job: {:.2f} s ({:.1f} jobs/s)'.format(tprocess, args.jobs / tprocess))
+    print('render service:  {:.2f} s ({:.1f} jobs/s)'.format(tservice, args.jobs / tservice))
+
+
+if __name__ == '__main__':
+    main()
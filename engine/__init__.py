@@ -0,0 +1,51 @@
+"""
+Ray tracing engine.
+
+Submodules (like `engine.wavefront`) and the main classes and functions re-exported here
+(like `engine.render_image_wavefront`) are imported on first access, such that importing
+the package itself is cheap and scripts only pay for the parts they use.
+"""
+import importlib
+
+
+__version__ = '0.1.0'
+
+_SUBMODULES = [
+    'adaptive', 'animation', 'bvh', 'camera', 'cli', 'denoise', 'gbuffer', 'hit_record', 'incremental',
+    'instrumentation', 'kernels', 'material', 'parallel', 'precision', 'progressive', 'ray', 'release',
+    'rendering', 'samplers', 'sampling', 'scenefile', 'service', 'streaming', 'surface', 'utils', 'wavefront',
+]
+
+# re-exported names and the submodules defining them
+_EXPORTS = {
+    'SurfaceAssembly': 'surface', 'CompiledSurfaceAssembly': 'surface',
+    'Sphere': 'surface', 'Plane': 'surface', 'Disk': 'surface', 'Box': 'surface',
+    'Lambertian': 'material', 'Metal': 'material', 'Dielectric': 'material',
+    'Camera': 'camera',
+    'BVH': 'bvh',
+    'render_image': 'rendering',
+    'PackedScene': 'wavefront', 'render_image_wavefront': 'wavefront',
+    'render_image_parallel': 'parallel',
+    'render_image_denoised': 'denoise',
+    'IndependentSampler': 'samplers', 'StratifiedSampler': 'samplers', 'HaltonSampler': 'samplers', 'SobolSampler': 'samplers',
+    'load_scene': 'scenefile', 'save_scene': 'scenefile', 'write_scene': 'scenefile',
+    'RenderService': 'service', 'RenderClient': 'service',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module('.' + _EXPORTS[name], __name__), name)
+    elif name in _SUBMODULES:
+        value = importlib.import_module('.' + name, __name__)
+    else:
+        raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+    # cache, such that later lookups bypass this function
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS) | set(_SUBMODULES))
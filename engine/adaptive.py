@@ -0,0 +1,88 @@
+from __future__ import division
+import numpy as np
+from .wavefront import PackedScene, trace_pixels, radiance_to_image
+
+
+def render_image_adaptive(nx, ny, max_ns, scene, camera, tolerance=0.01, min_ns=8, batch_ns=8,
+                          max_depth=50, rng=None, max_rays=1 << 18):
+    """
+    Render an image via raytracing, adapting the number of samples per pixel
+    to the estimated error of the pixel color.
+
+    After `min_ns` initial samples, a pixel keeps receiving samples until the standard error
+    of its gamma-corrected color (estimated from the sample variance, maximum over color channels
+    and neighboring pixels) drops below `tolerance`, or until it has received `max_ns` samples. In each round,
+    the samples are distributed according to the number of samples a pixel is estimated
+    to still require, such that noisy pixels receive the remaining sample budget.
+
+    Args:
+        nx: width of rendered image (pixels)
+        ny: height of rendered image (pixels)
+        max_ns: maximum number of samples (rays) per pixel
+        scene: geometric scene (surface assembly of spheres, or its compiled or packed form)
+        camera: camera for generating rays
+        tolerance: target standard error of the gamma-corrected pixel color (between 0 and 1)
+        min_ns: number of initial samples per pixel for estimating the variance
+        batch_ns: maximum number of additional samples per pixel and round
+        max_depth: how often a ray is allowed to scatter
+        rng: random number generator (`numpy.random.Generator`)
+        max_rays: maximum number of rays traced simultaneously
+
+    Returns:
+        tuple: tuple containing
+          - im:           rendered image of shape `(nx, ny, 3)`
+          - mean_samples: average number of samples used per pixel
+    """
+    for name, value in [('max_ns', max_ns), ('min_ns', min_ns), ('batch_ns', batch_ns), ('tolerance', tolerance)]:
+        if not value > 0:
+            raise ValueError("'{}' must be positive, received {}".format(name, value))
+    if rng is None:
+        rng = np.random.default_rng()
+    packed = scene if isinstance(scene, PackedScene) else PackedScene(scene)
+    npix = nx * ny
+    # per-pixel sample count, sum and sum of squares of radiance
+    count = np.zeros(npix, dtype=np.int64)
+    sum1 = np.zeros((npix, 3))
+    sum2 = np.zeros((npix, 3))
+
+    # initial samples for all pixels
+    new = np.full(npix, min(min_ns, max_ns), dtype=np.int64)
+    while True:
+        pixels = np.repeat(np.arange(npix), new)
+        for first in range(0, len(pixels), max_rays):
+            pix = pixels[first:first + max_rays]
+            col = trace_pixels(pix // ny, pix % ny, nx, ny, packed, camera, max_depth, rng)
+            for c in range(3):
+                sum1[:, c] += np.bincount(pix, weights=col[:, c],    minlength=npix)
+                sum2[:, c] += np.bincount(pix, weights=col[:, c]**2, minlength=npix)
+        count += new
+
+        # standard error of the mean per pixel
+        mean = sum1 / count[:, None]
+        var = np.maximum(sum2 / count[:, None] - mean**2, 0) * (count / np.maximum(count - 1, 1))[:, None]
+        err = np.sqrt(var / count[:, None])
+        # error after gamma correction (derivative of square root)
+        err = np.max(err / (2*np.sqrt(np.maximum(mean, 1e-3))), axis=1)
+        # pixels with noisy neighbors remain active, since few samples can underestimate the variance
+        err = _max_filter(err.reshape((nx, ny))).reshape(-1)
+        active = (err > tolerance) & (count < max_ns)
+        if not np.any(active):
+            break
+        # estimated number of samples required to reach the tolerance
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = np.fmin((err / tolerance)**2, max_ns)
+        needed = np.ceil(count * ratio).astype(np.int64) - count
+        new = np.where(active, np.clip(needed, 1, np.minimum(batch_ns, max_ns - count)), 0)
+
+    im = radiance_to_image((sum1 / count[:, None]).reshape((nx, ny, 3)))
+    return (im, count.mean())
+
+
+def _max_filter(a):
+    """Maximum over the 3x3 neighborhood of each entry of a two-dimensional array."""
+    p = np.pad(a, 1, mode='edge')
+    m = p[1:-1, 1:-1].copy()
+    for di in range(3):
+        for dj in range(3):
+            np.maximum(m, p[di:di + a.shape[0], dj:dj + a.shape[1]], out=m)
+    return m
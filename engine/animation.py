@@ -0,0 +1,141 @@
+from __future__ import division
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from .camera import Camera
+from .bvh import BVH
+from .sampling import stream
+from .wavefront import PackedScene, image_tiles, render_tile, radiance_to_image
+from .parallel import mp_context, init_worker, worker_state
+
+
+# camera parameters of keyframes, with their number of components
+CAMERA_PARAMETERS = [('lookfrom', 3), ('lookat', 3), ('vfov', 1), ('aperture', 1), ('focus_dist', 1)]
+
+
+def interpolate_cameras(keyframes, num_frames, aspect, vup=None):
+    """
+    Cameras of an animation, interpolated linearly between keyframes.
+
+    Args:
+        keyframes: list of dictionaries with the entries 'lookfrom', 'lookat', 'vfov', 'aperture'
+            and 'focus_dist' (see `Camera`), and optionally 'frame' (the frame index of the keyframe);
+            by default, the keyframes are spaced evenly over the frames
+        num_frames: number of frames
+        aspect: aspect ratio (width / height) of the images
+        vup: "up" direction (y-axis by default)
+
+    Returns:
+        list: cameras per frame
+    """
+    if vup is None:
+        vup = np.array([0., 1., 0.])
+    if len(keyframes) == 0:
+        raise ValueError('at least one keyframe required')
+    if num_frames < 1:
+        raise ValueError('number of frames must be positive, received {}'.format(num_frames))
+    with_frame = ['frame' in kf for kf in keyframes]
+    if any(with_frame) and not all(with_frame):
+        raise ValueError("either all or none of the keyframes must specify 'frame', missing for keyframes {}".format(
+            [k for k, f in enumerate(with_frame) if not f]))
+    if all(with_frame):
+        key_frames = np.array([kf['frame'] for kf in keyframes], dtype=float)
+    else:
+        if len(keyframes) > 1 and num_frames < 2:
+            raise ValueError('spacing {} keyframes evenly requires at least 2 frames'.format(len(keyframes)))
+        key_frames = np.linspace(0, num_frames - 1, len(keyframes))
+    if np.any(np.diff(key_frames) <= 0):
+        raise ValueError('keyframes must be ordered by frame index')
+    # keyframe parameters as rows of a table
+    table = np.array([np.concatenate([np.reshape(kf[name], size) for name, size in CAMERA_PARAMETERS])
+                      for kf in keyframes], dtype=float)
+    cameras = []
+    for f in range(num_frames):
+        p = np.array([np.interp(f, key_frames, column) for column in table.T])
+        cameras.append(Camera(p[0:3], p[3:6], vup, p[6], aspect, p[7], p[8]))
+    return cameras
+
+
+def render_animation(nx, ny, ns, scene, cameras, path_pattern='frame_{:04d}.png', writer=None,
+                     tile_size=32, max_workers=None, seed=None, max_depth=50, accelerate=False):
+    """
+    Render the frames of an animation of a static scene.
+
+    The scene is packed (and optionally accelerated) once and transferred once to each process
+    of a persistent worker pool, which renders the tiles of all frames. Finished frames are
+    written as soon as all their tiles are completed. Each tile draws from its own
+    random number stream derived from `seed`, the frame and the tile index, such that the frames
+    are reproducible independent of the number of workers.
+
+    Args:
+        nx: width of the frames (pixels)
+        ny: height of the frames (pixels)
+        ns: number of samples (rays) per pixel
+        scene: geometric scene (surface assembly of spheres, or its compiled, accelerated or packed form)
+        cameras: list of cameras per frame, e.g., from `interpolate_cameras`
+        path_pattern: file path of the frames, formatted with the frame index
+        writer: function `writer(path, im)` storing a frame `im` of shape `(nx, ny, 3)`,
+            by default writing an image file using `imageio`
+        tile_size: edge length of the square image tiles (pixels)
+        max_workers: number of worker processes (defaults to the number of CPUs);
+            with a single worker, tiles are rendered in the calling process
+        seed: seed of the random number streams (chosen randomly if None)
+        max_depth: how often a ray is allowed to scatter
+        accelerate: whether to build a bounding volume hierarchy (`BVH`) of the scene
+
+    Returns:
+        list: file paths of the frames
+    """
+    if writer is None:
+        writer = write_image
+    if seed is None:
+        seed = np.random.SeedSequence().entropy
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    if not isinstance(scene, PackedScene):
+        scene = PackedScene(BVH(scene) if accelerate else scene)
+    tiles = image_tiles(nx, ny, tile_size)
+    paths = [path_pattern.format(f) for f in range(len(cameras))]
+    # radiance of the frames in progress, and number of missing tiles per frame
+    frames = {}
+    missing = [len(tiles)] * len(cameras)
+
+    def add_tile(frame, tile_index, tcol):
+        if frame not in frames:
+            frames[frame] = np.zeros((nx, ny, 3))
+        i0, i1, j0, j1 = tiles[tile_index]
+        frames[frame][i0:i1, j0:j1] = tcol
+        missing[frame] -= 1
+        if missing[frame] == 0:
+            writer(paths[frame], radiance_to_image(frames.pop(frame)))
+
+    tasks = [(f, k, tile, cam, nx, ny, ns, max_depth, seed)
+             for f, cam in enumerate(cameras) for k, tile in enumerate(tiles)]
+    if max_workers == 1:
+        init_worker(scene, None)
+        try:
+            for task in tasks:
+                add_tile(*_render_frame_tile_task(*task))
+        finally:
+            init_worker(None, None)
+        return paths
+    # the scene is transferred to each worker only once, by the pool initializer
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context(),
+                             initializer=init_worker, initargs=(scene, None)) as executor:
+        futures = [executor.submit(_render_frame_tile_task, *task) for task in tasks]
+        for future in as_completed(futures):
+            add_tile(*future.result())
+    return paths
+
+
+def _render_frame_tile_task(frame, tile_index, tile, camera, nx, ny, ns, max_depth, seed):
+    i0, i1, j0, j1 = tile
+    rng = stream(seed, frame, tile_index)
+    col = render_tile(i0, i1, j0, j1, nx, ny, ns, worker_state['packed'], camera, max_depth, rng)
+    return (frame, tile_index, col)
+
+
+def write_image(path, im):
+    """Write an image `im` of shape `(nx, ny, 3)` (see `rendering.render_image`) to an image file using `imageio`."""
+    import imageio
+    imageio.imwrite(path, im.transpose((1, 0, 2)))
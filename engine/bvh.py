@@ -0,0 +1,344 @@
+from __future__ import division
+import copy
+import time
+import numpy as np
+from .surface import Surface, SurfaceAssembly, _union_box
+from .hit_record import HitRecord
+from . import instrumentation
+
+
+class BVH(Surface):
+    """
+    Bounding volume hierarchy of spheres, planes, disks and boxes, built using the surface area heuristic (SAH).
+
+    The tree is stored as flat node arrays: node `k` is bounded by the axis-aligned box
+    `[box_min[k], box_max[k]]`; an inner node references its children `left[k]` and `right[k]`,
+    a leaf node (with `left[k] == -1`) the primitives `order[start[k]:start[k] + count[k]]`.
+    Unbounded primitives (infinite planes) are kept outside of the tree in `unbounded`
+    and tested by every ray before the traversal.
+    """
+
+    def __init__(self, assembly, leaf_size=4, traversal_cost=1.0):
+        """
+        Build the hierarchy.
+
+        Args:
+            assembly: surface assembly of spheres, planes, disks and boxes, or its compiled form
+            leaf_size: number of primitives below which nodes are not split further
+            traversal_cost: cost of a node traversal relative to a ray-sphere test, used by the SAH
+        """
+        tstart = time.perf_counter()
+        if isinstance(assembly, SurfaceAssembly):
+            assembly = assembly.compile()
+        self.geometry = assembly
+        prim_min, prim_max = assembly.primitive_bounds()
+        with np.errstate(invalid='ignore'):
+            centers = 0.5*(prim_min + prim_max)
+        centers[:len(assembly.radii)] = assembly.centers
+        bounded = np.all(np.isfinite(prim_min) & np.isfinite(prim_max), axis=1)
+        self.unbounded = np.nonzero(~bounded)[0]
+        self.order = np.nonzero(bounded)[0]
+        n = len(self.order)
+        box_min, box_max = [], []
+        left, right, start, count = [], [], [], []
+        max_depth = 0
+        sah_cost = 0.
+        if n > 0:
+            root_area = _surface_area(prim_min.min(axis=0), prim_max.max(axis=0))
+            # stack of (node index, first primitive, number of primitives, depth)
+            stack = [(0, 0, n, 0)]
+            box_min.append(None); box_max.append(None)
+            left.append(-1); right.append(-1); start.append(0); count.append(n)
+            while stack:
+                node, first, num, depth = stack.pop()
+                max_depth = max(max_depth, depth)
+                prims = self.order[first:first + num]
+                bmin = prim_min[prims].min(axis=0)
+                bmax = prim_max[prims].max(axis=0)
+                box_min[node] = bmin
+                box_max[node] = bmax
+                area = _surface_area(bmin, bmax)
+                split = None
+                if num > leaf_size:
+                    split = _find_sah_split(centers[prims], prim_min[prims], prim_max[prims])
+                    # compare with the cost of intersecting all primitives in a leaf
+                    if split is not None and traversal_cost*area + split[2] >= num*area:
+                        split = None
+                if split is None:
+                    start[node] = first
+                    count[node] = num
+                    sah_cost += num * area / root_area
+                    continue
+                sah_cost += traversal_cost * area / root_area
+                axis, nleft, _ = split
+                self.order[first:first + num] = prims[np.argsort(centers[prims, axis], kind='stable')]
+                for child, (cfirst, cnum) in enumerate([(first, nleft), (first + nleft, num - nleft)]):
+                    k = len(left)
+                    box_min.append(None); box_max.append(None)
+                    left.append(-1); right.append(-1); start.append(cfirst); count.append(cnum)
+                    if child == 0:
+                        left[node] = k
+                    else:
+                        right[node] = k
+                    stack.append((k, cfirst, cnum, depth + 1))
+        self.box_min = np.array(box_min, dtype=float).reshape((-1, 3))
+        self.box_max = np.array(box_max, dtype=float).reshape((-1, 3))
+        self.left  = np.array(left,  dtype=int)
+        self.right = np.array(right, dtype=int)
+        self.start = np.array(start, dtype=int)
+        self.count = np.array(count, dtype=int)
+        self.build_stats = {
+            'build_time': time.perf_counter() - tstart,
+            'num_primitives': n + len(self.unbounded),
+            'num_nodes': len(self.left),
+            'num_leaves': int(np.sum(self.left < 0)),
+            'max_depth': max_depth,
+            'sah_cost': float(sah_cost),
+        }
+        self.reset_query_stats()
+
+    def reset_query_stats(self):
+        """Reset the accumulated traversal statistics."""
+        self.query_stats = {
+            'num_rays': 0,
+            'node_tests': 0,
+            'primitive_tests': 0,
+            'query_time': 0.,
+        }
+
+    @property
+    def materials(self):
+        return self.geometry.materials
+
+    @property
+    def material_index(self):
+        return self.geometry.material_index
+
+    def __len__(self):
+        return len(self.geometry)
+
+    @property
+    def dtype(self):
+        """Floating-point type of the geometry arrays."""
+        return self.geometry.dtype
+
+    def astype(self, dtype):
+        """
+        Copy of the hierarchy with the geometry and node boxes converted to the floating-point type `dtype`;
+        the hierarchy itself if it has this type already.
+
+        The node boxes are enlarged by a few units in the last place, such that they still contain
+        the rounded primitives.
+        """
+        if np.dtype(dtype) == self.dtype:
+            return self
+        other = copy.copy(self)
+        other.geometry = self.geometry.astype(dtype)
+        pad = 4 * np.finfo(dtype).eps * np.maximum(np.abs(self.box_min), np.abs(self.box_max))
+        other.box_min = (self.box_min - pad).astype(dtype)
+        other.box_max = (self.box_max + pad).astype(dtype)
+        other.reset_query_stats()
+        return other
+
+    def normals(self, index, points):
+        """
+        Surface normals at intersection points `points` of the primitives `index`.
+        """
+        return self.geometry.normals(index, points)
+
+    def bounding_box(self):
+        if len(self.unbounded) > 0:
+            return self.geometry.bounding_box()
+        return _union_box(list(zip(self.box_min[:1], self.box_max[:1])))
+
+    def hit(self, ray, t_min, t_max):
+        """
+        Obtain the closest hit record for a ray intersecting the stored primitives.
+        """
+        tstart = time.perf_counter()
+        stats = self.query_stats
+        stats['num_rays'] += 1
+        geom = self.geometry
+        with np.errstate(divide='ignore', invalid='ignore'):
+            invdir = 1 / ray.direction
+        closest_so_far = t_max
+        best = -1
+        if len(self.unbounded) > 0:
+            stats['primitive_tests'] += len(self.unbounded)
+            if instrumentation.current is not None:
+                instrumentation.current.intersection_tests += len(self.unbounded)
+            t = geom.hit_pairs(ray.origin[None, :], ray.direction[None, :], self.unbounded, t_min, t_max)
+            k = np.argmin(t)
+            if np.isfinite(t[k]):
+                closest_so_far = t[k]
+                best = self.unbounded[k]
+        stack = [0] if len(self.left) > 0 else []
+        while stack:
+            node = stack.pop()
+            stats['node_tests'] += 1
+            if not _box_hit(self.box_min[node], self.box_max[node], ray.origin, invdir, t_min, closest_so_far):
+                continue
+            if self.left[node] >= 0:
+                stack.append(self.right[node])
+                stack.append(self.left[node])
+                continue
+            prims = self.order[self.start[node]:self.start[node] + self.count[node]]
+            stats['primitive_tests'] += len(prims)
+            if instrumentation.current is not None:
+                instrumentation.current.intersection_tests += len(prims)
+            t = geom.hit_pairs(ray.origin[None, :], ray.direction[None, :], prims, t_min, closest_so_far)
+            k = np.argmin(t)
+            if np.isfinite(t[k]):
+                closest_so_far = t[k]
+                best = prims[k]
+        stats['query_time'] += time.perf_counter() - tstart
+        if best < 0:
+            return (None, t_max)
+        point = ray.point_at_parameter(closest_so_far)
+        if best < len(geom.radii):
+            normal = (point - geom.centers[best]) / geom.radii[best]
+        else:
+            normal = geom.normals(np.array([best]), point[None, :])[0]
+        return (HitRecord(point, normal, geom.materials[geom.material_index[best]]), closest_so_far)
+
+    def hit_batch(self, origins, directions, t_min, t_max, chunk_size=1 << 16):
+        """
+        Find the closest intersection for a batch of rays.
+
+        Args:
+            origins: ray origins, array of shape `(n, 3)`
+            directions: ray directions, array of shape `(n, 3)`
+            t_min: minimum ray parameter
+            t_max: maximum ray parameter
+            chunk_size: maximum number of rays traversing the tree simultaneously
+
+        Returns:
+            tuple: tuple containing
+              - index: index of the closest primitive per ray, or -1 if there is no hit
+              - t:     ray parameter of the intersection, or `t_max` if there is no hit
+        """
+        tstart = time.perf_counter()
+        n = len(origins)
+        index = np.full(n, -1, dtype=int)
+        tbest = np.full(n, t_max, dtype=origins.dtype)
+        if len(self.left) > 0 or len(self.unbounded) > 0:
+            for first in range(0, n, chunk_size):
+                sl = slice(first, first + chunk_size)
+                index[sl], tbest[sl] = self._traverse(origins[sl], directions[sl], t_min, t_max)
+        self.query_stats['num_rays'] += n
+        self.query_stats['query_time'] += time.perf_counter() - tstart
+        return (index, tbest)
+
+    def _traverse(self, origins, directions, t_min, t_max):
+        """
+        Breadth-first traversal of the tree, advancing all (ray, node) pairs by one level at a time.
+        """
+        geom = self.geometry
+        n = len(origins)
+        index = np.full(n, -1, dtype=int)
+        tbest = np.full(n, t_max, dtype=origins.dtype)
+        if len(self.unbounded) > 0:
+            # unbounded primitives, pairwise with all rays
+            m = len(self.unbounded)
+            self.query_stats['primitive_tests'] += n*m
+            if instrumentation.current is not None:
+                instrumentation.current.intersection_tests += n*m
+            t = geom.hit_pairs(np.repeat(origins, m, axis=0), np.repeat(directions, m, axis=0),
+                               np.tile(self.unbounded, n), t_min, t_max).reshape((n, m))
+            k = np.argmin(t, axis=1)
+            tk = t[np.arange(n), k]
+            found = np.isfinite(tk)
+            index[found] = self.unbounded[k[found]]
+            tbest[found] = tk[found]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            invdir = 1 / directions
+        rays = np.arange(n) if len(self.left) > 0 else np.zeros(0, dtype=int)
+        nodes = np.zeros(len(rays), dtype=int)
+        while len(rays) > 0:
+            self.query_stats['node_tests'] += len(rays)
+            mask = _box_hit_batch(self.box_min[nodes], self.box_max[nodes], origins[rays], invdir[rays], t_min, tbest[rays])
+            rays = rays[mask]
+            nodes = nodes[mask]
+            leaf = self.left[nodes] < 0
+            # intersect rays with the primitives in leaf nodes
+            if np.any(leaf):
+                lrays = rays[leaf]
+                lnodes = nodes[leaf]
+                cnt = self.count[lnodes]
+                # expand into (ray, primitive) pairs
+                pr = np.repeat(lrays, cnt)
+                offset = np.arange(len(pr)) - np.repeat(np.cumsum(cnt) - cnt, cnt)
+                prims = self.order[np.repeat(self.start[lnodes], cnt) + offset]
+                self.query_stats['primitive_tests'] += len(prims)
+                if instrumentation.current is not None:
+                    instrumentation.current.intersection_tests += len(prims)
+                t = geom.hit_pairs(origins[pr], directions[pr], prims, t_min, tbest[pr])
+                found = np.isfinite(t)
+                pr, prims, t = pr[found], prims[found], t[found]
+                tprev = tbest.copy()
+                np.minimum.at(tbest, pr, t)
+                # among equally close primitives, retain the one with smallest index
+                closest = t == tbest[pr]
+                cand = np.full(n, len(geom), dtype=int)
+                np.minimum.at(cand, pr[closest], prims[closest])
+                improved = tbest < tprev
+                index[improved] = cand[improved]
+                tied = ~improved & (cand < len(geom))
+                index[tied] = np.minimum(index[tied], cand[tied])
+            # descend into child nodes
+            rays = rays[~leaf]
+            nodes = nodes[~leaf]
+            rays = np.concatenate((rays, rays))
+            nodes = np.concatenate((self.left[nodes], self.right[nodes]))
+        return (index, tbest)
+
+
+def _surface_area(bmin, bmax):
+    d = np.maximum(bmax - bmin, 0)
+    return 2*(d[..., 0]*d[..., 1] + d[..., 1]*d[..., 2] + d[..., 2]*d[..., 0])
+
+
+def _find_sah_split(centers, prim_min, prim_max):
+    """
+    Find the split with lowest surface area heuristic cost
+    by sweeping over the primitives sorted along each axis.
+
+    Returns:
+        tuple: (axis, number of primitives in left child, SAH cost), or None if no split exists
+    """
+    n = len(centers)
+    best = None
+    for axis in range(3):
+        order = np.argsort(centers[:, axis], kind='stable')
+        lo = prim_min[order]
+        hi = prim_max[order]
+        # bounds of the first k + 1 and last n - k - 1 primitives
+        left_area = _surface_area(np.minimum.accumulate(lo, axis=0), np.maximum.accumulate(hi, axis=0))[:-1]
+        right_area = _surface_area(np.minimum.accumulate(lo[::-1], axis=0),
+                                   np.maximum.accumulate(hi[::-1], axis=0))[::-1][1:]
+        nleft = np.arange(1, n)
+        cost = left_area*nleft + right_area*(n - nleft)
+        k = np.argmin(cost)
+        if best is None or cost[k] < best[2]:
+            best = (axis, k + 1, cost[k])
+    return best
+
+
+def _box_hit(bmin, bmax, origin, invdir, t_min, t_max):
+    """Slab test of a single ray against an axis-aligned box."""
+    with np.errstate(invalid='ignore'):
+        t0 = (bmin - origin) * invdir
+        t1 = (bmax - origin) * invdir
+    tnear = max(t_min, np.max(np.fmin(t0, t1)))
+    tfar = min(t_max, np.min(np.fmax(t0, t1)))
+    return tnear <= tfar
+
+
+def _box_hit_batch(bmin, bmax, origins, invdir, t_min, t_max):
+    """Slab test of rays against axis-aligned boxes, evaluated pairwise."""
+    with np.errstate(invalid='ignore'):
+        t0 = (bmin - origins) * invdir
+        t1 = (bmax - origins) * invdir
+    tnear = np.maximum(np.max(np.fmin(t0, t1), axis=1), t_min)
+    tfar = np.minimum(np.min(np.fmax(t0, t1), axis=1), t_max)
+    return tnear <= tfar
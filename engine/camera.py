@@ -1,6 +1,9 @@
+import time
 import numpy as np
-from ray import Ray
-from utils import unit_vector, random_in_unit_disk
+from . import instrumentation
+from .ray import Ray
+from .utils import unit_vector, random_in_unit_disk
+from .sampling import in_unit_disk
 
 
 class Camera(object):
@@ -47,8 +50,99 @@ class Camera(object):
         Returns:
             Ray: generated ray
         """
+        if instrumentation.current is not None:
+            instrumentation.current.camera_rays += 1
         rd = self._lens_radius * random_in_unit_disk()
         offset = rd[0]*self._u + rd[1]*self._v
         ray_origin = self._origin + offset
         direction = self._lower_left_corner + s*self._horizontal + t*self._vertical - ray_origin
         return Ray(ray_origin, direction)
+
+    def get_rays(self, s, t, rng, dtype=np.float64):
+        """
+        Get a batch of rays originating from random positions on the lense,
+        targeting the focus window at relative coordinates `s` and `t`.
+
+        Args:
+            s: relative x-coordinates within focus window, array of length `n`
+            t: relative y-coordinates within focus window, array of length `n`
+            rng: random number generator (`numpy.random.Generator`)
+            dtype: floating-point type of the rays
+
+        Returns:
+            tuple: tuple containing
+              - origins:    ray origins, contiguous array of shape `(n, 3)`
+              - directions: ray directions, contiguous array of shape `(n, 3)`
+        """
+        tstart = time.perf_counter()
+        s = np.asarray(s, dtype=dtype)
+        t = np.asarray(t, dtype=dtype)
+        u, v, corner, horizontal, vertical = (np.asarray(a, dtype=dtype) for a in
+            (self._u, self._v, self._lower_left_corner, self._horizontal, self._vertical))
+        origins = np.empty((len(s), 3), dtype=dtype)
+        origins[:] = self._origin
+        if self._lens_radius > 0:
+            rd = np.dtype(dtype).type(self._lens_radius) * in_unit_disk(rng, len(s), dtype)
+            origins += rd[:, 0, None]*u + rd[:, 1, None]*v
+        directions = corner + s[:, None]*horizontal + t[:, None]*vertical - origins
+        if instrumentation.current is not None:
+            instrumentation.current.camera_rays += len(s)
+            instrumentation.current.add_time('camera', tstart)
+        return (origins, directions)
+
+    def get_pixel_rays(self, nx, ny, ns, rng, tile=None, stratified=False, dtype=np.float64):
+        """
+        Get `ns` rays per pixel with random offsets within the pixel (for antialiasing),
+        for the whole image or a tile of it.
+
+        Args:
+            nx: width of image (pixels)
+            ny: height of image (pixels)
+            ns: number of samples (rays) per pixel
+            rng: random number generator (`numpy.random.Generator`),
+                or samples of the paths (`samplers.PathSamples`)
+            tile: tuple `(i0, i1, j0, j1)` specifying the pixels `[i0, i1) x [j0, j1)`,
+                or None for the whole image
+            stratified: whether to stratify the offsets within each pixel, using a jittered grid
+                if `ns` is a square number and a Latin hypercube layout otherwise
+            dtype: floating-point type of the rays
+
+        Returns:
+            tuple: tuple containing
+              - origins:    ray origins, contiguous array of shape `(npixels*ns, 3)`
+              - directions: ray directions, contiguous array of shape `(npixels*ns, 3)`
+
+            The rays are ordered by pixel x-coordinate, then y-coordinate, then sample.
+        """
+        i0, i1, j0, j1 = tile if tile is not None else (0, nx, 0, ny)
+        i, j = np.meshgrid(np.arange(i0, i1), np.arange(j0, j1), indexing='ij')
+        npix = i.size
+        i = np.repeat(i.reshape(-1), ns)
+        j = np.repeat(j.reshape(-1), ns)
+        offset = rng.random((2, npix*ns)).T
+        if stratified:
+            strata, shape = stratified_layout(npix, ns, rng)
+            offset = (strata + offset) / shape
+        s = (i + offset[:, 0]) / nx
+        t = (j + offset[:, 1]) / ny
+        return self.get_rays(s, t, rng, dtype)
+
+
+def stratified_layout(npix, ns, rng):
+    """
+    Integer strata coordinates of `ns` samples for each of `npix` pixels:
+    a regular grid if `ns` is a square number, otherwise a random Latin hypercube
+    (each row and column of a `ns x ns` grid contains exactly one sample).
+
+    Returns:
+        tuple: tuple containing
+          - strata: strata coordinates of shape `(npix*ns, 2)`
+          - shape:  number of strata per dimension
+    """
+    m = int(round(np.sqrt(ns)))
+    if m*m == ns:
+        k = np.tile(np.arange(ns), npix)
+        return (np.column_stack((k % m, k // m)), np.array([m, m]))
+    # independent random permutation per pixel
+    perm = np.argsort(rng.random((npix, ns)), axis=1).reshape(-1)
+    return (np.column_stack((perm, np.tile(np.arange(ns), npix))), np.array([ns, ns]))
@@ -0,0 +1,129 @@
+from __future__ import division
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from .service import RenderService
+from .scenefile import MAGIC
+from .animation import write_image
+
+
+def load_jobs(paths, defaults):
+    """
+    Collect the render jobs of the input files.
+
+    Each input is either a JSON file containing a job specification or a list of them
+    (see `service.RenderService.submit`), or a scene file (see `scenefile.save_scene`),
+    which is rendered using the camera and image settings in `defaults`. Entries missing
+    from a job specification are taken from `defaults` as well.
+
+    Returns:
+        list: pairs `(name, spec)`, where `name` identifies the output file
+            (the basename of the input file or the 'output' entry of the job specification)
+    """
+    jobs = []
+    for path in paths:
+        base = os.path.splitext(os.path.basename(path))[0]
+        with open(path, 'rb') as f:
+            is_scene = f.read(len(MAGIC)) == MAGIC
+        if is_scene:
+            specs = [{'scene': {'path': os.path.abspath(path)}}]
+        else:
+            with open(path) as f:
+                specs = json.load(f)
+            if isinstance(specs, dict):
+                specs = [specs]
+        for k, spec in enumerate(specs):
+            spec = dict(defaults, **spec)
+            for key in ('camera', 'nx', 'ny', 'ns'):
+                if spec.get(key) is None:
+                    raise ValueError("job {} of '{}' lacks '{}'".format(k, path, key))
+            name = spec.pop('output', base if len(specs) == 1 else '{}_{:03d}'.format(base, k))
+            jobs.append((name, spec))
+    counts = Counter(name for name, _ in jobs)
+    duplicates = sorted(name for name, count in counts.items() if count > 1)
+    if duplicates:
+        raise ValueError('output names must be unique, received several jobs named {}; '
+                         "rename the input files or set 'output' in the job specifications".format(
+                         ', '.join("'{}'".format(name) for name in duplicates)))
+    return jobs
+
+
+def render_jobs(jobs, max_workers=None):
+    """
+    Render jobs `(name, spec)` in a single process, using one persistent pool of worker processes
+    which keeps the packed scenes of recent jobs (see `service.RenderService`).
+
+    Returns:
+        list: rendered images of shape `(nx, ny, 3)`, in the order of `jobs`
+    """
+    async def run():
+        async with RenderService(max_workers) as service:
+            queued = [service.submit(spec) for _, spec in jobs]
+            return await asyncio.gather(*[job.result() for job in queued])
+
+    return asyncio.run(run())
+
+
+def write_images(names, images, output_dir, fmt):
+    """
+    Write the rendered images in bulk: as PNG or NumPy files (encoded by a thread pool),
+    or as a single NumPy archive 'renders.npz' with one entry per image.
+
+    Returns:
+        list: paths of the written files
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    if fmt == 'npz':
+        path = os.path.join(output_dir, 'renders.npz')
+        np.savez(path, **dict(zip(names, images)))
+        return [path]
+    paths = [os.path.join(output_dir, name + '.' + fmt) for name in names]
+    with ThreadPoolExecutor() as executor:
+        list(executor.map(write_image if fmt == 'png' else np.save, paths, images))
+    return paths
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(prog='raytrace',
+        description='Render many scenes in one process, reusing the worker pool and the packed scenes.')
+    parser.add_argument('inputs', nargs='+', help='JSON job specifications (one job or a list) or scene files')
+    parser.add_argument('--camera', help='camera parameters as JSON file or string (see service.camera_from_spec), '
+                                         'used for scene files and jobs without camera')
+    parser.add_argument('--nx', type=int, default=200, help='image width (pixels)')
+    parser.add_argument('--ny', type=int, default=100, help='image height (pixels)')
+    parser.add_argument('--ns', type=int, default=16, help='number of samples per pixel')
+    parser.add_argument('--max-depth', type=int, default=50, help='how often a ray is allowed to scatter')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the random number streams')
+    parser.add_argument('--precision', choices=['float64', 'float32'], default='float64', help='floating-point precision')
+    parser.add_argument('--workers', type=int, default=None, help='number of worker processes (default: number of CPUs)')
+    parser.add_argument('--output-dir', default='.', help='directory of the rendered images')
+    parser.add_argument('--format', choices=['png', 'npy', 'npz'], default='png',
+                        help="image format; 'npz' writes a single archive containing all images")
+    args = parser.parse_args(argv)
+
+    camera = None
+    if args.camera is not None:
+        if os.path.isfile(args.camera):
+            with open(args.camera) as f:
+                camera = json.load(f)
+        else:
+            camera = json.loads(args.camera)
+    defaults = {'camera': camera, 'nx': args.nx, 'ny': args.ny, 'ns': args.ns,
+                'max_depth': args.max_depth, 'seed': args.seed, 'precision': args.precision}
+    tstart = time.perf_counter()
+    jobs = load_jobs(args.inputs, defaults)
+    images = render_jobs(jobs, args.workers)
+    trender = time.perf_counter() - tstart
+    paths = write_images([name for name, _ in jobs], images, args.output_dir, args.format)
+    print('rendered {} images in {:.2f} s, wrote {} files to {}'.format(
+        len(jobs), trender, len(paths), args.output_dir))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+from __future__ import division
+import numpy as np
+from .wavefront import PackedScene, image_tiles, render_tile, radiance_to_image, luminance
+
+
+# B3 spline filter taps of the a-trous wavelet transform
+_TAPS = np.array([1/16, 1/4, 3/8, 1/4, 1/16])
+
+
+def render_buffers(nx, ny, ns, scene, camera, tile_size=32, max_depth=50, rng=None, sampler=None):
+    """
+    Render the averaged radiance of each pixel via wavefront path tracing, together with
+    the first-hit feature buffers (arbitrary output variables) required by `denoise`.
+
+    Args:
+        nx: width of rendered image (pixels)
+        ny: height of rendered image (pixels)
+        ns: number of samples (rays) per pixel
+        scene: geometric scene (surface assembly of spheres, or its compiled or packed form)
+        camera: camera for generating rays
+        tile_size: edge length of the square image tiles rendered at once (pixels)
+        max_depth: how often a ray is allowed to scatter
+        rng: random number generator (`numpy.random.Generator`)
+        sampler: sampling strategy (see `samplers.Sampler`) replacing `rng`
+
+    Returns:
+        tuple: radiance of shape `(nx, ny, 3)` and dictionary of the feature buffers
+            'albedo' `(nx, ny, 3)`, 'normal' `(nx, ny, 3)`, 'depth' `(nx, ny)` and 'variance' `(nx, ny)`
+            (of the averaged luminance)
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    packed = scene if isinstance(scene, PackedScene) else PackedScene(scene)
+    col = np.zeros((nx, ny, 3))
+    aov = {'albedo': np.zeros((nx, ny, 3)), 'normal': np.zeros((nx, ny, 3)),
+           'depth': np.zeros((nx, ny)), 'variance': np.zeros((nx, ny))}
+    for i0, i1, j0, j1 in image_tiles(nx, ny, tile_size):
+        tile_rng = rng if sampler is None else sampler.tile_samples(i0, i1, j0, j1, ny, ns)
+        tile_aov = {}
+        col[i0:i1, j0:j1] = render_tile(i0, i1, j0, j1, nx, ny, ns, packed, camera, max_depth, tile_rng, aov=tile_aov)
+        for key, value in tile_aov.items():
+            aov[key][i0:i1, j0:j1] = value
+    return (col, aov)
+
+
+def render_image_denoised(nx, ny, ns, scene, camera, tile_size=32, max_depth=50, rng=None, sampler=None, **kwargs):
+    """
+    Render an image with few samples per pixel via wavefront path tracing
+    and remove the remaining noise from the radiance before gamma correction.
+
+    Additional keyword arguments are passed to `denoise`.
+
+    Returns:
+        numpy.ndarray: rendered image of shape `(nx, ny, 3)`
+    """
+    col, aov = render_buffers(nx, ny, ns, scene, camera, tile_size, max_depth, rng, sampler)
+    variance = aov['variance'] if ns > 1 else None
+    return radiance_to_image(denoise(col, aov['albedo'], aov['normal'], aov['depth'], variance, **kwargs))
+
+
+def denoise(col, albedo, normal, depth, variance=None, iterations=5,
+            sigma_luminance=4., sigma_normal=0.3, sigma_depth=1., sigma_albedo=0.1):
+    """
+    Edge-avoiding a-trous wavelet filter guided by first-hit feature buffers and the estimated
+    noise level per pixel (Dammertz et al., "Edge-avoiding a-trous wavelet transform for fast
+    global illumination filtering", 2010; Schied et al., "Spatiotemporal variance-guided filtering", 2017).
+
+    The radiance is divided by the albedo before filtering and multiplied by it afterwards,
+    such that surface colors are not blurred. Each iteration applies a 5 x 5 B3 spline kernel
+    with holes (the spacing doubles per iteration), weighted by the similarity of the normals,
+    depths and albedos of the pixels, and by the luminance difference relative to its standard
+    deviation; the variance is filtered along. Hence well-converged pixels are left nearly untouched.
+    Depth differences are measured relative to the screen-space depth gradient, such that tilted
+    planes are smoothed as well.
+
+    Args:
+        col: averaged radiance, array of shape `(nx, ny, 3)`
+        albedo: first-hit albedo, array of shape `(nx, ny, 3)`
+        normal: first-hit surface normal, array of shape `(nx, ny, 3)`
+        depth: first-hit distance, array of shape `(nx, ny)`
+        variance: variance of the averaged luminance, array of shape `(nx, ny)`,
+            or None to estimate it from the luminance of neighboring pixels
+        iterations: number of filter iterations (kernel footprint `4*2**iterations - 3` pixels)
+        sigma_luminance: tolerated luminance difference, in multiples of its standard deviation
+        sigma_normal: tolerated normal difference
+        sigma_depth: tolerated depth difference, in multiples of the expected difference on a plane
+        sigma_albedo: tolerated albedo difference
+
+    Returns:
+        numpy.ndarray: filtered radiance of shape `(nx, ny, 3)`
+    """
+    nx, ny = depth.shape
+    albedo = np.maximum(albedo, 1e-3).astype(np.float32)
+    irradiance = (col / albedo).astype(np.float32)
+    normal = normal.astype(np.float32)
+    depth = depth.astype(np.float32)
+    lum_albedo = luminance(albedo)
+    if variance is None:
+        variance = _box_variance(luminance(col), 2)
+    variance = (variance / lum_albedo**2).astype(np.float32)
+    # depth gradient per pixel, as the smaller one-sided difference to be robust at object boundaries
+    grad = []
+    for axis in range(2):
+        d = np.abs(np.diff(depth, axis=axis))
+        pad = [(0, 0), (0, 0)]
+        pad[axis] = (1, 0)
+        lower = np.pad(d, pad, mode='edge')
+        pad[axis] = (0, 1)
+        upper = np.pad(d, pad, mode='edge')
+        grad.append(np.minimum(lower, upper))
+    for it in range(iterations):
+        step = 1 << it
+        lum = luminance(irradiance)
+        # prefiltered standard deviation for robustness
+        scale = 1 / (sigma_luminance * np.sqrt(_blur3(variance)) + 1e-6)
+        p = 2*step
+        padded = [np.pad(a, [(p, p), (p, p)] + [(0, 0)]*(a.ndim - 2))
+                  for a in (irradiance, variance, lum, normal, depth, albedo, np.ones((nx, ny), dtype=np.float32))]
+        total = np.zeros_like(irradiance)
+        total_var = np.zeros_like(variance)
+        weights = np.zeros_like(variance)
+        for a in range(5):
+            for b in range(5):
+                di = (a - 2)*step
+                dj = (b - 2)*step
+                sl = (slice(p + di, p + di + nx), slice(p + dj, p + dj + ny))
+                c_q, v_q, l_q, n_q, z_q, a_q, valid = (x[sl] for x in padded)
+                w = (_TAPS[a]*_TAPS[b]) * valid * np.exp(
+                    - np.abs(lum - l_q) * scale
+                    - _sqdist(normal, n_q) / sigma_normal**2
+                    - np.abs(depth - z_q) / (sigma_depth * (grad[0]*abs(di) + grad[1]*abs(dj)) + 1e-3*depth + 1e-8)
+                    - _sqdist(albedo, a_q) / sigma_albedo**2)
+                total += w[..., None] * c_q
+                total_var += w**2 * v_q
+                weights += w
+        # the center tap always has a positive weight
+        irradiance = total / weights[..., None]
+        variance = total_var / weights**2
+    return irradiance.astype(col.dtype) * albedo
+
+
+def _sqdist(x, y):
+    d = x - y
+    return np.einsum('...i,...i->...', d, d)
+
+
+def _blur3(x):
+    """Separable 3 x 3 binomial filter with replicated boundary pixels."""
+    for axis in range(2):
+        xp = np.pad(x, [(1, 1) if k == axis else (0, 0) for k in range(x.ndim)], mode='edge')
+        x = 0.25*np.take(xp, range(0, x.shape[axis]), axis=axis) + 0.5*x + 0.25*np.take(xp, range(2, x.shape[axis] + 2), axis=axis)
+    return x
+
+
+def _box_variance(x, r):
+    """Variance of `x` in the `(2 r + 1) x (2 r + 1)` neighborhood of each pixel."""
+    xp = np.pad(x, r, mode='reflect')
+    n = 2*r + 1
+    windows = np.lib.stride_tricks.sliding_window_view(xp, (n, n))
+    return windows.var(axis=(-2, -1))
@@ -0,0 +1,136 @@
+from __future__ import division
+import hashlib
+from collections import OrderedDict
+import numpy as np
+from .sampling import stream
+from .wavefront import PackedScene, image_tiles, trace_paths, radiance_to_image, compiled_geometry
+from .precision import get_precision
+
+
+class PrimaryHitCache(object):
+    """
+    Cache of the primary hits (camera rays and their first intersections) of image tiles,
+    with least-recently-used eviction once the stored arrays exceed `max_bytes`.
+
+    Entries are identified by fingerprints of the scene geometry and the camera (see `render_image_cached`),
+    such that entries become unreachable as soon as the geometry or camera changes, and are eventually evicted.
+    """
+
+    def __init__(self, max_bytes=256 << 20):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Cached entry for `key`, or None."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key, entry):
+        """Store an entry (tuple of arrays), evicting the least recently used entries if required."""
+        if key in self._entries:
+            self.nbytes -= _nbytes(self._entries.pop(key))
+        size = _nbytes(entry)
+        if size > self.max_bytes:
+            return
+        while self.nbytes + size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.nbytes -= _nbytes(evicted)
+        self._entries[key] = entry
+        self.nbytes += size
+
+    def clear(self):
+        self._entries.clear()
+        self.nbytes = 0
+
+
+def render_image_cached(nx, ny, ns, scene, camera, cache, seed=0, tile_size=32, max_depth=50):
+    """
+    Render an image via wavefront path tracing, reusing the primary hits stored in `cache`.
+
+    The primary hits of a tile depend only on the scene geometry, the camera, the image
+    and tile dimensions and the seed, but not on the materials. Re-rendering after changing
+    material parameters hence skips the generation and intersection of camera rays entirely.
+    Camera rays and the remaining path segments draw from separate random number streams
+    derived from `seed` and the tile index, such that the rendered image does not depend
+    on whether the primary hits are cached.
+
+    Args:
+        nx: width of rendered image (pixels)
+        ny: height of rendered image (pixels)
+        ns: number of samples (rays) per pixel
+        scene: geometric scene (surface assembly of spheres, or its compiled, accelerated or packed form)
+        camera: camera for generating rays
+        cache: `PrimaryHitCache` object
+        seed: seed of the random number streams
+        tile_size: edge length of the square image tiles (pixels)
+        max_depth: how often a ray is allowed to scatter
+
+    Returns:
+        numpy.ndarray: rendered image of shape `(nx, ny, 3)`
+    """
+    packed = scene if isinstance(scene, PackedScene) else PackedScene(scene)
+    key = (geometry_fingerprint(packed.geometry), camera_fingerprint(camera), nx, ny, ns, seed)
+    col = np.zeros((nx, ny, 3))
+    for k, tile in enumerate(image_tiles(nx, ny, tile_size)):
+        i0, i1, j0, j1 = tile
+        entry = cache.get(key + (tile,))
+        if entry is None:
+            entry = primary_hits(packed.geometry, camera, nx, ny, ns, stream(seed, k, 0), tile)
+            cache.put(key + (tile,), entry)
+        origins, directions = entry[:2]
+        tcol = trace_paths(origins, directions, packed, max_depth, stream(seed, k, 1), primary=entry[2:])
+        col[i0:i1, j0:j1] = tcol.reshape((i1 - i0, j1 - j0, ns, 3)).mean(axis=2)
+    return radiance_to_image(col)
+
+
+def primary_hits(geometry, camera, nx, ny, ns, rng, tile):
+    """
+    Generate the camera rays of a tile and intersect them with the scene geometry.
+
+    Returns:
+        tuple: ray origins and directions, index of the intersected object (or -1), ray parameter,
+            intersection points and surface normals (zero for rays without intersection)
+    """
+    precision = get_precision(geometry.dtype)
+    origins, directions = camera.get_pixel_rays(nx, ny, ns, rng, tile=tile, dtype=precision.dtype)
+    index, t = geometry.hit_batch(origins, directions, precision.t_min, precision.t_max)
+    points = origins + t[:, None]*directions
+    normals = np.zeros_like(points)
+    hit = index >= 0
+    normals[hit] = geometry.normals(index[hit], points[hit])
+    return (origins, directions, index, t, points, normals)
+
+
+def geometry_fingerprint(geometry):
+    """Fingerprint of the primitives of a (compiled or accelerated) scene geometry and its precision, ignoring materials."""
+    prims = compiled_geometry(geometry)
+    return _digest(type(geometry).__name__ + ':' + prims.dtype.name, prims.centers, prims.radii, prims.plane_points, prims.plane_normals,
+                   prims.disk_centers, prims.disk_normals, prims.disk_radii, prims.box_min, prims.box_max)
+
+
+def camera_fingerprint(camera):
+    """Fingerprint of the camera position, orientation, field of view and aperture."""
+    return _digest(type(camera).__name__, camera._origin, camera._u, camera._v,
+                   camera._lower_left_corner, camera._horizontal, camera._vertical, camera._lens_radius)
+
+
+def _digest(name, *arrays):
+    h = hashlib.blake2b(name.encode(), digest_size=16)
+    for a in arrays:
+        h.update(np.ascontiguousarray(a, dtype=float).tobytes())
+    return h.hexdigest()
+
+
+def _nbytes(entry):
+    return sum(a.nbytes for a in entry)
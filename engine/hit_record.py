@@ -1,4 +1,6 @@
 import numpy as np
+from . import utils
+from .precision import FLOAT64
 
 
 class HitRecord(object):
@@ -6,11 +8,14 @@ class HitRecord(object):
     Store a "hit record" for a ray intersecting a geometric object.
     """
 
+    __slots__ = ('point', 'normal', 'material')
+
     def __init__(self, point, normal, material):
         # intersection point
         self.point = point
         # surface normal at intersection point
-        assert abs(np.linalg.norm(normal) - 1) < 1e-11, 'hit record normal must be normalized'
+        if utils.debug:
+            assert abs(np.linalg.norm(normal) - 1) < FLOAT64.tolerance, 'hit record normal must be normalized'
         self.normal = normal
         # reference to material
         self.material = material
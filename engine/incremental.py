@@ -0,0 +1,208 @@
+from __future__ import division
+import time
+import numpy as np
+from .surface import SurfaceAssembly
+from .bvh import BVH
+from .samplers import IndependentSampler, PathSamples
+from .wavefront import PackedScene, trace_paths, radiance_to_image
+
+
+# number of bits of the per-pixel Bloom filters, and bits set per object
+BLOOM_BITS = 128
+BLOOM_HASHES = 3
+
+
+class UpdateReport(object):
+    """
+    Summary of an incremental update (see `IncrementalRenderer.update`).
+
+    Attributes:
+        changed_objects: number of edited objects
+        rerendered_pixels: number of pixels traced again
+        total_pixels: number of pixels of the image
+        time: duration of the update (seconds)
+    """
+
+    def __init__(self, changed_objects, rerendered_pixels, total_pixels, time):
+        self.changed_objects = changed_objects
+        self.rerendered_pixels = rerendered_pixels
+        self.total_pixels = total_pixels
+        self.time = time
+
+    def __str__(self):
+        return '{} changed objects: re-rendered {} of {} pixels ({:.1f}%) in {:.3f} s'.format(
+            self.changed_objects, self.rerendered_pixels, self.total_pixels,
+            100 * self.rerendered_pixels / max(self.total_pixels, 1), self.time)
+
+
+class IncrementalRenderer(object):
+    """
+    Renderer supporting re-rendering only the pixels affected by editing some objects of the scene.
+
+    Along with the radiance of each pixel, the renderer records which objects the paths of the pixel
+    have hit (at any bounce), as Bloom filter with `BLOOM_BITS` bits per pixel. After moving, resizing
+    or re-coloring objects, the pixels whose filter may contain them, as well as the screen-space bounds
+    of their old and new positions, are traced again.
+
+    Samples are drawn from a stateless sampler (see `samplers.Sampler`), such that re-traced pixels
+    receive the same samples as in a complete rendering of the edited scene. Paths which hit an edited
+    object only at its new position and only after a bounce (e.g., a reflection of a moved object) are
+    not detected; their pixels keep the previous radiance.
+    """
+
+    def __init__(self, nx, ny, ns, scene, camera, max_depth=50, sampler=None, accelerate=False, batch_size=4096):
+        """
+        Render the initial image.
+
+        Args:
+            nx: width of rendered image (pixels)
+            ny: height of rendered image (pixels)
+            ns: number of samples (rays) per pixel
+            scene: geometric scene (surface assembly, or its compiled form)
+            camera: camera for generating rays
+            max_depth: how often a ray is allowed to scatter
+            sampler: sampling strategy (independent samples with seed 0 by default)
+            accelerate: whether to build a bounding volume hierarchy (`BVH`) of the scene (after each edit)
+            batch_size: number of pixels traced at once
+        """
+        self.nx = nx
+        self.ny = ny
+        self.ns = ns
+        self.camera = camera
+        self.max_depth = max_depth
+        self.sampler = sampler if sampler is not None else IndependentSampler(0)
+        self.batch_size = batch_size
+        self.accelerate = accelerate
+        self._geometry = _compiled(scene)
+        self._packed = self._pack(self._geometry)
+        # averaged radiance and Bloom filter of the hit objects per pixel
+        self.radiance = np.zeros((nx, ny, 3))
+        self.touched = np.zeros((nx, ny, BLOOM_BITS // 64), dtype=np.uint64)
+        self._render_pixels(np.arange(nx*ny))
+
+    def image(self):
+        """Rendered image of shape `(nx, ny, 3)`."""
+        return radiance_to_image(self.radiance)
+
+    def update(self, scene, changed):
+        """
+        Replace the scene by an edited version and re-render the affected pixels.
+
+        Args:
+            scene: edited scene, containing the objects of the previous scene in the same order,
+                optionally followed by new objects
+            changed: indices of the edited objects in order of insertion (new objects are included automatically)
+
+        Returns:
+            UpdateReport: summary of the update
+        """
+        tstart = time.perf_counter()
+        geometry = _compiled(scene)
+        n_old = len(self._geometry)
+        n_new = len(geometry)
+        if n_new < n_old:
+            raise ValueError('removing objects is not supported, replace them by empty spheres (radius zero) instead')
+        changed = np.union1d(np.asarray(changed, dtype=int), np.arange(n_old, n_new))
+        if np.any(changed < 0) or np.any(changed >= n_new):
+            raise ValueError('indices of changed objects out of range')
+        old = changed[changed < n_old]
+        # pixels whose paths may have hit the edited objects (all bits of an object are set in the Bloom filter)
+        dirty = np.zeros((self.nx, self.ny), dtype=bool)
+        for bits in _object_bits(old):
+            dirty |= np.all(self.touched & bits == bits, axis=-1)
+        # pixels covering the old and new positions
+        for geom, objects in [(self._geometry, old), (geometry, changed)]:
+            box_min, box_max = geom.primitive_bounds()
+            for k in _object_index(geom)[objects]:
+                i0, i1, j0, j1 = self.screen_bounds(box_min[k], box_max[k])
+                dirty[i0:i1, j0:j1] = True
+        self._geometry = geometry
+        self._packed = self._pack(geometry)
+        i, j = np.nonzero(dirty)
+        self._render_pixels(i*self.ny + j)
+        return UpdateReport(len(changed), len(i), self.nx*self.ny, time.perf_counter() - tstart)
+
+    def screen_bounds(self, box_min, box_max):
+        """
+        Pixel range `(i0, i1, j0, j1)` covering the projection of an axis-aligned box
+        (e.g., the bounds of an object), taking the lens aperture into account.
+        """
+        if not (np.all(np.isfinite(box_min)) and np.all(np.isfinite(box_max))):
+            # unbounded object
+            return (0, self.nx, 0, self.ny)
+        cam = self.camera
+        corners = np.array([[x[0], y[1], z[2]] for x in (box_min, box_max) for y in (box_min, box_max) for z in (box_min, box_max)])
+        r = cam._lens_radius
+        eyes = cam._origin + np.array([x*r*cam._u + y*r*cam._v for x in (-1, 1) for y in (-1, 1)])
+        # normal of the focus window, pointing away from the camera
+        w = np.cross(cam._vertical, cam._horizontal)
+        w /= np.linalg.norm(w)
+        d = corners[None, :, :] - eyes[:, None, :]
+        dw = d @ w
+        if np.any(dw <= 1e-12):
+            # box extends behind the camera
+            return (0, self.nx, 0, self.ny)
+        q = eyes[:, None, :] + (((cam._lower_left_corner - eyes) @ w)[:, None] / dw)[:, :, None] * d - cam._lower_left_corner
+        s = (q @ cam._horizontal) / np.dot(cam._horizontal, cam._horizontal)
+        t = (q @ cam._vertical) / np.dot(cam._vertical, cam._vertical)
+        i0 = int(np.clip(np.floor(s.min()*self.nx), 0, self.nx))
+        i1 = int(np.clip(np.ceil(s.max()*self.nx), 0, self.nx))
+        j0 = int(np.clip(np.floor(t.min()*self.ny), 0, self.ny))
+        j1 = int(np.clip(np.ceil(t.max()*self.ny), 0, self.ny))
+        return (i0, max(i0, i1), j0, max(j0, j1))
+
+    def _pack(self, geometry):
+        return PackedScene(BVH(geometry) if self.accelerate else geometry)
+
+    def _render_pixels(self, pixels):
+        """Trace the pixels with indices `i*ny + j` and store their radiance and Bloom filters."""
+        ns = self.ns
+        # Bloom filter bits per compiled index, keyed by the position of the object in order of insertion,
+        # which remains valid when objects of other types are added
+        bits = _object_bits(np.argsort(_object_index(self._geometry)))
+        for start in range(0, len(pixels), self.batch_size):
+            pix = pixels[start:start + self.batch_size]
+            i, j = np.divmod(pix, self.ny)
+            samples = PathSamples(self.sampler, np.repeat(pix, ns), np.tile(np.arange(ns), len(pix)))
+            # same sample dimensions as `Camera.get_pixel_rays`
+            offset = samples.random((2, len(pix)*ns)).T
+            s = (np.repeat(i, ns) + offset[:, 0]) / self.nx
+            t = (np.repeat(j, ns) + offset[:, 1]) / self.ny
+            origins, directions = self.camera.get_rays(s, t, samples, self._packed.precision.dtype)
+            touched = np.zeros((len(pix)*ns, BLOOM_BITS // 64), dtype=np.uint64)
+
+            def visit(paths, index):
+                touched[paths] |= bits[index]
+
+            col = trace_paths(origins, directions, self._packed, self.max_depth, samples, visit=visit)
+            self.radiance[i, j] = col.reshape((len(pix), ns, 3)).mean(axis=1)
+            self.touched[i, j] = np.bitwise_or.reduce(touched.reshape((len(pix), ns, -1)), axis=1)
+
+
+def _compiled(scene):
+    if isinstance(scene, SurfaceAssembly):
+        return scene.compile()
+    return scene
+
+
+def _object_index(geometry):
+    """Compiled index per object in order of insertion (see `CompiledSurfaceAssembly`)."""
+    index = getattr(geometry, 'object_index', None)
+    if index is None:
+        return np.arange(len(geometry))
+    return index
+
+
+def _object_bits(index):
+    """Bloom filter bits of the objects `index`, as array of shape `(len(index), BLOOM_BITS // 64)`."""
+    index = np.asarray(index, dtype=np.uint64)
+    bits = np.zeros((len(index), BLOOM_BITS // 64), dtype=np.uint64)
+    rows = np.arange(len(index))
+    h = index
+    shift = np.uint64(64 - int(np.log2(BLOOM_BITS)))
+    for _ in range(BLOOM_HASHES):
+        # multiplicative hashing, using the upper bits of the product
+        h = (h + np.uint64(1)) * np.uint64(0x9e3779b97f4a7c15)
+        b = h >> shift
+        bits[rows, (b >> np.uint64(6)).astype(int)] |= np.uint64(1) << (b & np.uint64(63))
+    return bits
@@ -0,0 +1,129 @@
+from __future__ import division
+import time
+from contextlib import contextmanager
+
+
+class RenderStats(object):
+    """
+    Counters and timings collected during rendering.
+
+    Attributes:
+        camera_rays: number of generated camera (primary) rays
+        rays_per_depth: number of traced rays per bounce depth (index 0 for primary rays)
+        intersection_tests: number of ray-primitive intersection tests
+        material_hits: number of scattering events per material class name
+        escaped_paths: number of paths leaving the scene (towards the sky)
+        absorbed_paths: number of paths absorbed at a surface (no scattered ray)
+        terminated_paths: number of paths terminated by the maximum depth or Russian roulette
+        stage_time: accumulated time per rendering stage (seconds)
+        tiles: per rendered tile, its pixel range, total time and time per stage
+    """
+
+    STAGES = ('camera', 'intersection', 'scatter')
+
+    def __init__(self):
+        self.camera_rays = 0
+        self.rays_per_depth = []
+        self.intersection_tests = 0
+        self.material_hits = {}
+        self.escaped_paths = 0
+        self.absorbed_paths = 0
+        self.terminated_paths = 0
+        self.stage_time = dict.fromkeys(self.STAGES, 0.)
+        self.tiles = []
+
+    @property
+    def traced_rays(self):
+        """Total number of traced rays."""
+        return sum(self.rays_per_depth)
+
+    def add_rays(self, depth, n=1):
+        """Count `n` rays traced at bounce depth `depth`."""
+        if depth >= len(self.rays_per_depth):
+            self.rays_per_depth.extend([0] * (depth + 1 - len(self.rays_per_depth)))
+        self.rays_per_depth[depth] += n
+
+    def add_material_hits(self, material_type, n=1):
+        """Count `n` scattering events at materials of class `material_type`."""
+        name = material_type.__name__
+        self.material_hits[name] = self.material_hits.get(name, 0) + n
+
+    def add_time(self, stage, tstart):
+        """Add the time elapsed since `tstart` (from `time.perf_counter`) to a rendering stage."""
+        self.stage_time[stage] += time.perf_counter() - tstart
+
+    @contextmanager
+    def tile(self, tile):
+        """Context for rendering a tile `(i0, i1, j0, j1)`, recording its timings."""
+        stages = dict(self.stage_time)
+        tstart = time.perf_counter()
+        yield
+        self.tiles.append({
+            'tile': tuple(int(x) for x in tile),
+            'time': time.perf_counter() - tstart,
+            'stage_time': {k: self.stage_time[k] - stages[k] for k in self.STAGES},
+        })
+
+    def merge(self, other):
+        """Add the counters and timings of `other` to this object."""
+        self.camera_rays += other.camera_rays
+        for depth, n in enumerate(other.rays_per_depth):
+            self.add_rays(depth, n)
+        self.intersection_tests += other.intersection_tests
+        for name, n in other.material_hits.items():
+            self.material_hits[name] = self.material_hits.get(name, 0) + n
+        self.escaped_paths += other.escaped_paths
+        self.absorbed_paths += other.absorbed_paths
+        self.terminated_paths += other.terminated_paths
+        for k in self.STAGES:
+            self.stage_time[k] += other.stage_time[k]
+        self.tiles.extend(other.tiles)
+
+    def as_dict(self):
+        """Statistics as dictionary, e.g., for JSON serialization."""
+        return {
+            'camera_rays': self.camera_rays,
+            'traced_rays': self.traced_rays,
+            'rays_per_depth': list(self.rays_per_depth),
+            'intersection_tests': self.intersection_tests,
+            'material_hits': dict(self.material_hits),
+            'escaped_paths': self.escaped_paths,
+            'absorbed_paths': self.absorbed_paths,
+            'terminated_paths': self.terminated_paths,
+            'stage_time': dict(self.stage_time),
+            'tiles': list(self.tiles),
+        }
+
+    def __str__(self):
+        lines = [
+            'camera rays:        {}'.format(self.camera_rays),
+            'traced rays:        {}'.format(self.traced_rays),
+            'rays per depth:     {}'.format(self.rays_per_depth),
+            'intersection tests: {}'.format(self.intersection_tests),
+            'material hits:      {}'.format(self.material_hits),
+            'paths escaped / absorbed / terminated: {} / {} / {}'.format(
+                self.escaped_paths, self.absorbed_paths, self.terminated_paths),
+            'stage time (s):     ' + ', '.join('{}: {:.3f}'.format(k, v) for k, v in self.stage_time.items()),
+        ]
+        return '\n'.join(lines)
+
+
+# statistics object collecting counters of the current rendering, or None if disabled;
+# instrumented code checks this variable only, such that disabled instrumentation has negligible cost
+current = None
+
+
+@contextmanager
+def collect(stats=None):
+    """
+    Enable instrumentation within a context, collecting into `stats` (a new `RenderStats` object by default).
+    """
+    global current
+    if stats is None:
+        stats = RenderStats()
+    previous = current
+    current = stats
+    try:
+        yield stats
+    finally:
+        current = previous
@@ -0,0 +1,235 @@
+from __future__ import division
+import math
+import numpy as np
+from .scenefile import MATERIAL_CODES, material_table
+from .material import Lambertian, Metal
+from .precision import FLOAT64
+from .wavefront import compiled_geometry
+
+try:
+    import numba
+except ImportError:
+    # Numba is optional; without it, the kernels are not compiled and `render_image_numba` is unavailable
+    numba = None
+
+
+def _jit(parallel=False):
+    """Compile a kernel with Numba (caching the machine code on disk), if installed."""
+    def decorator(func):
+        if numba is None:
+            return func
+        return numba.njit(cache=True, parallel=parallel)(func)
+    return decorator
+
+
+prange = numba.prange if numba is not None else range
+
+_LAMBERTIAN = MATERIAL_CODES[Lambertian]
+_METAL = MATERIAL_CODES[Metal]
+
+
+def have_numba():
+    """Whether the compiled kernels are available."""
+    return numba is not None
+
+
+def render_image_numba(nx, ny, ns, scene, camera, max_depth=50, seed=None):
+    """
+    Render an image via raytracing, using kernels compiled by Numba,
+    with the image rows distributed over parallel threads.
+
+    Implements the same algorithm as `rendering.render_image`, with linear
+    ray-sphere intersection (like `CompiledSurfaceAssembly`). The compiled machine code
+    is cached on disk, such that only the first call after installation pays the compile cost.
+    The random numbers of each image row are derived from `seed` and the row index,
+    such that the result does not depend on the number of threads.
+
+    Args:
+        nx: width of rendered image (pixels)
+        ny: height of rendered image (pixels)
+        ns: number of samples (rays) per pixel
+        scene: geometric scene (surface assembly of spheres, or its compiled form)
+        camera: camera for generating rays
+        max_depth: how often a ray is allowed to scatter
+        seed: seed of the random number generator (chosen randomly if None)
+
+    Returns:
+        numpy.ndarray: averaged radiance of shape `(nx, ny, 3)`
+    """
+    if numba is None:
+        raise ImportError('render_image_numba requires the numba package')
+    if seed is None:
+        seed = np.random.SeedSequence().entropy
+    scene = compiled_geometry(scene)
+    if len(scene) != len(scene.radii):
+        raise TypeError('render_image_numba supports only spheres')
+    table = material_table(scene.materials)
+    material_index = np.asarray(scene.material_index)
+    # material type and parameters (albedo, fuzz and refraction index) per sphere
+    kind = table['material_type'][material_index].astype(np.int64)
+    params = np.column_stack((table['albedo'], table['fuzz'], table['ref_idx']))[material_index]
+    cam = np.array([camera._origin, camera._u, camera._v,
+                    camera._lower_left_corner, camera._horizontal, camera._vertical], dtype=float)
+    col = np.zeros((nx, ny, 3))
+    _render_rows(nx, ny, ns, np.ascontiguousarray(scene.centers, dtype=float), np.ascontiguousarray(scene.radii, dtype=float),
+                 kind, params, cam, float(camera._lens_radius), max_depth, FLOAT64.t_min, FLOAT64.t_max,
+                 int(seed) % (1 << 31), col)
+    return col
+
+
+@_jit(parallel=True)
+def _render_rows(nx, ny, ns, centers, radii, kind, params, cam, lens_radius, max_depth, t_min, t_max, seed, col):
+    for i in prange(nx):
+        # deterministic random numbers per image row, independent of the thread
+        np.random.seed((seed + 7919*i) % 2147483647)
+        for j in range(ny):
+            r = 0.
+            g = 0.
+            b = 0.
+            for _ in range(ns):
+                # add a random offset for antialiasing
+                s = (i + np.random.random()) / nx
+                t = (j + np.random.random()) / ny
+                ox, oy, oz = cam[0, 0], cam[0, 1], cam[0, 2]
+                if lens_radius > 0:
+                    rd = lens_radius*math.sqrt(np.random.random())
+                    phi = 2*math.pi*np.random.random()
+                    rx = rd*math.cos(phi)
+                    ry = rd*math.sin(phi)
+                    ox += rx*cam[1, 0] + ry*cam[2, 0]
+                    oy += rx*cam[1, 1] + ry*cam[2, 1]
+                    oz += rx*cam[1, 2] + ry*cam[2, 2]
+                dx = cam[3, 0] + s*cam[4, 0] + t*cam[5, 0] - ox
+                dy = cam[3, 1] + s*cam[4, 1] + t*cam[5, 1] - oy
+                dz = cam[3, 2] + s*cam[4, 2] + t*cam[5, 2] - oz
+                cr, cg, cb = _trace(ox, oy, oz, dx, dy, dz, centers, radii, kind, params, max_depth, t_min, t_max)
+                r += cr
+                g += cg
+                b += cb
+            col[i, j, 0] = r / ns
+            col[i, j, 1] = g / ns
+            col[i, j, 2] = b / ns
+
+
+@_jit()
+def _hit_spheres(ox, oy, oz, dx, dy, dz, centers, radii, t_min, t_max):
+    """Index of the closest sphere hit by a ray (or -1) and the ray parameter of the intersection."""
+    a = dx*dx + dy*dy + dz*dz
+    hit = -1
+    for k in range(len(radii)):
+        ocx = ox - centers[k, 0]
+        ocy = oy - centers[k, 1]
+        ocz = oz - centers[k, 2]
+        b = ocx*dx + ocy*dy + ocz*dz
+        c = ocx*ocx + ocy*ocy + ocz*ocz - radii[k]*radii[k]
+        discriminant = b*b - a*c
+        if discriminant > 0:
+            # numerically stable solutions of the quadratic equation
+            t1 = -(b + math.copysign(math.sqrt(discriminant), b)) / a
+            t2 = c / (a * t1)
+            if t1 > t2:
+                t1, t2 = t2, t1
+            if t_min <= t1 and t1 < t_max:
+                t_max = t1
+                hit = k
+            elif t_min <= t2 and t2 < t_max:
+                t_max = t2
+                hit = k
+    return hit, t_max
+
+
+@_jit()
+def _random_in_unit_sphere():
+    """Uniformly random point within the unit sphere."""
+    x = np.random.standard_normal()
+    y = np.random.standard_normal()
+    z = np.random.standard_normal()
+    n = math.sqrt(x*x + y*y + z*z)
+    if n == 0:
+        return 0., 0., 0.
+    r = np.random.random()**(1/3) / n
+    return r*x, r*y, r*z
+
+
+@_jit()
+def _scatter(kind, params, dx, dy, dz, nx, ny, nz):
+    """
+    Scattered ray direction, attenuation factor per color channel
+    and whether the ray is scattered, for a material of type `kind`.
+    """
+    if kind == _LAMBERTIAN:
+        sx, sy, sz = _random_in_unit_sphere()
+        return nx + sx, ny + sy, nz + sz, params[0], params[1], params[2], True
+    nd = math.sqrt(dx*dx + dy*dy + dz*dz)
+    ux = dx / nd
+    uy = dy / nd
+    uz = dz / nd
+    cosine = ux*nx + uy*ny + uz*nz
+    # reflected direction
+    rx = ux - 2*cosine*nx
+    ry = uy - 2*cosine*ny
+    rz = uz - 2*cosine*nz
+    if kind == _METAL:
+        sx, sy, sz = _random_in_unit_sphere()
+        fuzz = params[3]
+        rx += fuzz*sx
+        ry += fuzz*sy
+        rz += fuzz*sz
+        return rx, ry, rz, params[0], params[1], params[2], rx*nx + ry*ny + rz*nz > 0
+    # dielectric
+    ref_idx = params[4]
+    if cosine > 0:
+        # exiting the medium
+        mx, my, mz = -nx, -ny, -nz
+        ni_over_nt = ref_idx
+    else:
+        mx, my, mz = nx, ny, nz
+        ni_over_nt = 1.0 / ref_idx
+        cosine = -cosine
+    dt = ux*mx + uy*my + uz*mz
+    discriminant = 1 - ni_over_nt**2 * (1 - dt**2)
+    if discriminant > 0:
+        # Schlick's approximation
+        r0 = ((1 - ref_idx) / (1 + ref_idx))**2
+        reflect_prob = r0 + (1 - r0) * (1 - cosine)**5
+    else:
+        reflect_prob = 1.0
+    # randomly choose between reflection or refraction
+    if np.random.random() < reflect_prob:
+        return rx, ry, rz, 1., 1., 1., True
+    sq = math.sqrt(max(discriminant, 0.))
+    return (ni_over_nt*(ux - mx*dt) - sq*mx,
+            ni_over_nt*(uy - my*dt) - sq*my,
+            ni_over_nt*(uz - mz*dt) - sq*mz, 1., 1., 1., True)
+
+
+@_jit()
+def _trace(ox, oy, oz, dx, dy, dz, centers, radii, kind, params, max_depth, t_min, t_max):
+    """Trace a ray through the scene and return its color, considering intersections within `[t_min, t_max)`."""
+    # accumulated attenuation along the path
+    ar = 1.
+    ag = 1.
+    ab = 1.
+    for depth in range(max_depth + 1):
+        k, t = _hit_spheres(ox, oy, oz, dx, dy, dz, centers, radii, t_min, t_max)
+        if k < 0:
+            # blue background sky
+            t = 0.5*(dy / math.sqrt(dx*dx + dy*dy + dz*dz) + 1)
+            return ar*(1 - 0.5*t), ag*(1 - 0.3*t), ab
+        if depth == max_depth:
+            break
+        ox += t*dx
+        oy += t*dy
+        oz += t*dz
+        nx = (ox - centers[k, 0]) / radii[k]
+        ny = (oy - centers[k, 1]) / radii[k]
+        nz = (oz - centers[k, 2]) / radii[k]
+        # renormalize to compensate for rounding errors of hit points on large spheres
+        nn = math.sqrt(nx*nx + ny*ny + nz*nz)
+        dx, dy, dz, fr, fg, fb, valid = _scatter(kind[k], params[k], dx, dy, dz, nx/nn, ny/nn, nz/nn)
+        if not valid:
+            break
+        ar *= fr
+        ag *= fg
+        ab *= fb
+    return 0., 0., 0.
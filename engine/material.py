@@ -1,7 +1,11 @@
 import numpy as np
 from abc import ABCMeta, abstractmethod
-from ray import Ray
-from utils import unit_vector, random_in_unit_sphere
+from .ray import Ray
+from . import utils
+from .utils import unit_vector, random_in_unit_sphere, random_uniform
+from .sampling import in_unit_sphere
+from .precision import get_precision
+from . import instrumentation
 
 
 class Material(object):
@@ -22,6 +26,35 @@ class Material(object):
               - albedo:    reflectance per color channel
         """
 
+    @abstractmethod
+    def batch_parameters(self):
+        """
+        Material parameters as dictionary of keyword arguments for `scatter_batch`.
+        """
+
+    @staticmethod
+    @abstractmethod
+    def scatter_batch(directions, points, normals, rng, **params):
+        """
+        Compute scattered ray directions and color attenuation factors
+        for a batch of rays hitting surfaces of this material type.
+
+        The scattered rays originate from the hit points.
+
+        Args:
+            directions: incoming ray directions, array of shape `(n, 3)`
+            points: hit points, array of shape `(n, 3)`
+            normals: surface normals at hit points, array of shape `(n, 3)`
+            rng: random number generator (`numpy.random.Generator`)
+            params: material parameters, per ray or broadcastable
+
+        Returns:
+            tuple: tuple containing
+              - scattered: scattered ray directions, array of shape `(n, 3)`
+              - albedo:    reflectance per color channel, array of shape `(n, 3)`
+              - valid:     mask indicating whether a scattered ray exists
+        """
+
 
 class Lambertian(Material):
     """"
@@ -33,9 +66,22 @@ class Lambertian(Material):
         self._albedo = a
 
     def scatter(self, _, rec):
-        scattered = Ray(rec.point.copy(), rec.normal + random_in_unit_sphere())
+        if instrumentation.current is not None:
+            instrumentation.current.add_material_hits(Lambertian)
+        scattered = Ray(rec.point, rec.normal + random_in_unit_sphere())
         return (scattered, self._albedo)
 
+    def batch_parameters(self):
+        return {'albedo': np.broadcast_to(self._albedo, 3).astype(float)}
+
+    @staticmethod
+    def scatter_batch(directions, points, normals, rng, albedo):
+        n = len(directions)
+        if instrumentation.current is not None:
+            instrumentation.current.add_material_hits(Lambertian, n)
+        scattered = normals + in_unit_sphere(rng, n, normals.dtype)
+        return (scattered, np.broadcast_to(albedo, (n, 3)), np.ones(n, dtype=bool))
+
 
 class Metal(Material):
     """"
@@ -48,14 +94,30 @@ class Metal(Material):
         self._fuzz = min(f, 1)
 
     def scatter(self, ray, rec):
+        if instrumentation.current is not None:
+            instrumentation.current.add_material_hits(Metal)
         nraydir = unit_vector(ray.direction)
         reflected = reflect(nraydir, rec.normal)
-        scattered = Ray(rec.point.copy(), reflected + self._fuzz*random_in_unit_sphere())
+        scattered = Ray(rec.point, reflected + self._fuzz*random_in_unit_sphere())
         if np.dot(scattered.direction, rec.normal) > 0:
             return (scattered, self._albedo)
         else:
             return (None, self._albedo)
 
+    def batch_parameters(self):
+        return {'albedo': np.broadcast_to(self._albedo, 3).astype(float), 'fuzz': float(self._fuzz)}
+
+    @staticmethod
+    def scatter_batch(directions, points, normals, rng, albedo, fuzz):
+        n = len(directions)
+        if instrumentation.current is not None:
+            instrumentation.current.add_material_hits(Metal, n)
+        nraydir = unit_vector(directions)
+        reflected = reflect(nraydir, normals)
+        scattered = reflected + np.reshape(fuzz, (-1, 1))*in_unit_sphere(rng, n, reflected.dtype)
+        valid = _dot(scattered, normals) > 0
+        return (scattered, np.broadcast_to(albedo, (n, 3)), valid)
+
 
 class Dielectric(Material):
     """
@@ -66,6 +128,8 @@ class Dielectric(Material):
         self._ref_idx = ri
 
     def scatter(self, ray, rec):
+        if instrumentation.current is not None:
+            instrumentation.current.add_material_hits(Dielectric)
 
         # normalized ray direction
         nraydir = unit_vector(ray.direction)
@@ -85,25 +149,71 @@ class Dielectric(Material):
             reflect_prob = 1.0
 
         # randomly choose between reflection or refraction
-        if np.random.rand() < reflect_prob:
-            return (Ray(rec.point.copy(), reflected), np.ones(3))
+        if random_uniform() < reflect_prob:
+            return (Ray(rec.point, reflected), np.ones(3))
         else:
-            return (Ray(rec.point.copy(), refracted), np.ones(3))
+            return (Ray(rec.point, refracted), np.ones(3))
+
+    def batch_parameters(self):
+        return {'ref_idx': float(self._ref_idx)}
+
+    @staticmethod
+    def scatter_batch(directions, points, normals, rng, ref_idx):
+        n = len(directions)
+        if instrumentation.current is not None:
+            instrumentation.current.add_material_hits(Dielectric, n)
+        ref_idx = np.broadcast_to(ref_idx, n)
+
+        # normalized ray directions
+        nraydir = unit_vector(directions)
+
+        reflected = reflect(nraydir, normals)
+
+        cosine = _dot(nraydir, normals)
+        # rays exiting the medium
+        exiting = cosine > 0
+        refracted = refract(nraydir,
+                            np.where(exiting[:, None], -normals, normals),
+                            np.where(exiting, ref_idx, 1.0 / ref_idx))
+        cosine = np.abs(cosine)
+
+        can_refract = ~np.isnan(refracted[:, 0])
+        reflect_prob = np.where(can_refract, schlick(cosine, ref_idx), 1.0)
+
+        # randomly choose between reflection or refraction
+        choose_reflect = rng.random(n) < reflect_prob
+        scattered = np.where(choose_reflect[:, None], reflected, refracted)
+        return (scattered, np.ones((n, 3), dtype=scattered.dtype), np.ones(n, dtype=bool))
 
 
 def reflect(v, n):
-    """Reflect direction `v` at plane with normal `n`."""
-    assert abs(np.linalg.norm(n) - 1) < 1e-11, 'surface normal must be normalized'
-    return v - 2*np.dot(v, n)*n
+    """
+    Reflect direction `v` at plane with normal `n`.
+    Also accepts batches of directions and normals, as arrays of shape `(m, 3)`.
+    """
+    if utils.debug:
+        assert np.all(abs(np.linalg.norm(n, axis=-1) - 1) < _tolerance(n)), 'surface normal must be normalized'
+    return v - 2*_dot(v, n)[..., None]*n
 
 
 def refract(v, n, ni_over_nt):
     """
     Compute direction of refracted ray according to Snell's law,
     or return None if no solution exists.
+
+    Also accepts batches of directions and normals, as arrays of shape `(m, 3)`,
+    together with a ratio of refraction indices per ray; rows without solution
+    are then filled with NaN.
     """
-    assert abs(np.linalg.norm(v) - 1) < 1e-11, 'input ray direction must be normalized'
-    assert abs(np.linalg.norm(n) - 1) < 1e-11, 'surface normal must be normalized'
+    if utils.debug:
+        assert np.all(abs(np.linalg.norm(v, axis=-1) - 1) < _tolerance(v)), 'input ray direction must be normalized'
+        assert np.all(abs(np.linalg.norm(n, axis=-1) - 1) < _tolerance(n)), 'surface normal must be normalized'
+    if np.ndim(v) > 1:
+        ni_over_nt = np.reshape(ni_over_nt, (-1, 1))
+        dt = _dot(v, n)[:, None]
+        discriminant = 1 - ni_over_nt**2 * (1 - dt**2)
+        discriminant[discriminant <= 0] = np.nan
+        return ni_over_nt*(v - n*dt) - np.sqrt(discriminant)*n
     dt = np.dot(v, n)
     discriminant = 1 - ni_over_nt**2 * (1 - dt**2)
     if discriminant > 0:
@@ -113,6 +223,19 @@ def refract(v, n, ni_over_nt):
 
 
 def schlick(cosine, ref_idx):
-    """Schlick's approximation of specular reflection coefficient."""
+    """
+    Schlick's approximation of specular reflection coefficient.
+    Evaluated elementwise for arrays of cosines and refraction indices.
+    """
     r0 = ((1 - ref_idx) / (1 + ref_idx))**2
     return r0 + (1 - r0) * (1 - cosine)**5
+
+
+def _tolerance(v):
+    """Tolerated deviation of the norm of normalized vectors `v` from 1, depending on their precision."""
+    return get_precision(np.result_type(v, np.float32)).tolerance
+
+
+def _dot(a, b):
+    """Dot product along the last axis."""
+    return np.einsum('...i,...i->...', a, b)
@@ -0,0 +1,88 @@
+from __future__ import division
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from .sampling import stream
+from .wavefront import pack_scene, image_tiles, render_tile, radiance_to_image
+
+
+def render_image_parallel(nx, ny, ns, scene, camera, tile_size=32, max_workers=None, seed=None, max_depth=50,
+                          precision=None):
+    """
+    Render an image via raytracing, distributing image tiles over a pool of worker processes.
+
+    Each tile uses its own random number stream derived from `seed` and the tile index,
+    such that the rendered image is reproducible independent of the number of workers
+    and the order in which tiles are completed.
+
+    Args:
+        nx: width of rendered image (pixels)
+        ny: height of rendered image (pixels)
+        ns: number of samples (rays) per pixel
+        scene: geometric scene (surface assembly of spheres, or its compiled or packed form)
+        camera: camera for generating rays
+        tile_size: edge length of the square image tiles (pixels)
+        max_workers: number of worker processes (defaults to the number of CPUs);
+            with a single worker, tiles are rendered in the calling process
+        seed: seed of the random number streams (chosen randomly if None)
+        max_depth: how often a ray is allowed to scatter
+        precision: floating-point precision of the rendering path, 'float64' or 'float32'
+            (by default the one of a packed scene, otherwise 'float64')
+
+    Returns:
+        numpy.ndarray: rendered image of shape `(nx, ny, 3)`
+    """
+    if seed is None:
+        seed = np.random.SeedSequence().entropy
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    packed = pack_scene(scene, precision)
+    tiles = image_tiles(nx, ny, tile_size)
+    col = np.zeros((nx, ny, 3), dtype=packed.precision.dtype)
+    if max_workers == 1:
+        init_worker(packed, camera)
+        try:
+            for k, tile in enumerate(tiles):
+                i0, i1, j0, j1 = tile
+                col[i0:i1, j0:j1] = _render_tile_task(k, tile, nx, ny, ns, max_depth, seed)[1]
+        finally:
+            init_worker(None, None)
+        return radiance_to_image(col)
+    # the scene and camera are transferred to each worker only once, by the pool initializer
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context(),
+                             initializer=init_worker, initargs=(packed, camera)) as executor:
+        futures = [executor.submit(_render_tile_task, k, tile, nx, ny, ns, max_depth, seed)
+                   for k, tile in enumerate(tiles)]
+        for future in as_completed(futures):
+            k, tcol = future.result()
+            i0, i1, j0, j1 = tiles[k]
+            col[i0:i1, j0:j1] = tcol
+    return radiance_to_image(col)
+
+
+# scene and camera of the current worker process, set by `init_worker`
+worker_state = {}
+
+
+def mp_context():
+    """
+    Multiprocessing context of the worker pools: 'forkserver' where available, otherwise 'spawn'
+    (forking is unsafe once the calling process runs threads, like the thread pool of the compiled kernels).
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('forkserver')
+    return multiprocessing.get_context('spawn')
+
+
+def init_worker(packed, camera):
+    """Set the packed scene and camera of the current worker process (pool initializer), see `worker_state`."""
+    worker_state['packed'] = packed
+    worker_state['camera'] = camera
+
+
+def _render_tile_task(tile_index, tile, nx, ny, ns, max_depth, seed):
+    i0, i1, j0, j1 = tile
+    rng = stream(seed, tile_index)
+    col = render_tile(i0, i1, j0, j1, nx, ny, ns, worker_state['packed'], worker_state['camera'], max_depth, rng)
+    return (tile_index, col)
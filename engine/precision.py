@@ -0,0 +1,46 @@
+from __future__ import division
+import numpy as np
+
+
+class Precision(object):
+    """
+    Floating-point precision of the batched rendering path, together with the tolerances depending on it.
+
+    Attributes:
+        dtype: floating-point type of rays, geometry, samples and accumulated radiance
+        t_min: minimum ray parameter of intersections, avoiding self-intersections of scattered rays
+            due to rounding errors of the hit points
+        t_max: maximum ray parameter of intersections
+        tolerance: tolerated deviation of the norm of normalized vectors (like surface normals) from 1
+    """
+
+    def __init__(self, dtype, t_min, t_max, tolerance):
+        self.dtype = np.dtype(dtype)
+        self.t_min = t_min
+        self.t_max = t_max
+        self.tolerance = tolerance
+
+    def __repr__(self):
+        return 'Precision({})'.format(self.dtype.name)
+
+
+FLOAT64 = Precision(np.float64, t_min=1e-3, t_max=1e6, tolerance=1e-11)
+# rounding errors are larger by a factor of about 2^29 (machine epsilon 1.2e-7); the larger minimum ray parameter
+# avoids self-intersections of rays leaving large spheres (like a ground sphere) at grazing angles
+FLOAT32 = Precision(np.float32, t_min=3e-3, t_max=1e6, tolerance=1e-5)
+
+
+def get_precision(precision=None):
+    """
+    Look up a precision setting by name ('float32' or 'float64') or floating-point type;
+    a `Precision` object is returned unchanged, and None selects double precision (the default).
+    """
+    if isinstance(precision, Precision):
+        return precision
+    if precision is None:
+        return FLOAT64
+    dtype = np.dtype(precision)
+    for p in (FLOAT64, FLOAT32):
+        if p.dtype == dtype:
+            return p
+    raise ValueError('unsupported precision {!r}, expecting float32 or float64'.format(precision))
@@ -0,0 +1,120 @@
+from __future__ import division
+import json
+import os
+import time
+import numpy as np
+from .wavefront import PackedScene, image_tiles, render_tile, radiance_to_image
+
+
+class ProgressiveRenderer(object):
+    """
+    Progressive renderer accumulating sample passes into a floating-point
+    radiance buffer, which can be checkpointed to disk and resumed.
+    """
+
+    def __init__(self, nx, ny, scene, camera, tile_size=32, max_depth=50, seed=None):
+        """
+        Initialize the renderer with an empty accumulation buffer.
+
+        Args:
+            nx: width of rendered image (pixels)
+            ny: height of rendered image (pixels)
+            scene: geometric scene (surface assembly of spheres, or its compiled or packed form)
+            camera: camera for generating rays
+            tile_size: edge length of the square image tiles rendered at once (pixels)
+            max_depth: how often a ray is allowed to scatter
+            seed: seed of the random number generator
+        """
+        self.nx = nx
+        self.ny = ny
+        self._packed = scene if isinstance(scene, PackedScene) else PackedScene(scene)
+        self._camera = camera
+        self.tile_size = tile_size
+        self.max_depth = max_depth
+        self.rng = np.random.default_rng(seed)
+        # summed radiance and number of samples per pixel
+        self.radiance = np.zeros((nx, ny, 3))
+        self.samples = np.zeros((nx, ny), dtype=np.int64)
+        self.passes = 0
+
+    def render_pass(self, ns=1):
+        """
+        Render an additional pass with `ns` samples per pixel and add it to the accumulation buffer.
+        """
+        for i0, i1, j0, j1 in image_tiles(self.nx, self.ny, self.tile_size):
+            col = render_tile(i0, i1, j0, j1, self.nx, self.ny, ns, self._packed, self._camera, self.max_depth, self.rng)
+            self.radiance[i0:i1, j0:j1] += ns * col
+            self.samples[i0:i1, j0:j1] += ns
+        self.passes += 1
+
+    def render(self, ns, samples_per_pass=1, checkpoint_path=None, checkpoint_interval=60.):
+        """
+        Render passes until each pixel has accumulated (at least) `ns` samples,
+        periodically saving a checkpoint.
+
+        Args:
+            ns: target number of samples (rays) per pixel
+            samples_per_pass: number of samples per pixel in each pass
+            checkpoint_path: file path of the checkpoint, or None to disable checkpointing
+            checkpoint_interval: minimum time between checkpoints (seconds)
+
+        Returns:
+            numpy.ndarray: rendered image of shape `(nx, ny, 3)`
+        """
+        last_checkpoint = time.perf_counter()
+        while self.samples.min() < ns:
+            self.render_pass(min(samples_per_pass, ns - self.samples.min()))
+            if checkpoint_path is not None and time.perf_counter() - last_checkpoint >= checkpoint_interval:
+                self.save_checkpoint(checkpoint_path)
+                last_checkpoint = time.perf_counter()
+        if checkpoint_path is not None:
+            self.save_checkpoint(checkpoint_path)
+        return self.preview()
+
+    def mean_radiance(self):
+        """Averaged radiance per pixel, of shape `(nx, ny, 3)`."""
+        return self.radiance / np.maximum(self.samples, 1)[:, :, None]
+
+    def preview(self):
+        """
+        Gamma-corrected image of the samples accumulated so far.
+
+        Returns:
+            numpy.ndarray: image of shape `(nx, ny, 3)`
+        """
+        return radiance_to_image(self.mean_radiance())
+
+    def save_checkpoint(self, path):
+        """
+        Save the accumulation buffer and random number generator state to the file `path`.
+        The file is replaced atomically, such that an interruption retains the previous checkpoint.
+        """
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f,
+                radiance=self.radiance,
+                samples=self.samples,
+                passes=self.passes,
+                settings=np.array([self.nx, self.ny, self.tile_size, self.max_depth]),
+                rng_state=json.dumps(self.rng.bit_generator.state))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def resume(cls, path, scene, camera):
+        """
+        Restore a renderer from the checkpoint file `path`.
+
+        The scene and camera are not part of the checkpoint and must agree
+        with the ones used for the original rendering.
+        """
+        with np.load(path) as data:
+            nx, ny, tile_size, max_depth = [int(x) for x in data['settings']]
+            renderer = cls(nx, ny, scene, camera, tile_size=tile_size, max_depth=max_depth)
+            renderer.radiance = data['radiance']
+            renderer.samples = data['samples']
+            renderer.passes = int(data['passes'])
+            state = json.loads(str(data['rng_state']))
+        bitgen = getattr(np.random, state['bit_generator'])()
+        bitgen.state = state
+        renderer.rng = np.random.Generator(bitgen)
+        return renderer
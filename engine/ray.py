@@ -5,6 +5,8 @@ class Ray(object):
     The direction needs not be normalized.
     """
 
+    __slots__ = ('origin', 'direction')
+
     def __init__(self, origin, direction):
         self.origin = origin
         self.direction = direction
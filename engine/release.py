@@ -0,0 +1,232 @@
+from __future__ import division
+from math import sqrt, copysign
+import numpy as np
+from . import sampling
+from .material import Lambertian, Metal, Dielectric
+from .precision import FLOAT64
+from .wavefront import compiled_geometry
+
+
+def render_image_release(nx, ny, ns, scene, camera, max_depth=50):
+    """
+    Render an image via raytracing, using the scalar "release" path.
+
+    Implements the same algorithm as `rendering.render_image`, but represents vectors
+    as Python floats instead of small numpy arrays, avoids allocating `Ray` and `HitRecord`
+    objects and runs no consistency checks. Random samples are drawn in blocks from the
+    default sample pool, such that `sampling.seed` makes the rendering reproducible.
+
+    Args:
+        nx: width of rendered image (pixels)
+        ny: height of rendered image (pixels)
+        ns: number of samples (rays) per pixel
+        scene: geometric scene (surface assembly of spheres, or its compiled form)
+        camera: camera for generating rays
+        max_depth: how often a ray is allowed to scatter
+
+    Returns:
+        numpy.ndarray: rendered image of shape `(nx, ny, 3)`
+    """
+    spheres = _pack_spheres(scene)
+    cam = _CameraParams(camera)
+    rand = _FloatSamples(sampling.default_pool())
+    im = np.zeros((nx, ny, 3), dtype=np.uint8)
+    for i in range(nx):
+        for j in range(ny):
+            r = g = b = 0.
+            for _ in range(ns):
+                # add a random offset for antialiasing
+                u = (i + rand.uniform()) / nx
+                v = (j + rand.uniform()) / ny
+                cr, cg, cb = _trace(cam.ray(u, v, rand), spheres, max_depth, rand)
+                r += cr; g += cg; b += cb
+            # take sqrt for gamma correction
+            im[i, -(j + 1)] = np.round(255 * np.sqrt(np.clip([r / ns, g / ns, b / ns], 0, 1))).astype(int)
+    return im
+
+
+# material kinds of packed spheres
+_LAMBERTIAN, _METAL, _DIELECTRIC = 0, 1, 2
+
+
+def _pack_spheres(scene):
+    """
+    Spheres as tuples `(cx, cy, cz, radius, radius^2, material kind, material parameters)` of Python floats.
+    """
+    scene = compiled_geometry(scene)
+    if len(scene) != len(scene.radii):
+        raise TypeError('release path supports only spheres')
+    materials = []
+    for mat in scene.materials:
+        params = mat.batch_parameters()
+        if isinstance(mat, Lambertian):
+            materials.append((_LAMBERTIAN, tuple(float(a) for a in params['albedo'])))
+        elif isinstance(mat, Metal):
+            materials.append((_METAL, tuple(float(a) for a in params['albedo']) + (params['fuzz'],)))
+        elif isinstance(mat, Dielectric):
+            materials.append((_DIELECTRIC, (params['ref_idx'],)))
+        else:
+            raise TypeError('release path supports only Lambertian, Metal and Dielectric materials, received {}'.format(type(mat).__name__))
+    return [(c[0], c[1], c[2], r, r*r) + materials[k]
+            for c, r, k in zip(np.asarray(scene.centers).tolist(), np.asarray(scene.radii).tolist(),
+                               np.asarray(scene.material_index).tolist())]
+
+
+class _CameraParams(object):
+    """Camera parameters as Python floats."""
+
+    __slots__ = ('origin', 'u', 'v', 'corner', 'horizontal', 'vertical', 'lens_radius')
+
+    def __init__(self, camera):
+        self.origin     = tuple(float(x) for x in camera._origin)
+        self.u          = tuple(float(x) for x in camera._u)
+        self.v          = tuple(float(x) for x in camera._v)
+        self.corner     = tuple(float(x) for x in camera._lower_left_corner)
+        self.horizontal = tuple(float(x) for x in camera._horizontal)
+        self.vertical   = tuple(float(x) for x in camera._vertical)
+        self.lens_radius = float(camera._lens_radius)
+
+    def ray(self, s, t, rand):
+        """Ray `(ox, oy, oz, dx, dy, dz)` targeting the focus window at relative coordinates `s` and `t`."""
+        ox, oy, oz = self.origin
+        # always draw the lens sample, consuming random numbers like `Camera.get_ray`
+        rx, ry = rand.in_unit_disk()
+        if self.lens_radius > 0:
+            rx *= self.lens_radius
+            ry *= self.lens_radius
+            u, v = self.u, self.v
+            ox += rx*u[0] + ry*v[0]
+            oy += rx*u[1] + ry*v[1]
+            oz += rx*u[2] + ry*v[2]
+        c, h, w = self.corner, self.horizontal, self.vertical
+        return (ox, oy, oz,
+                c[0] + s*h[0] + t*w[0] - ox,
+                c[1] + s*h[1] + t*w[1] - oy,
+                c[2] + s*h[2] + t*w[2] - oz)
+
+
+class _FloatSamples(object):
+    """
+    Random samples as Python floats, drawn in blocks from a `SamplePool`.
+    """
+
+    __slots__ = ('_pool', '_uniform', '_disk', '_sphere')
+
+    def __init__(self, pool):
+        self._pool = pool
+        self._uniform = []
+        self._disk = []
+        self._sphere = []
+
+    def uniform(self):
+        if not self._uniform:
+            self._uniform = self._pool.uniform(self._pool.size).tolist()[::-1]
+        return self._uniform.pop()
+
+    def in_unit_disk(self):
+        if not self._disk:
+            self._disk = self._pool.in_unit_disk(self._pool.size).tolist()[::-1]
+        return self._disk.pop()
+
+    def in_unit_sphere(self):
+        if not self._sphere:
+            self._sphere = self._pool.in_unit_sphere(self._pool.size).tolist()[::-1]
+        return self._sphere.pop()
+
+
+def _trace(ray, spheres, max_depth, rand):
+    """
+    Trace a ray `(ox, oy, oz, dx, dy, dz)` through the scene and return its color as tuple of floats.
+    """
+    ox, oy, oz, dx, dy, dz = ray
+    # interval of ray parameters considered for intersections, as local variables for fast access
+    t_min = FLOAT64.t_min
+    t_far = FLOAT64.t_max
+    # accumulated attenuation along the path
+    ar = ag = ab = 1.
+    for depth in range(max_depth + 1):
+        # closest hit
+        a = dx*dx + dy*dy + dz*dz
+        t_max = t_far
+        hit = None
+        for sph in spheres:
+            ocx = ox - sph[0]
+            ocy = oy - sph[1]
+            ocz = oz - sph[2]
+            b = ocx*dx + ocy*dy + ocz*dz
+            c = ocx*ocx + ocy*ocy + ocz*ocz - sph[4]
+            discriminant = b*b - a*c
+            if discriminant > 0:
+                # numerically stable solutions of the quadratic equation
+                t1 = -(b + copysign(sqrt(discriminant), b)) / a
+                t2 = c / (a * t1)
+                if t1 > t2:
+                    t1, t2 = t2, t1
+                if t_min <= t1 < t_max:
+                    t_max = t1
+                    hit = sph
+                elif t_min <= t2 < t_max:
+                    t_max = t2
+                    hit = sph
+        nd = sqrt(a)
+        if hit is None:
+            # sky color
+            t = 0.5*(dy/nd + 1)
+            return (ar*(1 - 0.5*t), ag*(1 - 0.3*t), ab)
+        if depth == max_depth:
+            break
+        px = ox + t_max*dx
+        py = oy + t_max*dy
+        pz = oz + t_max*dz
+        r = hit[3]
+        nx = (px - hit[0]) / r
+        ny = (py - hit[1]) / r
+        nz = (pz - hit[2]) / r
+        kind = hit[5]
+        params = hit[6]
+        if kind == _LAMBERTIAN:
+            sx, sy, sz = rand.in_unit_sphere()
+            dx, dy, dz = nx + sx, ny + sy, nz + sz
+            ar *= params[0]; ag *= params[1]; ab *= params[2]
+        elif kind == _METAL:
+            ux, uy, uz = dx/nd, dy/nd, dz/nd
+            dn = 2*(ux*nx + uy*ny + uz*nz)
+            fuzz = params[3]
+            sx, sy, sz = rand.in_unit_sphere()
+            dx = ux - dn*nx + fuzz*sx
+            dy = uy - dn*ny + fuzz*sy
+            dz = uz - dn*nz + fuzz*sz
+            if dx*nx + dy*ny + dz*nz <= 0:
+                # absorbed
+                break
+            ar *= params[0]; ag *= params[1]; ab *= params[2]
+        else:
+            ref_idx = params[0]
+            ux, uy, uz = dx/nd, dy/nd, dz/nd
+            cosine = ux*nx + uy*ny + uz*nz
+            rx, ry, rz = ux - 2*cosine*nx, uy - 2*cosine*ny, uz - 2*cosine*nz
+            if cosine > 0:
+                # exiting the medium
+                mx, my, mz = -nx, -ny, -nz
+                ni_over_nt = ref_idx
+            else:
+                mx, my, mz = nx, ny, nz
+                ni_over_nt = 1.0 / ref_idx
+                cosine = -cosine
+            dt = ux*mx + uy*my + uz*mz
+            discriminant = 1 - ni_over_nt**2 * (1 - dt**2)
+            if discriminant > 0:
+                r0 = ((1 - ref_idx) / (1 + ref_idx))**2
+                reflect_prob = r0 + (1 - r0) * (1 - cosine)**5
+            else:
+                reflect_prob = 1.0
+            # randomly choose between reflection or refraction
+            if rand.uniform() < reflect_prob:
+                dx, dy, dz = rx, ry, rz
+            else:
+                sq = sqrt(discriminant)
+                dx = ni_over_nt*(ux - mx*dt) - sq*mx
+                dy = ni_over_nt*(uy - my*dt) - sq*my
+                dz = ni_over_nt*(uz - mz*dt) - sq*mz
+        ox, oy, oz = px, py, pz
+    return (0., 0., 0.)
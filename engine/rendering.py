@@ -1,9 +1,17 @@
 from __future__ import division
+import time
+import warnings
 import numpy as np
-from utils import unit_vector
+from .utils import unit_vector, random_uniform
+from . import instrumentation
+from .precision import FLOAT64
+from . import sampling
+from .release import render_image_release
+from .wavefront import render_image_wavefront, radiance_to_image
 
 
-def render_image(nx, ny, ns, scene, camera):
+def render_image(nx, ny, ns, scene, camera, max_depth=50, roulette_depth=None, roulette_max_survival=0.95,
+                 stats=False, backend='python'):
     """
     Render an image via raytracing.
 
@@ -13,10 +21,45 @@ def render_image(nx, ny, ns, scene, camera):
         ns: number of samples (rays) per pixel
         scene: geometric scene
         camera: camera for generating rays
+        max_depth: how often a ray is allowed to scatter
+        roulette_depth: number of scatterings after which paths are terminated by Russian roulette,
+            or None to disable Russian roulette
+        roulette_max_survival: upper bound on the survival probability in Russian roulette
+        stats: whether to collect rendering statistics (see `instrumentation.RenderStats`)
+        backend: implementation used for rendering:
+            'python' for this reference implementation,
+            'release' for the faster scalar path of `release.render_image_release`,
+            'numpy' for the vectorized `wavefront.render_image_wavefront`,
+            'numba' for the compiled kernels of `kernels.render_image_numba` (falls back to 'numpy'
+            if Numba is not installed); all but 'python' support neither Russian roulette nor
+            statistics, and 'numpy' and 'numba' draw their seed from the default sample pool
 
     Returns:
-        numpy.ndarray: rendered image of shape `(nx, ny, 3)`
+        numpy.ndarray: rendered image of shape `(nx, ny, 3)`,
+        or tuple of the image and the rendering statistics if `stats` is True
     """
+    if backend != 'python':
+        if roulette_depth is not None or stats:
+            raise ValueError("backend '{}' supports neither Russian roulette nor statistics".format(backend))
+        if backend == 'numba':
+            # imported on demand, since importing numba takes a sizable fraction of a second
+            from . import kernels
+            if not kernels.have_numba():
+                warnings.warn('numba is not installed, using the numpy backend instead')
+                backend = 'numpy'
+        if backend == 'release':
+            return render_image_release(nx, ny, ns, scene, camera, max_depth)
+        seed = int(sampling.default_pool().rng.integers(1 << 31))
+        if backend == 'numpy':
+            return render_image_wavefront(nx, ny, ns, scene, camera, max_depth=max_depth, rng=np.random.default_rng(seed))
+        if backend == 'numba':
+            return radiance_to_image(kernels.render_image_numba(nx, ny, ns, scene, camera, max_depth, seed))
+        raise ValueError("unknown backend '{}'".format(backend))
+    if stats:
+        with instrumentation.collect() as rs, rs.tile((0, nx, 0, ny)):
+            im = render_image(nx, ny, ns, scene, camera, max_depth, roulette_depth, roulette_max_survival)
+        return (im, rs)
+    rs = instrumentation.current
     # fill image pixels
     im = np.zeros((nx, ny, 3), dtype=np.uint8)
     for i in range(nx):
@@ -24,14 +67,18 @@ def render_image(nx, ny, ns, scene, camera):
             col = np.zeros(3)
             for s in range(ns):
                 # add a random offset for antialiasing
-                u = (i + np.random.rand()) / nx
-                v = (j + np.random.rand()) / ny
+                u = (i + random_uniform()) / nx
+                v = (j + random_uniform()) / ny
+                if rs is not None:
+                    tstart = time.perf_counter()
                 ray = camera.get_ray(u, v)
-                col += ray_color(ray, scene, 50)
+                if rs is not None:
+                    rs.add_time('camera', tstart)
+                col += trace_path(ray, scene, max_depth, roulette_depth, roulette_max_survival)
             col /= ns
 
             # take sqrt for gamma correction
-            im[i, -(j + 1)] = np.round(255 * np.sqrt(col)).astype(int)
+            im[i, -(j + 1)] = np.round(255 * np.sqrt(np.clip(col, 0, 1))).astype(int)
 
     return im
 
@@ -48,7 +95,7 @@ def ray_color(ray, scene, depth):
     Returns:
         numpy.ndarray: ray color as RGB values
     """
-    rec, _ = scene.hit(ray, 0.001, 1e6)
+    rec, _ = scene.hit(ray, FLOAT64.t_min, FLOAT64.t_max)
     if rec is not None:
         scattered, attenuation = rec.material.scatter(ray, rec)
         if depth > 0 and scattered is not None:
@@ -58,7 +105,73 @@ def ray_color(ray, scene, depth):
         else:
             return np.zeros(3)
     else:
-        # blue background sky
-        unitdir = unit_vector(ray.direction)
-        t = 0.5*(unitdir[1] + 1)
-        return (1 - t)*np.array([1.0, 1.0, 1.0]) + t*np.array([0.5, 0.7, 1.0])
+        return sky_color(ray.direction)
+
+
+def trace_path(ray, scene, max_depth=50, roulette_depth=None, roulette_max_survival=0.95):
+    """
+    Perform ray tracing iteratively and return color of ray.
+
+    Equivalent to `ray_color(ray, scene, max_depth)` if Russian roulette is disabled.
+    Otherwise, after `roulette_depth` scatterings, a path survives each further scattering
+    only with probability given by the maximum entry of its accumulated attenuation
+    (bounded by `roulette_max_survival`), and surviving paths are reweighted accordingly,
+    such that the expected color is unchanged.
+
+    Args:
+        ray: to-be traced ray
+        scene: geometric scene
+        max_depth: how often the ray is allowed to scatter
+        roulette_depth: number of scatterings after which Russian roulette is applied,
+            or None to disable Russian roulette
+        roulette_max_survival: upper bound on the survival probability
+
+    Returns:
+        numpy.ndarray: ray color as RGB values
+    """
+    rs = instrumentation.current
+    # accumulated attenuation along the path
+    throughput = np.ones(3)
+    for depth in range(max_depth + 1):
+        if rs is not None:
+            rs.add_rays(depth)
+            tstart = time.perf_counter()
+        rec, _ = scene.hit(ray, FLOAT64.t_min, FLOAT64.t_max)
+        if rs is not None:
+            rs.add_time('intersection', tstart)
+        if rec is None:
+            if rs is not None:
+                rs.escaped_paths += 1
+            return throughput * sky_color(ray.direction)
+        if depth == max_depth:
+            if rs is not None:
+                rs.terminated_paths += 1
+            break
+        if rs is not None:
+            tstart = time.perf_counter()
+        scattered, attenuation = rec.material.scatter(ray, rec)
+        if rs is not None:
+            rs.add_time('scatter', tstart)
+        if scattered is None:
+            if rs is not None:
+                rs.absorbed_paths += 1
+            break
+        throughput = throughput * attenuation
+        if roulette_depth is not None and depth >= roulette_depth:
+            survival = min(np.max(throughput), roulette_max_survival)
+            if random_uniform() >= survival:
+                if rs is not None:
+                    rs.terminated_paths += 1
+                break
+            throughput = throughput / survival
+        ray = scattered
+    return np.zeros(3)
+
+
+def sky_color(direction):
+    """
+    Color of the blue background sky in direction `direction`.
+    """
+    unitdir = unit_vector(direction)
+    t = 0.5*(unitdir[1] + 1)
+    return (1 - t)*np.array([1.0, 1.0, 1.0]) + t*np.array([0.5, 0.7, 1.0])
@@ -0,0 +1,287 @@
+from __future__ import division
+import numpy as np
+from abc import ABCMeta, abstractmethod
+
+
+# sample dimensions of a path: antialiasing offset within the pixel (0, 1), lens position (2, 3),
+# then a fixed number of dimensions per bounce (scattering direction or reflect/refract decision)
+BOUNCE_DIM = 4
+DIMS_PER_BOUNCE = 4
+
+
+class Sampler(object):
+    """
+    Sampling strategy, assigning to each sample of a pixel a point in the unit hypercube,
+    whose coordinates (dimensions) are consumed by the path tracer in a fixed order
+    (see `PathSamples`).
+
+    Samplers are stateless: a sample value is a deterministic function of the seed,
+    the dimension, the pixel and the sample index, such that rendering is reproducible
+    independent of how paths are batched.
+    """
+    __metaclass__  = ABCMeta
+
+    def __init__(self, seed=0):
+        self.seed = seed
+
+    @abstractmethod
+    def sample(self, dim, pixel, index):
+        """
+        Sample values in `[0, 1)` of dimension `dim`.
+
+        Args:
+            dim: sample dimension
+            pixel: pixel indices, integer array
+            index: sample indices within the pixel, integer array of the same length
+
+        Returns:
+            numpy.ndarray: sample values
+        """
+
+    def tile_samples(self, i0, i1, j0, j1, ny, ns):
+        """
+        Samples of the paths of an image tile, in the order of `Camera.get_pixel_rays`.
+        """
+        i, j = np.meshgrid(np.arange(i0, i1), np.arange(j0, j1), indexing='ij')
+        pixel = np.repeat((i*ny + j).reshape(-1), ns)
+        index = np.tile(np.arange(ns), i.size)
+        return PathSamples(self, pixel, index)
+
+
+class PathSamples(object):
+    """
+    Sample values of a batch of paths, drawn dimension by dimension.
+
+    Provides the `random` method of `numpy.random.Generator` for sizes `n` (one dimension)
+    and `(k, n)` (`k` consecutive dimensions), such that it can be passed in place of a
+    random number generator to camera ray generation and the batched scatter kernels.
+    """
+
+    def __init__(self, sampler, pixel, index, dim=0):
+        self.sampler = sampler
+        self.pixel = pixel
+        self.index = index
+        # next unused dimension
+        self.dim = dim
+
+    def __len__(self):
+        return len(self.pixel)
+
+    def select(self, paths, dim=None):
+        """Samples of the subset `paths` (index array or slice), continuing at dimension `dim` (current one by default)."""
+        return PathSamples(self.sampler, self.pixel[paths], self.index[paths], self.dim if dim is None else dim)
+
+    def bounce(self, paths, depth):
+        """Samples of the subset `paths`, starting at the dimensions of bounce `depth`."""
+        return self.select(paths, BOUNCE_DIM + DIMS_PER_BOUNCE*depth)
+
+    def random(self, size):
+        shape = (size,) if np.ndim(size) == 0 else tuple(size)
+        if shape[-1] != len(self.pixel) or len(shape) > 2:
+            raise ValueError('sample size must be (number of paths) or (number of dimensions, number of paths)')
+        k = shape[0] if len(shape) == 2 else 1
+        u = np.array([self.sampler.sample(self.dim + d, self.pixel, self.index) for d in range(k)])
+        self.dim += k
+        return u.reshape(shape)
+
+
+class IndependentSampler(Sampler):
+    """
+    Independent uniform random samples (plain Monte Carlo).
+    """
+
+    def sample(self, dim, pixel, index):
+        return _to_unit(_hash(self.seed, dim, pixel, index))
+
+
+class StratifiedSampler(Sampler):
+    """
+    Stratified samples for `ns` samples per pixel: pairs of dimensions form jittered grids
+    if `ns` is a square number, otherwise each dimension is stratified separately
+    (Latin hypercube). Strata are assigned to sample indices by a random permutation
+    per pixel and dimension (pair), such that dimensions are uncorrelated.
+    """
+
+    def __init__(self, ns, seed=0):
+        super(StratifiedSampler, self).__init__(seed)
+        self.ns = ns
+        self._m = int(round(np.sqrt(ns)))
+
+    def sample(self, dim, pixel, index):
+        jitter = _to_unit(_hash(self.seed, dim, pixel, index))
+        if self._m**2 == self.ns:
+            # jittered grid shared by the dimensions (2 d, 2 d + 1)
+            cell = _permute(index, self.ns, _hash(self.seed, 0x5f3759df, dim // 2, pixel))
+            stratum = cell % self._m if dim % 2 == 0 else cell // self._m
+            return (stratum + jitter) / self._m
+        stratum = _permute(index, self.ns, _hash(self.seed, 0x5f3759df, dim, pixel))
+        return (stratum + jitter) / self.ns
+
+
+class HaltonSampler(Sampler):
+    """
+    Halton sequence (radical inverse in the `dim`-th prime base) over the sample indices of a pixel,
+    with random digit permutations per dimension and a random toroidal shift per pixel and dimension
+    for decorrelating neighboring pixels.
+    """
+
+    def __init__(self, seed=0):
+        super(HaltonSampler, self).__init__(seed)
+        self._primes = []
+        self._digit_perms = []
+
+    def sample(self, dim, pixel, index):
+        while len(self._primes) <= dim:
+            self._extend()
+        base = self._primes[dim]
+        perm = self._digit_perms[dim]
+        index = np.asarray(index, dtype=np.int64)
+        value = np.zeros(len(index))
+        inv_base = 1. / base
+        scale = inv_base
+        while np.any(index > 0):
+            value += perm[index % base] * scale
+            index = index // base
+            scale *= inv_base
+        # permuted zero digits of the infinite tail
+        value += perm[0] * scale / (1 - inv_base)
+        shift = _to_unit(_hash(self.seed, dim, pixel))
+        value += shift
+        value -= np.floor(value)
+        # guard against rounding up to 1
+        return np.minimum(value, 1 - 2.**-53)
+
+    def _extend(self):
+        n = len(self._primes)
+        p = self._primes[-1] + 1 if n > 0 else 2
+        while any(p % q == 0 for q in self._primes if q*q <= p):
+            p += 1
+        self._primes.append(p)
+        rng = np.random.default_rng(np.random.SeedSequence(self.seed, spawn_key=(n,)))
+        self._digit_perms.append(rng.permutation(p))
+
+
+class SobolSampler(Sampler):
+    """
+    Scrambled two-dimensional Sobol sequence per pair of dimensions, with Owen scrambling
+    per pixel and dimension, and the sample indices shuffled per pixel and pair of dimensions
+    for decorrelating the pairs (following Burley, "Practical hash-based Owen scrambling", 2020).
+    Best suited for numbers of samples per pixel that are powers of 2.
+    """
+
+    def sample(self, dim, pixel, index):
+        pair = dim // 2
+        shuffled = _nested_uniform_scramble(np.asarray(index, dtype=np.uint32), _hash(self.seed, pair, pixel))
+        x = _sobol_2d(shuffled, dim % 2)
+        return _to_unit(_nested_uniform_scramble(x, _hash(self.seed, 0x68e31da4, dim, pixel)))
+
+
+def _hash(*keys):
+    """Hash of integer keys (scalars or arrays) to 32-bit unsigned integers."""
+    h = np.uint32(0x9e3779b9)
+    for key in keys:
+        if isinstance(key, int):
+            key &= 0xffffffff
+        h = _mix(h ^ np.asarray(np.asarray(key, dtype=np.int64) & 0xffffffff, dtype=np.uint32))
+    return h
+
+
+def _mix(x):
+    # integer hash function by Chris Wellons ("lowbias32")
+    x = np.atleast_1d(np.asarray(x, dtype=np.uint32))
+    x = x ^ (x >> np.uint32(16))
+    x = x * np.uint32(0x7feb352d)
+    x = x ^ (x >> np.uint32(15))
+    x = x * np.uint32(0x846ca68b)
+    x = x ^ (x >> np.uint32(16))
+    return x
+
+
+def _to_unit(x):
+    """Map 32-bit unsigned integers to `[0, 1)`."""
+    return np.asarray(x, dtype=np.uint32) * 2.**-32
+
+
+def _permute(i, n, p):
+    """
+    Random permutation of `[0, n)` applied to `i`, identified by the (per-element) key `p`
+    (Kensler, "Correlated multi-jittered sampling", 2013).
+    """
+    i = np.array(np.broadcast_to(i, np.shape(p)), dtype=np.uint32)
+    p = np.asarray(p, dtype=np.uint32)
+    w = np.uint32(n - 1)
+    for s in [1, 2, 4, 8, 16]:
+        w |= w >> np.uint32(s)
+    out = np.empty_like(i)
+    todo = np.arange(len(i))
+    while len(todo) > 0:
+        # cycle walking: repeat the bijection of [0, w] until the result lies in [0, n)
+        i[todo] = _permute_round(i[todo], p[todo], w)
+        done = i[todo] < n
+        out[todo[done]] = i[todo[done]]
+        todo = todo[~done]
+    return (out + p % np.uint32(n)) % np.uint32(n)
+
+
+def _permute_round(i, p, w):
+    u = np.uint32
+    i = i ^ p
+    i = i * u(0xe170893d)
+    i = i ^ (p >> u(16))
+    i = i ^ ((i & w) >> u(4))
+    i = i ^ (p >> u(8))
+    i = i * u(0x0929eb3f)
+    i = i ^ (p >> u(23))
+    i = i ^ ((i & w) >> u(1))
+    i = i * (u(1) | (p >> u(27)))
+    i = i * u(0x6935fa69)
+    i = i ^ ((i & w) >> u(11))
+    i = i * u(0x74dcb303)
+    i = i ^ ((i & w) >> u(2))
+    i = i * u(0x9e501cc3)
+    i = i ^ ((i & w) >> u(2))
+    i = i * u(0xc860a3df)
+    i = i & w
+    i = i ^ (i >> u(5))
+    return i
+
+
+def _reverse_bits(x):
+    x = np.asarray(x, dtype=np.uint32)
+    u = np.uint32
+    x = ((x >> u(1)) & u(0x55555555)) | ((x & u(0x55555555)) << u(1))
+    x = ((x >> u(2)) & u(0x33333333)) | ((x & u(0x33333333)) << u(2))
+    x = ((x >> u(4)) & u(0x0f0f0f0f)) | ((x & u(0x0f0f0f0f)) << u(4))
+    x = ((x >> u(8)) & u(0x00ff00ff)) | ((x & u(0x00ff00ff)) << u(8))
+    return (x >> u(16)) | (x << u(16))
+
+
+def _nested_uniform_scramble(x, seed):
+    """Owen scrambling of the bits of `x` (most significant bit first), using a hash-based permutation."""
+    u = np.uint32
+    x = _reverse_bits(x)
+    # Laine-Karras permutation
+    x = x + seed
+    x = x ^ (x * u(0x6c50b47c))
+    x = x ^ (x * u(0xb82f1e52))
+    x = x ^ (x * u(0xc7afe638))
+    x = x ^ (x * u(0x8d22f6e6))
+    return _reverse_bits(x)
+
+
+# generator matrix columns of the second Sobol dimension
+_SOBOL_V = [np.uint32(1 << 31)]
+for _ in range(31):
+    _SOBOL_V.append(_SOBOL_V[-1] ^ (_SOBOL_V[-1] >> np.uint32(1)))
+
+
+def _sobol_2d(index, dim):
+    """Dimension `dim` (0 or 1) of the Sobol sequence as 32-bit fixed-point values."""
+    index = np.asarray(index, dtype=np.uint32)
+    if dim == 0:
+        # van der Corput sequence
+        return _reverse_bits(index)
+    x = np.zeros_like(index)
+    for j in range(32):
+        x ^= np.where((index >> np.uint32(j)) & np.uint32(1), _SOBOL_V[j], np.uint32(0))
+    return x
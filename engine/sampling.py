@@ -0,0 +1,106 @@
+from __future__ import division
+import numpy as np
+
+
+def stream(seed, *key):
+    """
+    Independent random number generator identified by `seed` and an optional key
+    (like a worker or tile index), such that streams can be reproduced across processes.
+    """
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=tuple(key)))
+
+
+def spawn_streams(seed, n):
+    """Generate `n` independent random number generators derived from `seed`."""
+    return [stream(seed, k) for k in range(n)]
+
+
+def in_unit_disk(rng, n, dtype=np.float64):
+    """
+    Generate `n` uniformly random points within the unit disk, using the generator `rng`.
+
+    Returns:
+        numpy.ndarray: points of shape `(n, 2)` and floating-point type `dtype`
+    """
+    # direct sampling in polar coordinates; uniform samples are drawn in double precision
+    # and rounded, such that both precisions consume the same random numbers
+    u = rng.random((2, n)).astype(dtype, copy=False)
+    r = np.sqrt(u[0])
+    phi = 2*np.pi*u[1]
+    return np.column_stack((r*np.cos(phi), r*np.sin(phi)))
+
+
+def in_unit_sphere(rng, n, dtype=np.float64):
+    """
+    Generate `n` uniformly random points within the unit sphere, using the generator `rng`.
+
+    Returns:
+        numpy.ndarray: points of shape `(n, 3)` and floating-point type `dtype`
+    """
+    # uniformly random direction (uniform height and azimuthal angle)
+    # scaled by radius distributed according to r^2
+    u = rng.random((3, n)).astype(dtype, copy=False)
+    z = 1 - 2*u[0]
+    phi = 2*np.pi*u[1]
+    rxy = np.sqrt(np.maximum(1 - z**2, 0))
+    r = np.cbrt(u[2])
+    return np.column_stack((rxy*np.cos(phi), rxy*np.sin(phi), z)) * r[:, None]
+
+
+class SamplePool(object):
+    """
+    Pool of pre-generated random samples, handed out in small portions
+    (like single samples in the scalar ray tracing path) and refilled in bulk.
+    """
+
+    def __init__(self, rng=None, size=4096):
+        """
+        Args:
+            rng: random number generator (`numpy.random.Generator`)
+            size: number of samples generated per refill
+        """
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.size = size
+        # per sample type: pre-generated samples and position of next unused sample
+        self._pools = {}
+
+    def uniform(self, n=None):
+        """Uniformly random number in `[0, 1)`, or `n` such numbers."""
+        return self._draw('uniform', lambda rng, m: rng.random(m), n)
+
+    def in_unit_disk(self, n=None):
+        """Uniformly random point within the unit disk, or `n` such points."""
+        return self._draw('disk', in_unit_disk, n)
+
+    def in_unit_sphere(self, n=None):
+        """Uniformly random point within the unit sphere, or `n` such points."""
+        return self._draw('sphere', in_unit_sphere, n)
+
+    def _draw(self, name, generate, n):
+        m = 1 if n is None else n
+        pool = self._pools.get(name)
+        if pool is None or pool[1] + m > len(pool[0]):
+            pool = [generate(self.rng, max(self.size, m)), 0]
+            self._pools[name] = pool
+        samples, pos = pool
+        pool[1] = pos + m
+        if n is None:
+            return samples[pos]
+        return samples[pos:pos + m]
+
+
+# default pool used by the scalar ray tracing path
+_default_pool = SamplePool()
+
+
+def default_pool():
+    """Sample pool used by the scalar ray tracing functions."""
+    return _default_pool
+
+
+def seed(s=None):
+    """
+    Reseed the default sample pool, for reproducible scalar ray tracing.
+    """
+    global _default_pool
+    _default_pool = SamplePool(np.random.default_rng(s), _default_pool.size)
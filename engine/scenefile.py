@@ -0,0 +1,169 @@
+import json
+import struct
+import numpy as np
+from .surface import SurfaceAssembly, CompiledSurfaceAssembly
+from .material import Lambertian, Metal, Dielectric
+
+
+# file layout: magic, header length (uint32, little endian), JSON header, padding, binary arrays
+MAGIC = b'RTSCENE\x00'
+VERSION = 1
+# alignment of the binary arrays within the file (bytes)
+ALIGNMENT = 64
+
+# material type codes in the material table
+MATERIAL_CODES = {Lambertian: 0, Metal: 1, Dielectric: 2}
+
+# stored arrays: name, data type, shape per sphere or material (trailing dimensions)
+_SPHERE_ARRAYS   = [('centers', '<f8', (3,)), ('radii', '<f8', ()), ('material_index', '<i4', ())]
+_MATERIAL_ARRAYS = [('material_type', 'u1', ()), ('albedo', '<f8', (3,)), ('fuzz', '<f8', ()), ('ref_idx', '<f8', ())]
+
+
+class MappedSurfaceAssembly(CompiledSurfaceAssembly):
+    """
+    Compiled surface assembly whose sphere arrays are memory-mapped from a scene file
+    (see `load_scene`).
+
+    When pickled (e.g., for transfer to worker processes), only the file path is stored,
+    and the receiving process maps the same file, such that the geometry is shared via the page cache.
+    """
+
+    def __init__(self, path, centers, radii, material_index, materials):
+        self.path = path
+        self.centers = centers
+        self.radii = radii
+        self.material_index = material_index
+        self.materials = materials
+
+    def __reduce__(self):
+        return (load_scene, (self.path,))
+
+
+def write_scene(path, centers, radii, material_index, materials):
+    """
+    Write a scene of spheres given as arrays to a file.
+
+    Allows to create large scenes without constructing individual `Sphere` objects.
+
+    Args:
+        path: file path
+        centers: sphere centers, array of shape `(n, 3)`
+        radii: sphere radii, array of shape `(n,)`
+        material_index: index into `materials` per sphere, array of shape `(n,)`
+        materials: list of `Lambertian`, `Metal` or `Dielectric` materials
+    """
+    n = len(radii)
+    table = material_table(materials)
+    data = {
+        'centers': np.reshape(centers, (n, 3)),
+        'radii': np.reshape(radii, (n,)),
+        'material_index': np.reshape(material_index, (n,)),
+    }
+    if n > 0 and (np.min(data['material_index']) < 0 or np.max(data['material_index']) >= len(materials)):
+        raise ValueError('material indices must refer to entries of the material table')
+    data.update(table)
+    arrays = {}
+    offset = 0
+    for name, dtype, shape in _SPHERE_ARRAYS + _MATERIAL_ARRAYS:
+        count = n if name in ('centers', 'radii', 'material_index') else len(materials)
+        arrays[name] = {'dtype': dtype, 'shape': [count] + list(shape), 'offset': offset}
+        offset += _aligned(count * int(np.prod(shape, dtype=int)) * np.dtype(dtype).itemsize)
+    header = json.dumps({
+        'version': VERSION,
+        'num_spheres': n,
+        'num_materials': len(materials),
+        'arrays': arrays,
+    }).encode('utf-8')
+    data_start = _aligned(len(MAGIC) + 4 + len(header))
+    with open(path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<I', len(header)))
+        f.write(header)
+        for name, dtype, _ in _SPHERE_ARRAYS + _MATERIAL_ARRAYS:
+            f.seek(data_start + arrays[name]['offset'])
+            f.write(np.ascontiguousarray(data[name], dtype=dtype).tobytes())
+        # pad file to full length, such that the last array can be mapped
+        f.truncate(data_start + offset)
+
+
+def save_scene(path, scene):
+    """
+    Export a surface assembly of spheres (or its compiled form) to a scene file.
+    """
+    if isinstance(scene, SurfaceAssembly):
+        scene = scene.compile()
+    if len(scene) != len(scene.radii):
+        raise TypeError('scene files support only spheres')
+    write_scene(path, scene.centers, scene.radii, scene.material_index, scene.materials)
+
+
+def load_scene(path):
+    """
+    Load a scene file.
+
+    The sphere arrays are memory-mapped read-only instead of being read into memory,
+    such that even very large scenes open instantly.
+
+    Returns:
+        MappedSurfaceAssembly: drop-in replacement of a compiled surface assembly,
+            usable by all renderers and `BVH`
+    """
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError("'{}' is not a scene file".format(path))
+        header_len, = struct.unpack('<I', f.read(4))
+        header = json.loads(f.read(header_len).decode('utf-8'))
+    if header['version'] > VERSION:
+        raise ValueError('unsupported scene file version {}'.format(header['version']))
+    data_start = _aligned(len(MAGIC) + 4 + header_len)
+    arrays = {}
+    for name, info in header['arrays'].items():
+        shape = tuple(info['shape'])
+        if shape[0] == 0:
+            # empty arrays cannot be memory-mapped
+            arrays[name] = np.zeros(shape, dtype=info['dtype'])
+        else:
+            arrays[name] = np.memmap(path, dtype=info['dtype'], mode='r', offset=data_start + info['offset'], shape=shape)
+    materials = _materials_from_table(arrays)
+    return MappedSurfaceAssembly(path, arrays['centers'], arrays['radii'], arrays['material_index'], materials)
+
+
+def material_table(materials):
+    """
+    Parameters of Lambertian, metal and dielectric materials as arrays: 'material_type' (see `MATERIAL_CODES`),
+    'albedo', 'fuzz' and 'ref_idx', with zeros where a parameter does not apply to the material type.
+    """
+    m = len(materials)
+    table = {
+        'material_type': np.zeros(m, dtype=np.uint8),
+        'albedo': np.zeros((m, 3)),
+        'fuzz': np.zeros(m),
+        'ref_idx': np.zeros(m),
+    }
+    for k, mat in enumerate(materials):
+        if type(mat) not in MATERIAL_CODES:
+            raise TypeError('scene files support only Lambertian, Metal and Dielectric materials, received {}'.format(type(mat).__name__))
+        table['material_type'][k] = MATERIAL_CODES[type(mat)]
+        params = mat.batch_parameters()
+        for key, value in params.items():
+            table[key][k] = value
+    return table
+
+
+def _materials_from_table(arrays):
+    """Construct the material objects from the stored material table."""
+    materials = []
+    for k, code in enumerate(arrays['material_type']):
+        if code == MATERIAL_CODES[Lambertian]:
+            materials.append(Lambertian(np.array(arrays['albedo'][k])))
+        elif code == MATERIAL_CODES[Metal]:
+            materials.append(Metal(np.array(arrays['albedo'][k]), float(arrays['fuzz'][k])))
+        elif code == MATERIAL_CODES[Dielectric]:
+            materials.append(Dielectric(float(arrays['ref_idx'][k])))
+        else:
+            raise ValueError('invalid material type code {}'.format(code))
+    return materials
+
+
+def _aligned(nbytes):
+    return -(-nbytes // ALIGNMENT) * ALIGNMENT
@@ -0,0 +1,560 @@
+from __future__ import division
+import argparse
+import asyncio
+import base64
+import hashlib
+import heapq
+import itertools
+import json
+import numbers
+import os
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from .surface import SurfaceAssembly, Sphere
+from .material import Lambertian, Metal, Dielectric
+from .camera import Camera
+from .bvh import BVH
+from .sampling import stream
+from .wavefront import PackedScene, image_tiles, render_tile, gamma_encode
+from .parallel import mp_context
+from .precision import get_precision
+
+
+# material types of scene specifications, and their constructor arguments
+MATERIAL_TYPES = {
+    'lambertian': (Lambertian, ['albedo']),
+    'metal':      (Metal,      ['albedo', 'fuzz']),
+    'dielectric': (Dielectric, ['ref_idx']),
+}
+
+
+class RenderJob(object):
+    """
+    Render job of a `RenderService`, receiving the finished tiles as events.
+
+    Attributes:
+        id: job identifier
+        spec: job specification (see `RenderService.submit`)
+        priority: jobs with higher priority are rendered first
+        status: 'queued', 'running', 'done', 'cancelled' or 'failed'
+    """
+
+    def __init__(self, job_id, spec):
+        self.id = job_id
+        self.spec = spec
+        self.priority = spec.get('priority', 0)
+        self.status = 'queued'
+        self.nx = spec['nx']
+        self.ny = spec['ny']
+        self.tiles = image_tiles(self.nx, self.ny, spec.get('tile_size', 32))
+        # tiles not yet dispatched to the worker pool, and number of unfinished tiles
+        self.pending = deque(enumerate(self.tiles))
+        self.remaining = len(self.tiles)
+        self.scene_key = _digest([spec['scene'], spec.get('precision', 'float64')])
+        # events: ('tile', tile, pixels), ('done',), ('cancelled',) or ('failed', message)
+        self.events = asyncio.Queue()
+
+    @property
+    def finished(self):
+        return self.status in ('done', 'cancelled', 'failed')
+
+    async def stream(self):
+        """
+        Asynchronously iterate over the finished tiles as `(tile, pixels)`, where `tile = (i0, i1, j0, j1)`
+        and `pixels` are the gamma-corrected 8-bit colors of shape `(i1 - i0, j1 - j0, 3)` (before flipping
+        the vertical axis, see `wavefront.radiance_to_image`), in order of completion.
+
+        The iteration ends once the job is done or cancelled; a failed job raises a `RuntimeError`.
+        """
+        while True:
+            event = await self.events.get()
+            if event[0] == 'tile':
+                yield event[1:]
+            elif event[0] == 'failed':
+                raise RuntimeError('render job {} failed: {}'.format(self.id, event[1]))
+            else:
+                return
+
+    async def result(self):
+        """
+        Wait for all tiles and return the rendered image of shape `(nx, ny, 3)`,
+        like `rendering.render_image`, or None if the job was cancelled.
+        """
+        im = np.zeros((self.nx, self.ny, 3), dtype=np.uint8)
+        async for (i0, i1, j0, j1), pixels in self.stream():
+            im[i0:i1, j0:j1] = pixels
+        if self.status == 'cancelled':
+            return None
+        return im[:, ::-1]
+
+
+class RenderService(object):
+    """
+    Long-running render service, which renders queued jobs tile by tile on a persistent
+    pool of worker processes and streams the finished tiles back.
+
+    Jobs are rendered in order of priority (and submission). At most `lookahead` tiles per worker
+    are dispatched at once, such that a newly submitted job with higher priority starts as soon as
+    workers become available. The workers keep the packed scenes of recent jobs, such that
+    consecutive jobs of the same scene (e.g., with different cameras) skip loading the scene.
+    Tiles are dispatched with the scene digest only; the scene specification is transferred
+    to a worker only if the worker has not cached the scene.
+
+    Each tile draws from its own random number stream derived from the job seed and the tile index,
+    such that the images agree with `parallel.render_image_parallel`.
+
+    Scenes are identified by their specification; scene files are hence assumed not to change
+    while the service is running.
+    """
+
+    def __init__(self, max_workers=None, lookahead=2):
+        """
+        Args:
+            max_workers: number of worker processes (defaults to the number of CPUs)
+            lookahead: number of tiles dispatched per worker at once
+        """
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        self.max_workers = max_workers
+        self.lookahead = lookahead
+        self._executor = None
+        self._jobs = {}
+        # queued jobs as heap of (-priority, submission number, job)
+        self._queue = []
+        self._counter = itertools.count()
+        self._running = set()
+        self._wakeup = None
+        self._dispatcher = None
+
+    async def start(self):
+        """Start the worker processes."""
+        if self._executor is not None:
+            return
+        self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=mp_context())
+        self._wakeup = asyncio.Event()
+        self._dispatcher = asyncio.ensure_future(self._dispatch())
+        # start all workers and import the rendering modules before the first job arrives
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*[loop.run_in_executor(self._executor, _warm_up) for _ in range(self.max_workers)])
+
+    async def close(self):
+        """Cancel all jobs and shut down the worker processes."""
+        for job_id in list(self._jobs):
+            self.cancel(job_id)
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            try:
+                await self._dispatcher
+            except asyncio.CancelledError:
+                pass
+            self._dispatcher = None
+        if self._running:
+            await asyncio.gather(*self._running, return_exceptions=True)
+        if self._executor is not None:
+            executor = self._executor
+            self._executor = None
+            # waiting for the worker processes must not block the event loop (e.g., other client connections)
+            await asyncio.get_running_loop().run_in_executor(None, executor.shutdown)
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def submit(self, spec, job_id=None):
+        """
+        Queue a render job.
+
+        Args:
+            spec: job specification as (JSON-compatible) dictionary with the entries
+                'nx', 'ny', 'ns' (image size and samples per pixel), 'scene' (see `scene_from_spec`),
+                'camera' (see `camera_from_spec`), and optionally 'priority' (default 0),
+                'tile_size' (default 32), 'max_depth' (default 50), 'seed' (random if not given)
+                and 'precision' ('float64' or 'float32', see `precision.get_precision`)
+            job_id: job identifier (generated if None), must be unique
+
+        Returns:
+            RenderJob: the queued job
+        """
+        if self._executor is None:
+            raise RuntimeError('render service is not running')
+        if job_id is None:
+            job_id = uuid.uuid4().hex
+        if job_id in self._jobs:
+            raise ValueError("duplicate job identifier '{}'".format(job_id))
+        _validate_spec(spec)
+        spec = dict(spec)
+        if spec.get('seed') is None:
+            spec['seed'] = int(np.random.SeedSequence().entropy)
+        # validate the camera and precision before queuing the job
+        camera_from_spec(spec['camera'], spec['nx'] / spec['ny'])
+        get_precision(spec.get('precision'))
+        job = RenderJob(job_id, spec)
+        self._jobs[job_id] = job
+        heapq.heappush(self._queue, (-job.priority, next(self._counter), job))
+        self._wakeup.set()
+        return job
+
+    def cancel(self, job_id):
+        """
+        Cancel a job. Its queued tiles are discarded, and tiles which are currently rendered are not reported.
+
+        Returns:
+            bool: whether the job was found and not yet finished
+        """
+        job = self._jobs.get(job_id)
+        if job is None or job.finished:
+            return False
+        self._finish(job, 'cancelled')
+        return True
+
+    async def serve(self, host='127.0.0.1', port=0):
+        """
+        Accept jobs from clients connecting via TCP (see `RenderClient` for the protocol).
+
+        Returns:
+            asyncio.Server: the listening server (the port is available as `server.sockets[0].getsockname()[1]`)
+        """
+        await self.start()
+        return await asyncio.start_server(self._handle_client, host, port, limit=1 << 26)
+
+    def _finish(self, job, status, message=None):
+        job.status = status
+        job.pending.clear()
+        del self._jobs[job.id]
+        job.events.put_nowait((status,) if message is None else (status, message))
+
+    async def _dispatch(self):
+        while True:
+            while len(self._running) >= self.lookahead * self.max_workers or not self._next_job():
+                self._wakeup.clear()
+                await self._wakeup.wait()
+            job = self._next_job()
+            job.status = 'running'
+            tile_index, tile = job.pending.popleft()
+            task = asyncio.ensure_future(self._render_tile(job, tile_index, tile))
+            self._running.add(task)
+
+    def _next_job(self):
+        # drop jobs without queued tiles from the front of the queue
+        while self._queue and not self._queue[0][2].pending:
+            heapq.heappop(self._queue)
+        return self._queue[0][2] if self._queue else None
+
+    async def _render_tile(self, job, tile_index, tile):
+        loop = asyncio.get_running_loop()
+        spec = job.spec
+        args = (spec['camera'], tile_index, tile, spec['nx'], spec['ny'], spec['ns'],
+                spec.get('max_depth', 50), spec['seed'], spec.get('precision'))
+        try:
+            # the scene specification is only transferred to workers which have not cached the packed scene
+            col = await loop.run_in_executor(self._executor, _render_job_tile_task, job.scene_key, None, *args)
+            if col is None and not job.finished:
+                col = await loop.run_in_executor(self._executor, _render_job_tile_task, job.scene_key, spec['scene'], *args)
+        except Exception as exc:
+            if not job.finished:
+                self._finish(job, 'failed', '{}: {}'.format(type(exc).__name__, exc))
+        else:
+            if not job.finished:
+                job.events.put_nowait(('tile', tile, gamma_encode(col)))
+                job.remaining -= 1
+                if job.remaining == 0:
+                    self._finish(job, 'done')
+        finally:
+            self._running.discard(asyncio.current_task())
+            self._wakeup.set()
+
+    async def _handle_client(self, reader, writer):
+        lock = asyncio.Lock()
+        jobs = {}
+
+        async def send(message):
+            async with lock:
+                writer.write(json.dumps(message).encode('utf-8') + b'\n')
+                await writer.drain()
+
+        async def forward(job):
+            try:
+                while True:
+                    event = await job.events.get()
+                    if event[0] == 'tile':
+                        (i0, i1, j0, j1), pixels = event[1:]
+                        await send({'type': 'tile', 'job': job.id, 'tile': [i0, i1, j0, j1],
+                                    'data': base64.b64encode(pixels.tobytes()).decode('ascii')})
+                    else:
+                        message = {'type': event[0], 'job': job.id}
+                        if len(event) > 1:
+                            message['message'] = event[1]
+                        await send(message)
+                        return
+            except ConnectionError:
+                self.cancel(job.id)
+
+        forwarders = []
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                request = None
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError('request must be a JSON object')
+                    if request.get('type') == 'render':
+                        job = self.submit(request['spec'], request.get('job'))
+                        jobs[job.id] = job
+                        await send({'type': 'accepted', 'job': job.id})
+                        forwarders.append(asyncio.ensure_future(forward(job)))
+                    elif request.get('type') == 'cancel':
+                        self.cancel(request['job'])
+                    else:
+                        raise ValueError('unknown request type {!r}'.format(request.get('type')))
+                except ConnectionError:
+                    raise
+                except Exception as exc:
+                    # invalid requests are answered without closing the connection
+                    await send({'type': 'error', 'job': request.get('job') if isinstance(request, dict) else None,
+                                'message': '{}: {}'.format(type(exc).__name__, exc)})
+        except ConnectionError:
+            pass
+        finally:
+            # jobs of disconnected clients are not needed any more
+            for job_id in jobs:
+                self.cancel(job_id)
+            await asyncio.gather(*forwarders, return_exceptions=True)
+            writer.close()
+
+
+class RenderClient(object):
+    """
+    Client of a `RenderService` listening on a TCP socket.
+
+    Messages are JSON objects, one per line. Requests are `{"type": "render", "job": <id>, "spec": <job specification>}`
+    and `{"type": "cancel", "job": <id>}`. The service answers a render request with `{"type": "accepted", "job": <id>}`,
+    followed by `{"type": "tile", "job": <id>, "tile": [i0, i1, j0, j1], "data": <base64>}` messages with the gamma-corrected
+    8-bit colors of each finished tile (array of shape `(i1 - i0, j1 - j0, 3)` in C order), and finally a message with type
+    'done', 'cancelled' or 'failed' (with a 'message' entry). Invalid requests are answered with type 'error'.
+    """
+
+    def __init__(self, reader, writer):
+        self._reader = reader
+        self._writer = writer
+        self._jobs = {}
+        self._receiver = asyncio.ensure_future(self._receive())
+
+    @classmethod
+    async def connect(cls, host='127.0.0.1', port=8765):
+        reader, writer = await asyncio.open_connection(host, port, limit=1 << 26)
+        return cls(reader, writer)
+
+    async def close(self):
+        self._writer.close()
+        await self._writer.wait_closed()
+        await asyncio.gather(self._receiver, return_exceptions=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def render(self, spec, job_id=None, on_tile=None):
+        """
+        Render an image remotely.
+
+        Args:
+            spec: job specification (see `RenderService.submit`)
+            job_id: job identifier (generated if None), e.g. for cancelling the job from another task
+            on_tile: optional function `on_tile(tile, pixels)` called for each finished tile
+
+        Returns:
+            numpy.ndarray: rendered image of shape `(nx, ny, 3)`, or None if the job was cancelled
+        """
+        if job_id is None:
+            job_id = uuid.uuid4().hex
+        events = asyncio.Queue()
+        self._jobs[job_id] = events
+        try:
+            await self._send({'type': 'render', 'job': job_id, 'spec': spec})
+            im = np.zeros((spec['nx'], spec['ny'], 3), dtype=np.uint8)
+            while True:
+                message = await events.get()
+                if message['type'] == 'tile':
+                    i0, i1, j0, j1 = message['tile']
+                    pixels = np.frombuffer(base64.b64decode(message['data']), dtype=np.uint8).reshape((i1 - i0, j1 - j0, 3))
+                    im[i0:i1, j0:j1] = pixels
+                    if on_tile is not None:
+                        on_tile((i0, i1, j0, j1), pixels)
+                elif message['type'] == 'done':
+                    return im[:, ::-1]
+                elif message['type'] == 'cancelled':
+                    return None
+                elif message['type'] in ('failed', 'error'):
+                    raise RuntimeError('render job {} failed: {}'.format(job_id, message.get('message')))
+        finally:
+            del self._jobs[job_id]
+
+    async def cancel(self, job_id):
+        await self._send({'type': 'cancel', 'job': job_id})
+
+    async def _send(self, message):
+        self._writer.write(json.dumps(message).encode('utf-8') + b'\n')
+        await self._writer.drain()
+
+    async def _receive(self):
+        while True:
+            line = await self._reader.readline()
+            if not line:
+                break
+            message = json.loads(line)
+            events = self._jobs.get(message.get('job'))
+            if events is not None:
+                events.put_nowait(message)
+        # connection closed
+        for events in self._jobs.values():
+            events.put_nowait({'type': 'failed', 'message': 'connection closed'})
+
+
+def scene_spec(scene):
+    """
+    JSON-compatible specification of a surface assembly of spheres (or its compiled form),
+    see `scene_from_spec`.
+    """
+    if isinstance(scene, SurfaceAssembly):
+        scene = scene.compile()
+    if len(scene) != len(scene.radii):
+        raise TypeError('scene specifications support only spheres')
+    materials = []
+    for mat in scene.materials:
+        name = [key for key, (cls, _) in MATERIAL_TYPES.items() if type(mat) is cls]
+        if not name:
+            raise TypeError('unsupported material type {}'.format(type(mat).__name__))
+        spec = {'type': name[0]}
+        for key, value in mat.batch_parameters().items():
+            spec[key] = np.asarray(value).tolist()
+        materials.append(spec)
+    return {
+        'centers': np.asarray(scene.centers).tolist(),
+        'radii': np.asarray(scene.radii).tolist(),
+        'material_index': np.asarray(scene.material_index).tolist(),
+        'materials': materials,
+    }
+
+
+def scene_from_spec(spec):
+    """
+    Construct a scene from its specification: either `{"path": <scene file>}` (see `scenefile.load_scene`),
+    or a dictionary with the entries 'centers', 'radii', 'material_index' and 'materials' (like `scenefile.write_scene`),
+    where each material is given as dictionary with entry 'type' ('lambertian', 'metal' or 'dielectric')
+    and the parameters ('albedo', 'fuzz', 'ref_idx'). The optional entry `"accelerate": true`
+    requests a bounding volume hierarchy.
+    """
+    if 'path' in spec:
+        from .scenefile import load_scene
+        scene = load_scene(spec['path'])
+    else:
+        materials = []
+        for mat in spec['materials']:
+            if mat.get('type') not in MATERIAL_TYPES:
+                raise ValueError('unknown material type {!r}'.format(mat.get('type')))
+            cls, params = MATERIAL_TYPES[mat['type']]
+            materials.append(cls(*[np.array(mat[p], dtype=float) if p == 'albedo' else float(mat[p]) for p in params]))
+        scene = SurfaceAssembly()
+        for center, radius, k in zip(spec['centers'], spec['radii'], spec['material_index']):
+            scene.add_object(Sphere(np.array(center, dtype=float), float(radius), materials[k]))
+        scene = scene.compile()
+    if spec.get('accelerate', False):
+        scene = BVH(scene)
+    return scene
+
+
+def camera_from_spec(spec, aspect):
+    """
+    Construct a camera from a dictionary with the entries 'lookfrom', 'lookat', 'vfov', 'aperture'
+    and 'focus_dist', and optionally 'vup' (y-axis by default), see `Camera`.
+    """
+    vup = spec.get('vup', [0., 1., 0.])
+    return Camera(np.array(spec['lookfrom'], dtype=float), np.array(spec['lookat'], dtype=float),
+                  np.array(vup, dtype=float), float(spec['vfov']), aspect,
+                  float(spec['aperture']), float(spec['focus_dist']))
+
+
+def _validate_spec(spec):
+    """Check the entries of a job specification (see `RenderService.submit`), raising a `ValueError` if invalid."""
+    if not isinstance(spec, dict):
+        raise ValueError('job specification must be a dictionary, received {}'.format(type(spec).__name__))
+    for key in ('nx', 'ny', 'ns', 'scene', 'camera'):
+        if key not in spec:
+            raise ValueError("job specification lacks '{}'".format(key))
+    for key, minimum in [('nx', 1), ('ny', 1), ('ns', 1), ('tile_size', 1), ('max_depth', 0)]:
+        value = spec.get(key, minimum)
+        if not _is_int(value) or value < minimum:
+            raise ValueError("'{}' must be an integer of at least {}, received {!r}".format(key, minimum, value))
+    if spec.get('seed') is not None and (not _is_int(spec['seed']) or spec['seed'] < 0):
+        raise ValueError("'seed' must be a non-negative integer, received {!r}".format(spec['seed']))
+    priority = spec.get('priority', 0)
+    if not isinstance(priority, numbers.Real) or isinstance(priority, bool):
+        raise ValueError("'priority' must be a number, received {!r}".format(priority))
+    if not isinstance(spec['scene'], dict) or not isinstance(spec['camera'], dict):
+        raise ValueError("'scene' and 'camera' must be dictionaries")
+
+
+def _is_int(value):
+    return isinstance(value, numbers.Integral) and not isinstance(value, bool)
+
+
+def _digest(spec):
+    return hashlib.blake2b(json.dumps(spec, sort_keys=True).encode('utf-8'), digest_size=16).hexdigest()
+
+
+# packed scenes of recent jobs within a worker process, by scene digest
+_scene_cache = OrderedDict()
+_SCENE_CACHE_SIZE = 8
+
+
+def _warm_up():
+    return os.getpid()
+
+
+def _render_job_tile_task(scene_key, scene, camera, tile_index, tile, nx, ny, ns, max_depth, seed, precision=None):
+    packed = _scene_cache.get(scene_key)
+    if packed is None:
+        if scene is None:
+            # scene not cached by this worker, to be sent again with its specification
+            return None
+        packed = PackedScene(scene_from_spec(scene), precision)
+        _scene_cache[scene_key] = packed
+        if len(_scene_cache) > _SCENE_CACHE_SIZE:
+            _scene_cache.popitem(last=False)
+    else:
+        _scene_cache.move_to_end(scene_key)
+    i0, i1, j0, j1 = tile
+    rng = stream(seed, tile_index)
+    return render_tile(i0, i1, j0, j1, nx, ny, ns, packed, camera_from_spec(camera, nx / ny), max_depth, rng)
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Run a render service accepting jobs via TCP.')
+    parser.add_argument('--host', default='127.0.0.1', help='network interface to listen on')
+    parser.add_argument('--port', type=int, default=8765, help='TCP port')
+    parser.add_argument('--workers', type=int, default=None, help='number of worker processes')
+    args = parser.parse_args()
+
+    async def run():
+        async with RenderService(args.workers) as service:
+            server = await service.serve(args.host, args.port)
+            print('render service listening on {}:{}'.format(*server.sockets[0].getsockname()[:2]))
+            async with server:
+                await server.serve_forever()
+
+    asyncio.run(run())
+
+
+if __name__ == '__main__':
+    main()
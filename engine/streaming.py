@@ -0,0 +1,75 @@
+from __future__ import division
+import numpy as np
+from .sampling import stream
+from .wavefront import PackedScene, render_tile, gamma_encode
+
+
+def render_image_streaming(nx, ny, ns, scene, camera, hdr_path, tile_size=32, max_depth=50, seed=None):
+    """
+    Render an image tile by tile into a memory-mapped floating-point (HDR) buffer on disk,
+    such that the image never has to be held in memory as a whole.
+
+    The buffer is stored as `.npy` file of data type float32 and shape `(ny, nx, 3)`,
+    with rows ordered from top to bottom (as in image files, no transpose required).
+    Tiles are rendered in rows from top to bottom; each finished row of tiles
+    is flushed to disk. Each tile uses its own random number stream derived from `seed`
+    and the tile index, as in `parallel.render_image_parallel`.
+
+    Args:
+        nx: width of rendered image (pixels)
+        ny: height of rendered image (pixels)
+        ns: number of samples (rays) per pixel
+        scene: geometric scene (surface assembly of spheres, or its compiled or packed form)
+        camera: camera for generating rays
+        hdr_path: file path of the radiance buffer
+        tile_size: edge length of the square image tiles (pixels)
+        max_depth: how often a ray is allowed to scatter
+        seed: seed of the random number streams (chosen randomly if None)
+
+    Returns:
+        numpy.memmap: averaged radiance of shape `(ny, nx, 3)`
+    """
+    if seed is None:
+        seed = np.random.SeedSequence().entropy
+    packed = scene if isinstance(scene, PackedScene) else PackedScene(scene)
+    hdr = np.lib.format.open_memmap(hdr_path, mode='w+', dtype=np.float32, shape=(ny, nx, 3))
+    tile_index = 0
+    for r0 in range(0, ny, tile_size):
+        r1 = min(r0 + tile_size, ny)
+        # pixel row j counts from the bottom
+        j0, j1 = ny - r1, ny - r0
+        for i0 in range(0, nx, tile_size):
+            i1 = min(i0 + tile_size, nx)
+            col = render_tile(i0, i1, j0, j1, nx, ny, ns, packed, camera, max_depth, stream(seed, tile_index))
+            hdr[r0:r1, i0:i1] = col.transpose((1, 0, 2))[::-1]
+            tile_index += 1
+        hdr.flush()
+    return hdr
+
+
+def tonemap(hdr, out_path=None, exposure=1., chunk_rows=256):
+    """
+    Convert a radiance buffer of shape `(ny, nx, 3)` to an 8-bit image
+    (scaled by `exposure`, clipped and gamma-corrected like `rendering.render_image`),
+    processing `chunk_rows` rows at a time.
+
+    Args:
+        hdr: radiance buffer, or file path of a buffer written by `render_image_streaming`
+        out_path: `.npy` file path of the memory-mapped output image, or None to return an in-memory image
+        exposure: scaling factor applied to the radiance
+        chunk_rows: number of rows converted at once, bounding the memory usage
+
+    Returns:
+        numpy.ndarray: image of shape `(ny, nx, 3)`, e.g., for `imageio.imwrite`
+    """
+    if isinstance(hdr, str):
+        hdr = np.load(hdr, mmap_mode='r')
+    if out_path is None:
+        im = np.empty(hdr.shape, dtype=np.uint8)
+    else:
+        im = np.lib.format.open_memmap(out_path, mode='w+', dtype=np.uint8, shape=hdr.shape)
+    for r0 in range(0, hdr.shape[0], chunk_rows):
+        im[r0:r0 + chunk_rows] = gamma_encode(exposure * hdr[r0:r0 + chunk_rows])
+    if out_path is not None:
+        im.flush()
+    return im
@@ -1,6 +1,8 @@
 import numpy as np
 from abc import ABCMeta, abstractmethod
-from hit_record import HitRecord
+from .hit_record import HitRecord
+from .utils import unit_vector
+from . import instrumentation
 
 
 class Surface(object):
@@ -14,6 +16,15 @@ class Surface(object):
         The ray parameter must be between `t_min` and `t_max`.
         """
 
+    @abstractmethod
+    def bounding_box(self):
+        """
+        Axis-aligned bounding box of the surface.
+
+        Returns:
+            tuple: lower and upper corner `(box_min, box_max)`; unbounded extents are infinite
+        """
+
 
 class SurfaceAssembly(Surface):
     """
@@ -26,6 +37,16 @@ class SurfaceAssembly(Surface):
     def add_object(self, obj):
         self._objects.append(obj)
 
+    def compile(self):
+        """
+        Pack the stored primitives into a `CompiledSurfaceAssembly`
+        for vectorized intersection queries.
+        """
+        return CompiledSurfaceAssembly(self._objects)
+
+    def bounding_box(self):
+        return _union_box([obj.bounding_box() for obj in self._objects])
+
     def hit(self, ray, t_min, t_max):
         """
         Obtain the closest hit record for a ray intersecting the stored objects.
@@ -55,6 +76,8 @@ class Sphere(Surface):
         """
         Obtain the hit record for a ray intersecting the sphere.
         """
+        if instrumentation.current is not None:
+            instrumentation.current.intersection_tests += 1
         oc = ray.origin - self.center
         a = np.dot(ray.direction, ray.direction)
         b = np.dot(oc, ray.direction)
@@ -71,3 +94,455 @@ class Sphere(Surface):
                     normal = (point - self.center) / self.radius
                     return (HitRecord(point, normal, self.material), t)
         return (None, t_max)
+
+    def bounding_box(self):
+        r = abs(self.radius)
+        return (self.center - r, self.center + r)
+
+
+class Plane(Surface):
+    """
+    Infinite plane through a point, with the normal pointing to the outside
+    (for example, a ground floor with normal along the y-axis).
+    """
+
+    def __init__(self, point, normal, material):
+        self.point = point
+        self.normal = unit_vector(normal)
+        self.material = material
+
+    def hit(self, ray, t_min, t_max):
+        """
+        Obtain the hit record for a ray intersecting the plane.
+        """
+        if instrumentation.current is not None:
+            instrumentation.current.intersection_tests += 1
+        t = float(_plane_roots(ray.origin, ray.direction, self.point, self.normal, t_min, t_max))
+        if not np.isfinite(t):
+            return (None, t_max)
+        return (HitRecord(ray.point_at_parameter(t), self.normal, self.material), t)
+
+    def bounding_box(self):
+        box_min, box_max = _plane_bounds(self.point[None, :], self.normal[None, :])
+        return (box_min[0], box_max[0])
+
+
+class Disk(Surface):
+    """
+    Flat circular disk, with the normal pointing to the outside.
+    """
+
+    def __init__(self, center, normal, radius, material):
+        self.center = center
+        self.normal = unit_vector(normal)
+        self.radius = radius
+        self.material = material
+
+    def hit(self, ray, t_min, t_max):
+        """
+        Obtain the hit record for a ray intersecting the disk.
+        """
+        if instrumentation.current is not None:
+            instrumentation.current.intersection_tests += 1
+        t = float(_disk_roots(ray.origin, ray.direction, self.center, self.normal, self.radius, t_min, t_max))
+        if not np.isfinite(t):
+            return (None, t_max)
+        return (HitRecord(ray.point_at_parameter(t), self.normal, self.material), t)
+
+    def bounding_box(self):
+        box_min, box_max = _disk_bounds(self.center[None, :], self.normal[None, :], np.array([self.radius]))
+        return (box_min[0], box_max[0])
+
+
+class Box(Surface):
+    """
+    Axis-aligned box, specified by its lower and upper corner.
+    """
+
+    def __init__(self, box_min, box_max, material):
+        self.box_min = box_min
+        self.box_max = box_max
+        self.material = material
+
+    def hit(self, ray, t_min, t_max):
+        """
+        Obtain the hit record for a ray intersecting the box surface.
+        """
+        if instrumentation.current is not None:
+            instrumentation.current.intersection_tests += 1
+        t = float(_box_roots(ray.origin, ray.direction, self.box_min, self.box_max, t_min, t_max))
+        if not np.isfinite(t):
+            return (None, t_max)
+        point = ray.point_at_parameter(t)
+        return (HitRecord(point, _box_normals(point, self.box_min, self.box_max), self.material), t)
+
+    def bounding_box(self):
+        return (np.asarray(self.box_min, dtype=float), np.asarray(self.box_max, dtype=float))
+
+
+class CompiledSurfaceAssembly(Surface):
+    """
+    Surface assembly of spheres, planes, disks and axis-aligned boxes stored as contiguous arrays
+    per primitive type (sphere centers and radii, plane points and normals, and so on) together with
+    material indices, such that closest-hit queries require a few vectorized solves.
+
+    Primitives are indexed by type: spheres first, followed by planes, disks and boxes,
+    each in the order of insertion. `object_index` maps the position of an object
+    in the order of insertion to its index in the compiled assembly.
+    """
+
+    # primitives other than spheres (none by default)
+    plane_points  = np.zeros((0, 3))
+    plane_normals = np.zeros((0, 3))
+    disk_centers  = np.zeros((0, 3))
+    disk_normals  = np.zeros((0, 3))
+    disk_radii    = np.zeros(0)
+    box_min       = np.zeros((0, 3))
+    box_max       = np.zeros((0, 3))
+    # compiled index per object in order of insertion (None: same order, like for spheres only)
+    object_index  = None
+
+    def __init__(self, objects):
+        for obj in objects:
+            if type(obj) not in _PRIMITIVE_TYPES:
+                raise TypeError('compiled surface assembly supports only spheres, planes, disks and boxes, '
+                                'received {}'.format(type(obj).__name__))
+        spheres, planes, disks, boxes = [[obj for obj in objects if type(obj) is cls] for cls in _PRIMITIVE_TYPES]
+        n = len(spheres)
+        self.centers = np.array([obj.center for obj in spheres], dtype=float).reshape((n, 3))
+        self.radii   = np.array([obj.radius for obj in spheres], dtype=float)
+        if planes:
+            self.plane_points  = np.array([obj.point  for obj in planes], dtype=float)
+            self.plane_normals = np.array([obj.normal for obj in planes], dtype=float)
+        if disks:
+            self.disk_centers = np.array([obj.center for obj in disks], dtype=float)
+            self.disk_normals = np.array([obj.normal for obj in disks], dtype=float)
+            self.disk_radii   = np.array([obj.radius for obj in disks], dtype=float)
+        if boxes:
+            self.box_min = np.array([obj.box_min for obj in boxes], dtype=float)
+            self.box_max = np.array([obj.box_max for obj in boxes], dtype=float)
+        if planes or disks or boxes:
+            order = np.argsort([_PRIMITIVE_TYPES.index(type(obj)) for obj in objects], kind='stable')
+            self.object_index = np.argsort(order)
+        # list of distinct materials, referenced by index
+        self.materials = []
+        self.material_index = np.zeros(len(objects), dtype=int)
+        ids = {}
+        for k, obj in enumerate(spheres + planes + disks + boxes):
+            key = id(obj.material)
+            if key not in ids:
+                ids[key] = len(self.materials)
+                self.materials.append(obj.material)
+            self.material_index[k] = ids[key]
+
+    def __len__(self):
+        return self._offsets()[-1]
+
+    @property
+    def dtype(self):
+        """Floating-point type of the geometry arrays."""
+        return self.radii.dtype
+
+    def astype(self, dtype):
+        """
+        Copy of the assembly with the geometry arrays converted to the floating-point type `dtype`
+        (like `numpy.ndarray.astype`), sharing the materials; the assembly itself if it has this type already.
+        """
+        if np.dtype(dtype) == self.dtype:
+            return self
+        other = CompiledSurfaceAssembly.__new__(CompiledSurfaceAssembly)
+        for name in _GEOMETRY_ARRAYS:
+            setattr(other, name, np.asarray(getattr(self, name)).astype(dtype))
+        other.materials = self.materials
+        other.material_index = self.material_index
+        other.object_index = self.object_index
+        return other
+
+    def hit(self, ray, t_min, t_max):
+        """
+        Obtain the closest hit record for a ray intersecting the stored primitives.
+        """
+        offsets = self._offsets()
+        if instrumentation.current is not None:
+            instrumentation.current.intersection_tests += offsets[-1]
+        best = -1
+        closest_so_far = t_max
+        if len(self.radii) > 0:
+            oc = ray.origin - self.centers
+            a = np.dot(ray.direction, ray.direction)
+            b = np.dot(oc, ray.direction)
+            c = np.einsum('ij,ij->i', oc, oc) - self.radii**2
+            t = _sphere_roots(a, b, c, t_min, t_max)
+            k = np.argmin(t)
+            if np.isfinite(t[k]):
+                best = k
+                closest_so_far = t[k]
+        for kind in range(1, len(_PRIMITIVE_TYPES)):
+            if offsets[kind + 1] == offsets[kind]:
+                continue
+            t = self._primitive_roots(kind, slice(None), ray.origin, ray.direction, t_min, closest_so_far)
+            k = np.argmin(t)
+            if np.isfinite(t[k]):
+                best = offsets[kind] + k
+                closest_so_far = t[k]
+        if best < 0:
+            return (None, t_max)
+        point = ray.point_at_parameter(closest_so_far)
+        if best < len(self.radii):
+            normal = (point - self.centers[best]) / self.radii[best]
+        else:
+            normal = self.normals(np.array([best]), point[None, :])[0]
+        return (HitRecord(point, normal, self.materials[self.material_index[best]]), closest_so_far)
+
+    def hit_batch(self, origins, directions, t_min, t_max, chunk_size=1 << 21):
+        """
+        Find the closest intersection for a batch of rays.
+
+        Args:
+            origins: ray origins, array of shape `(n, 3)`
+            directions: ray directions, array of shape `(n, 3)`
+            t_min: minimum ray parameter
+            t_max: maximum ray parameter
+            chunk_size: maximum number of ray-primitive pairs processed at once
+
+        Returns:
+            tuple: tuple containing
+              - index: index of the closest primitive per ray, or -1 if there is no hit
+              - t:     ray parameter of the intersection, or `t_max` if there is no hit
+        """
+        n = len(origins)
+        offsets = self._offsets()
+        if instrumentation.current is not None:
+            instrumentation.current.intersection_tests += n * offsets[-1]
+        index = np.full(n, -1, dtype=int)
+        tbest = np.full(n, t_max, dtype=origins.dtype)
+        if offsets[-1] == 0:
+            return (index, tbest)
+        step = max(1, chunk_size // offsets[-1])
+        for start in range(0, n, step):
+            sl = slice(start, start + step)
+            if len(self.radii) > 0:
+                # pairwise quadratic coefficients, shape (number of rays, number of spheres)
+                oc = origins[sl, None, :] - self.centers[None, :, :]
+                a = np.einsum('ij,ij->i', directions[sl], directions[sl])[:, None]
+                b = np.einsum('ijk,ik->ij', oc, directions[sl])
+                c = np.einsum('ijk,ijk->ij', oc, oc) - self.radii**2
+                t = _sphere_roots(a, b, c, t_min, t_max, _sphere_discriminant(oc, directions[sl, None, :], a, b, self.radii))
+                k = np.argmin(t, axis=1)
+                tk = t[np.arange(len(k)), k]
+                found = np.isfinite(tk)
+                index[sl] = np.where(found, k, -1)
+                tbest[sl] = np.where(found, tk, t_max)
+            for kind in range(1, len(_PRIMITIVE_TYPES)):
+                if offsets[kind + 1] == offsets[kind]:
+                    continue
+                # pairwise, shape (number of rays, number of primitives of this type)
+                t = self._primitive_roots(kind, slice(None), origins[sl, None, :], directions[sl, None, :], t_min, tbest[sl, None])
+                k = np.argmin(t, axis=1)
+                tk = t[np.arange(len(k)), k]
+                found = np.isfinite(tk)
+                index[sl] = np.where(found, offsets[kind] + k, index[sl])
+                tbest[sl] = np.where(found, tk, tbest[sl])
+        return (index, tbest)
+
+    def hit_pairs(self, origins, directions, prims, t_min, t_max):
+        """
+        Intersect the rays `(origins[k], directions[k])` with the primitives `prims[k]`, pairwise.
+
+        Returns:
+            numpy.ndarray: ray parameters of the intersections within `[t_min, t_max)`, or infinity
+        """
+        offsets = self._offsets()
+        if offsets[1] == offsets[-1]:
+            return self._primitive_roots(0, prims, origins, directions, t_min, t_max)
+        t = np.full(len(prims), np.inf, dtype=origins.dtype)
+        origins = np.broadcast_to(origins, (len(prims), 3))
+        directions = np.broadcast_to(directions, (len(prims), 3))
+        t_max = np.broadcast_to(t_max, (len(prims),))
+        kind = _primitive_kind(offsets, prims)
+        for k in range(len(_PRIMITIVE_TYPES)):
+            sel = np.nonzero(kind == k)[0]
+            if len(sel) > 0:
+                t[sel] = self._primitive_roots(k, prims[sel] - offsets[k], origins[sel], directions[sel], t_min, t_max[sel])
+        return t
+
+    def normals(self, index, points):
+        """
+        Surface normals at intersection points `points` of the primitives `index`.
+        """
+        offsets = self._offsets()
+        if offsets[1] == offsets[-1]:
+            # renormalize to compensate for rounding errors of hit points on large spheres
+            return unit_vector((points - self.centers[index]) / self.radii[index, None])
+        normals = np.empty(np.shape(points), dtype=points.dtype)
+        kind = _primitive_kind(offsets, index)
+        for k in range(len(_PRIMITIVE_TYPES)):
+            sel = np.nonzero(kind == k)[0]
+            if len(sel) == 0:
+                continue
+            local = index[sel] - offsets[k]
+            if k == 0:
+                normals[sel] = unit_vector((points[sel] - self.centers[local]) / self.radii[local, None])
+            elif k == 1:
+                normals[sel] = self.plane_normals[local]
+            elif k == 2:
+                normals[sel] = self.disk_normals[local]
+            else:
+                normals[sel] = _box_normals(points[sel], self.box_min[local], self.box_max[local])
+        return normals
+
+    def primitive_bounds(self):
+        """
+        Axis-aligned bounding boxes of the primitives, with infinite extents for unbounded planes.
+
+        Returns:
+            tuple: lower and upper corners, arrays of shape `(len(self), 3)`
+        """
+        r = np.abs(self.radii)[:, None]
+        plane_min, plane_max = _plane_bounds(self.plane_points, self.plane_normals)
+        disk_min, disk_max = _disk_bounds(self.disk_centers, self.disk_normals, self.disk_radii)
+        return (np.concatenate((self.centers - r, plane_min, disk_min, self.box_min)).reshape((-1, 3)),
+                np.concatenate((self.centers + r, plane_max, disk_max, self.box_max)).reshape((-1, 3)))
+
+    def bounding_box(self):
+        box_min, box_max = self.primitive_bounds()
+        return _union_box(list(zip(box_min, box_max)))
+
+    def _offsets(self):
+        """Index of the first sphere, plane, disk and box, and total number of primitives."""
+        return np.cumsum([0, len(self.radii), len(self.plane_points), len(self.disk_radii), len(self.box_min)])
+
+    def _primitive_roots(self, kind, k, origins, directions, t_min, t_max):
+        """
+        Ray parameters of the intersections with the primitives of type `kind` with (local) indices `k`,
+        evaluated with broadcasting over the leading dimensions.
+        """
+        if kind == 0:
+            oc = origins - self.centers[k]
+            a = np.einsum('...i,...i->...', directions, directions)
+            b = np.einsum('...i,...i->...', oc, directions)
+            c = np.einsum('...i,...i->...', oc, oc) - self.radii[k]**2
+            return _sphere_roots(a, b, c, t_min, t_max, _sphere_discriminant(oc, directions, a, b, self.radii[k]))
+        if kind == 1:
+            return _plane_roots(origins, directions, self.plane_points[k], self.plane_normals[k], t_min, t_max)
+        if kind == 2:
+            return _disk_roots(origins, directions, self.disk_centers[k], self.disk_normals[k], self.disk_radii[k], t_min, t_max)
+        return _box_roots(origins, directions, self.box_min[k], self.box_max[k], t_min, t_max)
+
+
+# primitive types supported by `CompiledSurfaceAssembly`, in the order of their indices
+_PRIMITIVE_TYPES = [Sphere, Plane, Disk, Box]
+
+# floating-point arrays of `CompiledSurfaceAssembly` describing the primitives
+_GEOMETRY_ARRAYS = ['centers', 'radii', 'plane_points', 'plane_normals', 'disk_centers', 'disk_normals', 'disk_radii', 'box_min', 'box_max']
+
+
+def _primitive_kind(offsets, index):
+    """Type of the primitives `index` (position in `_PRIMITIVE_TYPES`)."""
+    return np.searchsorted(offsets, index, side='right') - 1
+
+
+def _sphere_roots(a, b, c, t_min, t_max, discriminant=None):
+    """
+    Smallest solution of the quadratic ray-sphere equation `a t^2 + 2 b t + c = 0`
+    within `[t_min, t_max)`, evaluated elementwise; infinity if there is none.
+    """
+    if discriminant is None:
+        discriminant = b**2 - a*c
+    mask = discriminant > 0
+    sq = np.sqrt(np.where(mask, discriminant, 0))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # numerically stable solutions of the quadratic equation
+        t1 = -(b + np.sign(b)*sq) / a
+        t2 = c / (a * t1)
+    tlo = np.fmin(t1, t2)
+    thi = np.fmax(t1, t2)
+    # smaller solution first
+    t = np.where((t_min <= tlo) & (tlo < t_max), tlo,
+        np.where((t_min <= thi) & (thi < t_max), thi, np.inf))
+    return np.where(mask, t, np.inf)
+
+
+def _sphere_discriminant(oc, directions, a, b, radii):
+    """
+    Discriminant `b^2 - a c` of the ray-sphere equation in single precision, evaluated as
+    `a (r^2 - |l|^2)` with `l` the offset of the point closest to the sphere center along the ray
+    from the center, avoiding the cancellation of `b^2` and `a c` for distant spheres
+    (Haines et al., "Precision improvements for ray/sphere intersection", Ray Tracing Gems, 2019).
+    Returns None in double precision, where the direct evaluation is accurate enough.
+    """
+    if oc.dtype == np.float64:
+        return None
+    with np.errstate(divide='ignore', invalid='ignore'):
+        l = oc - (b / a)[..., None]*directions
+    return a * (radii**2 - np.einsum('...i,...i->...', l, l))
+
+
+def _plane_roots(origins, directions, points, normals, t_min, t_max):
+    """
+    Ray parameter of the intersection with the plane through `points` with normals `normals`
+    within `[t_min, t_max)`, evaluated elementwise (vectors along the last axis); infinity if there is none.
+    """
+    denom = np.einsum('...i,...i->...', directions, normals)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = np.einsum('...i,...i->...', points - origins, normals) / denom
+    return np.where((t_min <= t) & (t < t_max), t, np.inf)
+
+
+def _disk_roots(origins, directions, centers, normals, radii, t_min, t_max):
+    """
+    Ray parameter of the intersection with disks within `[t_min, t_max)`, evaluated elementwise; infinity if there is none.
+    """
+    t = _plane_roots(origins, directions, centers, normals, t_min, t_max)
+    d = origins + np.where(np.isfinite(t), t, 0)[..., None]*directions - centers
+    return np.where(np.einsum('...i,...i->...', d, d) <= radii**2, t, np.inf)
+
+
+def _box_roots(origins, directions, box_min, box_max, t_min, t_max):
+    """
+    Ray parameter of the intersection with the surface of axis-aligned boxes within `[t_min, t_max)`,
+    evaluated elementwise via the slab test; infinity if there is none.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        invdir = 1 / directions
+        t0 = (box_min - origins) * invdir
+        t1 = (box_max - origins) * invdir
+    tnear = np.max(np.fmin(t0, t1), axis=-1)
+    tfar = np.min(np.fmax(t0, t1), axis=-1)
+    # entry point, or exit point for rays starting inside the box
+    t = np.where(tnear >= t_min, tnear, tfar)
+    return np.where((tnear <= tfar) & (t_min <= t) & (t < t_max), t, np.inf)
+
+
+def _box_normals(points, box_min, box_max):
+    """Outward normals of axis-aligned boxes at surface points, given by the closest face."""
+    dist = np.abs(np.concatenate((points - box_min, points - box_max), axis=-1))
+    face = np.argmin(dist, axis=-1)
+    normals = np.zeros(np.shape(points), dtype=np.result_type(points, box_min))
+    np.put_along_axis(normals, np.expand_dims(face % 3, -1), np.expand_dims(np.where(face < 3, -1., 1.), -1), axis=-1)
+    return normals
+
+
+def _plane_bounds(points, normals):
+    """Bounding boxes of planes, which are finite only along the normal of planes perpendicular to a coordinate axis."""
+    box_min = np.full(np.shape(points), -np.inf)
+    box_max = np.full(np.shape(points), np.inf)
+    aligned = np.count_nonzero(normals, axis=-1) == 1
+    axis = np.argmax(np.abs(normals), axis=-1)
+    rows = np.nonzero(aligned)[0]
+    box_min[rows, axis[rows]] = points[rows, axis[rows]]
+    box_max[rows, axis[rows]] = points[rows, axis[rows]]
+    return (box_min, box_max)
+
+
+def _disk_bounds(centers, normals, radii):
+    """Bounding boxes of disks."""
+    extent = np.abs(radii)[:, None] * np.sqrt(np.clip(1 - normals**2, 0, 1))
+    return (centers - extent, centers + extent)
+
+
+def _union_box(boxes):
+    """Smallest box containing the boxes `(box_min, box_max)` (empty if there are none)."""
+    if len(boxes) == 0:
+        return (np.full(3, np.inf), np.full(3, -np.inf))
+    return (np.min([b[0] for b in boxes], axis=0), np.max([b[1] for b in boxes], axis=0))
@@ -1,8 +1,19 @@
+import os
 import numpy as np
+from . import sampling
+
+
+# whether to run consistency checks (like normalization of surface normals) in the scalar ray tracing path;
+# disabled by setting the environment variable RAYTRACING_DEBUG=0, or by assigning False at runtime
+debug = os.environ.get('RAYTRACING_DEBUG', '1') != '0'
 
 
 def unit_vector(v):
-    """Normalize input vector `v`."""
+    """Normalize input vector `v`, or each row of a batch of vectors of shape `(n, 3)`."""
+    if np.ndim(v) > 1:
+        n = np.linalg.norm(v, axis=-1, keepdims=True)
+        # zero vectors remain unchanged
+        return v / np.where(n > 0, n, 1)
     n = np.linalg.norm(v)
     if n > 0:
         return v / n
@@ -13,15 +24,14 @@ def unit_vector(v):
 
 def random_in_unit_disk():
     """Generate a uniformly random point within the unit disk."""
-    while True:
-        p = 2 * np.random.rand(2) - 1
-        if np.dot(p, p) < 1:
-            return p
+    return sampling.default_pool().in_unit_disk()
 
 
 def random_in_unit_sphere():
     """Generate a uniformly random point within the unit sphere."""
-    while True:
-        p = 2 * np.random.rand(3) - 1
-        if np.dot(p, p) < 1:
-            return p
+    return sampling.default_pool().in_unit_sphere()
+
+
+def random_uniform():
+    """Generate a uniformly random number in `[0, 1)`."""
+    return sampling.default_pool().uniform()
@@ -0,0 +1,339 @@
+from __future__ import division
+import time
+import numpy as np
+from .surface import SurfaceAssembly
+from .utils import unit_vector
+from .samplers import PathSamples
+from .precision import get_precision
+from . import instrumentation
+
+
+class PackedScene(object):
+    """
+    Scene representation storing the geometry and the material parameters
+    as contiguous arrays, suitable for vectorized ray tracing.
+    """
+
+    def __init__(self, assembly, precision=None):
+        """
+        Pack the primitives of a surface assembly into arrays.
+
+        Args:
+            assembly: surface assembly, or an equivalent accelerated surface
+                supporting batched queries (like `CompiledSurfaceAssembly` or `BVH`)
+            precision: floating-point precision of the rendering path, 'float64' (default) or 'float32',
+                see `precision.get_precision`
+        """
+        self.precision = get_precision(precision)
+        dtype = self.precision.dtype
+        if isinstance(assembly, SurfaceAssembly):
+            assembly = assembly.compile()
+        # other surfaces supporting batched queries (like wrappers) are used as they are in double precision
+        if getattr(assembly, 'dtype', np.dtype(np.float64)) != dtype:
+            assembly = assembly.astype(dtype)
+        self.geometry = assembly
+        materials = self.geometry.materials
+        # distinct material types, and per type a table of the material parameters
+        self.material_types = []
+        self.parameters = []
+        # type and row within parameter table, indexed by material index
+        self.mat_type = np.zeros(len(materials), dtype=int)
+        self.mat_row  = np.zeros(len(materials), dtype=int)
+        rows = []
+        for k, mat in enumerate(materials):
+            if type(mat) not in self.material_types:
+                self.material_types.append(type(mat))
+                rows.append([])
+            self.mat_type[k] = self.material_types.index(type(mat))
+            self.mat_row[k] = len(rows[self.mat_type[k]])
+            rows[self.mat_type[k]].append(mat.batch_parameters())
+        for r in rows:
+            self.parameters.append({key: np.array([p[key] for p in r], dtype=dtype) for key in r[0]})
+        # reflectance per material for the albedo feature buffer (white for materials without albedo, like glass)
+        self.albedo = np.ones((len(materials), 3), dtype=dtype)
+        for k, mat in enumerate(materials):
+            self.albedo[k] = mat.batch_parameters().get('albedo', 1.)
+
+
+def render_image_wavefront(nx, ny, ns, scene, camera, tile_size=32, max_depth=50, rng=None, stratified=False,
+                           stats=False, sampler=None, precision=None):
+    """
+    Render an image via raytracing, advancing all rays of an image tile
+    simultaneously bounce by bounce ("wavefront" path tracing).
+
+    The result is statistically equivalent to `rendering.render_image`.
+
+    Args:
+        nx: width of rendered image (pixels)
+        ny: height of rendered image (pixels)
+        ns: number of samples (rays) per pixel
+        scene: geometric scene (surface assembly of spheres, or its compiled or packed form)
+        camera: camera for generating rays
+        tile_size: edge length of the square image tiles rendered at once (pixels)
+        max_depth: how often a ray is allowed to scatter
+        rng: random number generator (`numpy.random.Generator`)
+        stratified: whether to stratify the antialiasing offsets within each pixel
+        stats: whether to collect rendering statistics (see `instrumentation.RenderStats`),
+            including the timings per tile
+        sampler: sampling strategy (see `samplers.Sampler`) replacing `rng` and `stratified`,
+            or None for independent samples drawn from `rng`
+        precision: floating-point precision of ray generation, intersection, scattering and accumulation,
+            'float64' or 'float32' (by default the one of a packed scene, otherwise 'float64')
+
+    Returns:
+        numpy.ndarray: rendered image of shape `(nx, ny, 3)`,
+        or tuple of the image and the rendering statistics if `stats` is True
+    """
+    if stats:
+        with instrumentation.collect() as rs:
+            im = render_image_wavefront(nx, ny, ns, scene, camera, tile_size, max_depth, rng, stratified,
+                                        sampler=sampler, precision=precision)
+        return (im, rs)
+    rs = instrumentation.current
+    if rng is None:
+        rng = np.random.default_rng()
+    if sampler is not None and stratified:
+        raise ValueError('stratified offsets are not supported in combination with a sampler')
+    packed = pack_scene(scene, precision)
+    col = np.zeros((nx, ny, 3), dtype=packed.precision.dtype)
+    for tile in image_tiles(nx, ny, tile_size):
+        i0, i1, j0, j1 = tile
+        tile_rng = rng if sampler is None else sampler.tile_samples(i0, i1, j0, j1, ny, ns)
+        if rs is not None:
+            with rs.tile(tile):
+                col[i0:i1, j0:j1] = render_tile(i0, i1, j0, j1, nx, ny, ns, packed, camera, max_depth, tile_rng, stratified)
+        else:
+            col[i0:i1, j0:j1] = render_tile(i0, i1, j0, j1, nx, ny, ns, packed, camera, max_depth, tile_rng, stratified)
+    return radiance_to_image(col)
+
+
+def pack_scene(scene, precision=None):
+    """
+    Packed form of a scene with the requested precision (see `PackedScene`);
+    an already packed scene is returned unchanged if its precision agrees or none is requested.
+    """
+    if isinstance(scene, PackedScene):
+        if precision is not None and get_precision(precision) is not scene.precision:
+            raise ValueError('scene is packed with precision {}, requested {}'.format(
+                scene.precision.dtype.name, get_precision(precision).dtype.name))
+        return scene
+    return PackedScene(scene, precision)
+
+
+def compiled_geometry(scene):
+    """
+    Primitive arrays of a scene, like `CompiledSurfaceAssembly`: surface assemblies are compiled,
+    and packed scenes and acceleration structures (like `BVH`) are unwrapped.
+    """
+    if isinstance(scene, SurfaceAssembly):
+        return scene.compile()
+    if isinstance(scene, PackedScene):
+        scene = scene.geometry
+    # acceleration structures keep the primitive arrays as attribute `geometry`
+    return getattr(scene, 'geometry', scene)
+
+
+def image_tiles(nx, ny, tile_size):
+    """
+    Partition an image into tiles.
+
+    Returns:
+        list: tiles as tuples `(i0, i1, j0, j1)` covering the pixels `[i0, i1) x [j0, j1)`
+    """
+    return [(i0, min(i0 + tile_size, nx), j0, min(j0 + tile_size, ny))
+            for i0 in range(0, nx, tile_size)
+            for j0 in range(0, ny, tile_size)]
+
+
+def render_tile(i0, i1, j0, j1, nx, ny, ns, packed, camera, max_depth, rng, stratified=False, aov=None):
+    """
+    Render the pixels `[i0, i1) x [j0, j1)` of an image.
+
+    If `aov` is a dictionary, the first-hit feature buffers (see `trace_paths`),
+    averaged over the samples of each pixel, are stored in it, together with
+    the estimated variance of the averaged luminance per pixel ('variance').
+
+    Returns:
+        numpy.ndarray: averaged radiance of shape `(i1 - i0, j1 - j0, 3)`
+    """
+    origins, directions = camera.get_pixel_rays(nx, ny, ns, rng, tile=(i0, i1, j0, j1), stratified=stratified,
+                                                dtype=packed.precision.dtype)
+    features = {} if aov is not None else None
+    col = trace_paths(origins, directions, packed, max_depth, rng, aov=features)
+    col = col.reshape((i1 - i0, j1 - j0, ns, 3))
+    if aov is not None:
+        for key, value in features.items():
+            aov[key] = value.reshape((i1 - i0, j1 - j0, ns) + value.shape[1:]).mean(axis=2)
+        aov['variance'] = luminance(col).var(axis=2, ddof=1) / ns if ns > 1 else np.zeros((i1 - i0, j1 - j0))
+    return col.mean(axis=2)
+
+
+def trace_pixels(i, j, nx, ny, packed, camera, max_depth, rng):
+    """
+    Trace one camera ray through each of the pixels `(i[k], j[k])` and return their colors.
+
+    Returns:
+        numpy.ndarray: ray colors as RGB values, array of shape `(len(i), 3)`
+    """
+    # add a random offset for antialiasing
+    s = (i + rng.random(len(i))) / nx
+    t = (j + rng.random(len(j))) / ny
+    origins, directions = camera.get_rays(s, t, rng, packed.precision.dtype)
+    return trace_paths(origins, directions, packed, max_depth, rng)
+
+
+def trace_paths(origins, directions, packed, max_depth, rng, primary=None, aov=None, visit=None):
+    """
+    Trace a batch of rays through the scene and return their colors.
+
+    Args:
+        origins: ray origins, array of shape `(n, 3)`
+        directions: ray directions, array of shape `(n, 3)`
+        packed: packed scene
+        max_depth: how often a ray is allowed to scatter
+        rng: random number generator, or samples of the paths (`samplers.PathSamples`)
+        primary: precomputed intersections of the rays as tuple `(index, t, points, normals)`
+            (like the last four entries returned by `gbuffer.primary_hits`), or None to compute them
+        aov: dictionary receiving the features of the first hit per ray (arbitrary output variables):
+            'albedo' (material reflectance, or sky color for rays without intersection),
+            'normal' (surface normal, or zero) and 'depth' (distance to the hit point)
+        visit: function `visit(paths, index)` called at each bounce with the indices of the rays
+            that hit an object and the indices of the hit objects
+
+    Returns:
+        numpy.ndarray: ray colors as RGB values, array of shape `(n, 3)`
+    """
+    n = len(origins)
+    precision = packed.precision
+    col = np.zeros((n, 3), dtype=precision.dtype)
+    # indices of live paths and their accumulated attenuation
+    live = np.arange(n)
+    throughput = np.ones((n, 3), dtype=precision.dtype)
+    rs = instrumentation.current
+    for depth in range(max_depth + 1):
+        if len(live) == 0:
+            break
+        if rs is not None:
+            rs.add_rays(depth, len(live))
+            tstart = time.perf_counter()
+        if depth == 0 and primary is not None:
+            index, t = primary[:2]
+        else:
+            index, t = packed.geometry.hit_batch(origins, directions, precision.t_min, precision.t_max)
+        if rs is not None:
+            rs.add_time('intersection', tstart)
+        if depth == 0 and aov is not None:
+            first_hit_features(aov, packed, origins, directions, index, t, primary)
+        miss = index < 0
+        col[live[miss]] = throughput[miss] * sky_color(directions[miss])
+        if rs is not None:
+            rs.escaped_paths += int(np.count_nonzero(miss))
+        if visit is not None:
+            visit(live[~miss], index[~miss])
+        if depth == max_depth:
+            # paths exceeding the maximum depth contribute no light
+            if rs is not None:
+                rs.terminated_paths += len(live) - int(np.count_nonzero(miss))
+            break
+        # compact remaining paths and sort them by material type and index
+        hit = np.nonzero(~miss)[0]
+        mat = packed.geometry.material_index[index[hit]]
+        order = hit[np.argsort(packed.mat_type[mat]*len(packed.mat_type) + mat, kind='stable')]
+        live = live[order]
+        throughput = throughput[order]
+        index = index[order]
+        if depth == 0 and primary is not None:
+            points = primary[2][order]
+            normals = primary[3][order]
+        else:
+            points = origins[order] + t[order, None]*directions[order]
+            normals = packed.geometry.normals(index, points)
+        if rs is not None:
+            tstart = time.perf_counter()
+        # low-discrepancy samples: each bounce draws from its own dimensions
+        srng = rng.bounce(live, depth) if isinstance(rng, PathSamples) else rng
+        directions, attenuation, valid = scatter(packed, packed.geometry.material_index[index], directions[order], points, normals, srng)
+        if rs is not None:
+            rs.add_time('scatter', tstart)
+            rs.absorbed_paths += len(valid) - int(np.count_nonzero(valid))
+        # absorbed paths contribute no light
+        live = live[valid]
+        origins = points[valid]
+        directions = directions[valid]
+        throughput = throughput[valid] * attenuation[valid]
+    return col
+
+
+def first_hit_features(aov, packed, origins, directions, index, t, primary=None):
+    """
+    Store the albedo, normal and depth features of the first intersection of a batch of rays in `aov`.
+    """
+    hit = index >= 0
+    albedo = sky_color(directions)
+    albedo[hit] = packed.albedo[packed.geometry.material_index[index[hit]]]
+    normals = np.zeros_like(directions)
+    if primary is not None:
+        normals[hit] = primary[3][hit]
+    else:
+        normals[hit] = packed.geometry.normals(index[hit], origins[hit] + t[hit, None]*directions[hit])
+    aov['albedo'] = albedo
+    aov['normal'] = normals
+    aov['depth'] = t * np.linalg.norm(directions, axis=1)
+
+
+def scatter(packed, index, directions, points, normals, rng):
+    """
+    Scatter a batch of rays at the materials with indices `index`.
+
+    The batched scatter kernel of each material type is invoked once,
+    with the material parameters gathered per ray. Rays sorted by material
+    type and index form contiguous batches.
+
+    Returns:
+        tuple: tuple containing
+          - scattered:   scattered ray directions
+          - attenuation: reflectance per color channel
+          - valid:       mask indicating whether a scattered ray exists
+    """
+    n = len(index)
+    scattered = np.empty((n, 3), dtype=directions.dtype)
+    attenuation = np.empty((n, 3), dtype=directions.dtype)
+    valid = np.empty(n, dtype=bool)
+    mat_type = packed.mat_type[index]
+    for k, material_type in enumerate(packed.material_types):
+        sel = np.nonzero(mat_type == k)[0]
+        if len(sel) == 0:
+            continue
+        if sel[-1] - sel[0] + 1 == len(sel):
+            # contiguous batch
+            sel = slice(sel[0], sel[-1] + 1)
+        rows = packed.mat_row[index[sel]]
+        params = {key: value[rows] for key, value in packed.parameters[k].items()}
+        scattered[sel], attenuation[sel], valid[sel] = material_type.scatter_batch(
+            directions[sel], points[sel], normals[sel], rng.select(sel) if isinstance(rng, PathSamples) else rng, **params)
+    return (scattered, attenuation, valid)
+
+
+def sky_color(directions):
+    """Blue background sky color for a batch of ray directions."""
+    t = 0.5*(unit_vector(directions)[:, 1] + 1)
+    return (1 - t)[:, None]*np.array([1.0, 1.0, 1.0], dtype=t.dtype) + t[:, None]*np.array([0.5, 0.7, 1.0], dtype=t.dtype)
+
+
+def luminance(col):
+    """Luminance of RGB values (last axis)."""
+    return col @ np.array([0.2126, 0.7152, 0.0722])
+
+
+def radiance_to_image(col):
+    """
+    Convert averaged pixel radiance of shape `(nx, ny, 3)` to an 8-bit image,
+    using the same orientation and gamma correction as `rendering.render_image`.
+    """
+    return gamma_encode(col)[:, ::-1]
+
+
+def gamma_encode(col):
+    """Clip radiance values to `[0, 1]` and gamma-correct them to 8-bit values."""
+    # take sqrt for gamma correction
+    return np.round(255 * np.sqrt(np.clip(col, 0, 1))).astype(np.uint8)
@@ -2,11 +2,11 @@ from __future__ import division
 import numpy as np
 import imageio
 import sys
-sys.path.append('../engine/')
-from surface import SurfaceAssembly, Sphere
-from material import Lambertian, Metal, Dielectric
-from camera import Camera
-from rendering import render_image
+sys.path.append('../')
+from engine.surface import SurfaceAssembly, Sphere
+from engine.material import Lambertian, Metal, Dielectric
+from engine.camera import Camera
+from engine.rendering import render_image
 
 
 def main():
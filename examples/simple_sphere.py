@@ -2,11 +2,11 @@ from __future__ import division
 import numpy as np
 import imageio
 import sys
-sys.path.append('../engine/')
-from surface import SurfaceAssembly, Sphere
-from material import Lambertian
-from camera import Camera
-from rendering import ray_color
+sys.path.append('../')
+from engine.surface import SurfaceAssembly, Sphere
+from engine.material import Lambertian
+from engine.camera import Camera
+from engine.rendering import ray_color
 
 
 def main():
@@ -0,0 +1,40 @@
+import unittest
+import numpy as np
+import sys
+sys.path.append('../')
+from engine.surface import SurfaceAssembly, Sphere
+from engine.material import Lambertian, Metal
+from engine.camera import Camera
+from engine.adaptive import render_image_adaptive
+
+
+class TestAdaptive(unittest.TestCase):
+
+    def test_sample_allocation(self):
+
+        nx = 24
+        ny = 12
+        cam = Camera(np.zeros(3), np.array([0., 0., -1.]), np.array([0., 1., 0.]), np.pi/2, nx / ny, 0., 1.)
+
+        # only the (deterministic) sky
+        scene = SurfaceAssembly()
+        im, mean_samples = render_image_adaptive(nx, ny, 64, scene, cam, tolerance=0.01, min_ns=4,
+                                                 rng=np.random.default_rng(42))
+        self.assertEqual(im.shape, (nx, ny, 3), msg='rendered image must have shape (nx, ny, 3)')
+        self.assertEqual(mean_samples, 4, msg='sky pixels must not receive additional samples')
+
+        scene.add_object(Sphere(np.array([0., 0., -1.]), 0.5, Metal(np.array([0.8, 0.6, 0.2]), 1.0)))
+        scene.add_object(Sphere(np.array([0., -100.5, -1.]), 100., Lambertian(np.array([0.8, 0.8, 0.0]))))
+        im, mean_samples = render_image_adaptive(nx, ny, 64, scene, cam, tolerance=0.01, min_ns=4,
+                                                 rng=np.random.default_rng(42))
+        self.assertGreater(mean_samples, 4, msg='noisy pixels must receive additional samples')
+        self.assertLess(mean_samples, 64, msg='converged pixels must not receive the maximum number of samples')
+
+        for kwargs in [{'max_ns': 0}, {'min_ns': 0}, {'batch_ns': -1}, {'tolerance': 0.}]:
+            args = dict({'max_ns': 64, 'tolerance': 0.01, 'min_ns': 4}, **kwargs)
+            with self.assertRaises(ValueError):
+                render_image_adaptive(nx, ny, args.pop('max_ns'), scene, cam, **args)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import unittest
+import numpy as np
+import sys
+sys.path.append('../')
+from engine.surface import SurfaceAssembly, Sphere
+from engine.material import Lambertian, Metal
+from engine.camera import Camera
+from engine.animation import interpolate_cameras, render_animation
+
+
+class TestAnimation(unittest.TestCase):
+
+    def test_interpolate_cameras(self):
+
+        keyframes = [
+            {'lookfrom': np.array([0., 0., 0.]), 'lookat': np.array([0., 0., -1.]), 'vfov': np.pi/2, 'aperture': 0.,  'focus_dist': 1.},
+            {'lookfrom': np.array([2., 1., 0.]), 'lookat': np.array([0., 0., -3.]), 'vfov': np.pi/4, 'aperture': 0.2, 'focus_dist': 3.},
+        ]
+        cameras = interpolate_cameras(keyframes, 5, 2.)
+        self.assertEqual(len(cameras), 5)
+        vup = np.array([0., 1., 0.])
+        for cam, kf in [(cameras[0], keyframes[0]), (cameras[-1], keyframes[1])]:
+            ref = Camera(kf['lookfrom'], kf['lookat'], vup, kf['vfov'], 2., kf['aperture'], kf['focus_dist'])
+            self.assertAlmostEqual(np.linalg.norm(cam._lower_left_corner - ref._lower_left_corner), 0, delta=1e-14,
+                msg='cameras must agree with keyframes at keyframe positions')
+            self.assertAlmostEqual(cam._lens_radius, ref._lens_radius, delta=1e-14)
+        self.assertAlmostEqual(np.linalg.norm(cameras[2]._origin - np.array([1., 0.5, 0.])), 0, delta=1e-14,
+            msg='camera position must be interpolated linearly')
+
+        # explicit keyframe positions
+        keyframes[0]['frame'] = 0
+        keyframes[1]['frame'] = 2
+        cameras = interpolate_cameras(keyframes, 4, 2.)
+        self.assertAlmostEqual(np.linalg.norm(cameras[3]._origin - keyframes[1]['lookfrom']), 0, delta=1e-14,
+            msg='camera must remain at last keyframe')
+        self.assertEqual(len(interpolate_cameras(keyframes, 1, 2.)), 1)
+
+        # invalid arguments
+        without_frame = [{key: value for key, value in kf.items() if key != 'frame'} for kf in keyframes]
+        with self.assertRaises(ValueError):
+            interpolate_cameras([keyframes[0], without_frame[1]], 4, 2.)
+        with self.assertRaises(ValueError):
+            interpolate_cameras(keyframes, 0, 2.)
+        with self.assertRaises(ValueError):
+            interpolate_cameras(without_frame, 1, 2.)
+
+    def test_render_animation(self):
+
+        nx = 16
+        ny = 12
+        scene = SurfaceAssembly()
+        scene.add_object(Sphere(np.array([0., 0., -1.]), 0.5, Metal(np.array([0.8, 0.6, 0.2]), 0.3)))
+        scene.add_object(Sphere(np.array([0., -100.5, -1.]), 100., Lambertian(np.array([0.8, 0.8, 0.0]))))
+        keyframes = [
+            {'lookfrom': np.array([-1., 0., 0.]), 'lookat': np.array([0., 0., -1.]), 'vfov': np.pi/2, 'aperture': 0., 'focus_dist': 1.},
+            {'lookfrom': np.array([ 1., 0., 0.]), 'lookat': np.array([0., 0., -1.]), 'vfov': np.pi/2, 'aperture': 0., 'focus_dist': 1.},
+        ]
+        cameras = interpolate_cameras(keyframes, 3, nx / ny)
+
+        frames = [{}, {}]
+        for frames_out, max_workers in zip(frames, [1, 2]):
+            paths = render_animation(nx, ny, 2, scene, cameras, path_pattern='frame{}', writer=frames_out.__setitem__,
+                                     tile_size=8, max_workers=max_workers, seed=42, max_depth=5, accelerate=True)
+            self.assertEqual(paths, ['frame0', 'frame1', 'frame2'])
+        for path in paths:
+            self.assertEqual(frames[0][path].shape, (nx, ny, 3), msg='frames must have shape (nx, ny, 3)')
+            self.assertTrue(np.array_equal(frames[0][path], frames[1][path]),
+                msg='frames must not depend on number of workers')
+        self.assertFalse(np.array_equal(frames[0]['frame0'], frames[0]['frame2']),
+            msg='frames must follow camera path')
+
+
+if __name__ == '__main__':
+    unittest.main()
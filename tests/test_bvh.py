@@ -0,0 +1,93 @@
+import unittest
+import numpy as np
+import sys
+sys.path.append('../')
+from engine.surface import SurfaceAssembly, Sphere, Plane, Disk, Box
+from engine.material import Lambertian, Dielectric
+from engine.ray import Ray
+from engine.bvh import BVH
+
+
+class TestBVH(unittest.TestCase):
+
+    def test_bvh_hit(self):
+
+        rng = np.random.default_rng(42)
+
+        scene = SurfaceAssembly()
+        for _ in range(200):
+            scene.add_object(Sphere(rng.uniform(-5, 5, size=3), rng.uniform(0.1, 0.5), Lambertian(rng.random(3))))
+        # imitate hollow glass sphere
+        scene.add_object(Sphere(np.array([-1., 0., -1.]),  0.5,  Dielectric(1.5)))
+        scene.add_object(Sphere(np.array([-1., 0., -1.]), -0.45, Dielectric(1.5)))
+        compiled = scene.compile()
+        bvh = BVH(compiled, leaf_size=2)
+
+        self.assertGreater(bvh.build_stats['num_leaves'], 1, msg='BVH must be subdivided')
+        self.assertEqual(np.sum(bvh.count[bvh.left < 0]), len(compiled),
+            msg='leaves must contain every primitive exactly once')
+
+        origins = rng.uniform(-6, 6, size=(300, 3))
+        directions = rng.normal(size=(300, 3))
+        index_ref, t_ref = compiled.hit_batch(origins, directions, 0.001, 1e6)
+        index, t = bvh.hit_batch(origins, directions, 0.001, 1e6)
+        self.assertTrue(np.array_equal(index, index_ref), msg='closest hit sphere must agree with linear assembly')
+        self.assertAlmostEqual(np.linalg.norm(t - t_ref), 0, delta=1e-12,
+            msg='ray parameter must agree with linear assembly')
+
+        for k in range(20):
+            ray = Ray(origins[k], directions[k])
+            rec, tk = bvh.hit(ray, 0.001, 1e6)
+            if index_ref[k] < 0:
+                self.assertIsNone(rec, msg='ray must not hit any sphere')
+            else:
+                self.assertAlmostEqual(tk, t_ref[k], delta=1e-12,
+                    msg='ray parameter must agree with linear assembly')
+                self.assertIs(rec.material, scene._objects[index_ref[k]].material,
+                    msg='closest hit sphere must agree with linear assembly')
+
+        self.assertEqual(bvh.query_stats['num_rays'], 320, msg='query statistics must count traced rays')
+
+    def test_bvh_primitives(self):
+
+        rng = np.random.default_rng(3)
+
+        scene = SurfaceAssembly()
+        # ground plane, kept outside of the tree
+        scene.add_object(Plane(np.array([0., -5., 0.]), np.array([0., 1., 0.]), Lambertian(0.5)))
+        for _ in range(50):
+            scene.add_object(Sphere(rng.uniform(-5, 5, size=3), rng.uniform(0.1, 0.5), Lambertian(rng.random(3))))
+            scene.add_object(Disk(rng.uniform(-5, 5, size=3), rng.normal(size=3), rng.uniform(0.1, 0.5), Lambertian(rng.random(3))))
+            lower = rng.uniform(-5, 5, size=3)
+            scene.add_object(Box(lower, lower + rng.uniform(0.1, 0.5, size=3), Lambertian(rng.random(3))))
+        compiled = scene.compile()
+        bvh = BVH(compiled, leaf_size=2)
+        self.assertEqual(len(bvh.unbounded), 1, msg='infinite plane must not be stored in the tree')
+        self.assertEqual(bvh.build_stats['num_primitives'], len(compiled))
+
+        origins = rng.uniform(-6, 6, size=(300, 3))
+        directions = rng.normal(size=(300, 3))
+        index_ref, t_ref = compiled.hit_batch(origins, directions, 0.001, 1e6)
+        index, t = bvh.hit_batch(origins, directions, 0.001, 1e6)
+        self.assertTrue(np.array_equal(index, index_ref), msg='closest hit primitive must agree with linear assembly')
+        self.assertAlmostEqual(np.linalg.norm(t - t_ref), 0, delta=1e-12)
+
+        for k in range(20):
+            rec, tk = bvh.hit(Ray(origins[k], directions[k]), 0.001, 1e6)
+            rec_ref, _ = compiled.hit(Ray(origins[k], directions[k]), 0.001, 1e6)
+            if index_ref[k] < 0:
+                self.assertIsNone(rec)
+            else:
+                self.assertAlmostEqual(tk, t_ref[k], delta=1e-12)
+                self.assertAlmostEqual(np.linalg.norm(rec.normal - rec_ref.normal), 0, delta=1e-12)
+
+        # tree without bounded primitives
+        plane_only = SurfaceAssembly()
+        plane_only.add_object(Plane(np.zeros(3), np.array([0., 0., 1.]), Lambertian(0.5)))
+        index, t = BVH(plane_only).hit_batch(np.array([[0., 0., 1.]]), np.array([[0., 0., -1.]]), 0.001, 1e6)
+        self.assertEqual(index[0], 0)
+        self.assertAlmostEqual(t[0], 1., delta=1e-14)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+import numpy as np
+import sys
+sys.path.append('../')
+from engine.camera import Camera, stratified_layout
+
+
+class TestCamera(unittest.TestCase):
+
+    def test_get_rays(self):
+
+        rng = np.random.default_rng(42)
+
+        # pinhole camera (without depth of field) generates deterministic rays
+        cam = Camera(np.array([-3., 3., 3.]), np.zeros(3), np.array([0., 1., 0.]), np.pi/9, 2., 0., 5.)
+        s = rng.random(10)
+        t = rng.random(10)
+        origins, directions = cam.get_rays(s, t, rng)
+        self.assertTrue(origins.flags['C_CONTIGUOUS'] and directions.flags['C_CONTIGUOUS'],
+            msg='ray arrays must be contiguous')
+        for k in range(10):
+            ray = cam.get_ray(s[k], t[k])
+            self.assertAlmostEqual(np.linalg.norm(origins[k] - ray.origin), 0, delta=1e-14,
+                msg='ray origin must agree with single-ray generation')
+            self.assertAlmostEqual(np.linalg.norm(directions[k] - ray.direction), 0, delta=1e-14,
+                msg='ray direction must agree with single-ray generation')
+
+        # rays of a thin lens camera must pass through the focus plane at the same point as the pinhole rays
+        cam_lens = Camera(np.array([-3., 3., 3.]), np.zeros(3), np.array([0., 1., 0.]), np.pi/9, 2., 0.5, 5.)
+        origins_lens, directions_lens = cam_lens.get_rays(s, t, rng)
+        self.assertGreater(np.linalg.norm(origins_lens - origins), 0, msg='ray origins must be sampled on the lense')
+        self.assertAlmostEqual(np.linalg.norm((origins_lens + directions_lens) - (origins + directions)), 0, delta=1e-13,
+            msg='rays must target the same point on the focus plane')
+
+    def test_get_pixel_rays(self):
+
+        rng = np.random.default_rng(42)
+        nx = 8
+        ny = 6
+        cam = Camera(np.zeros(3), np.array([0., 0., -1.]), np.array([0., 1., 0.]), np.pi/2, nx / ny, 0., 1.)
+        for ns in [4, 5]:
+            for stratified in [False, True]:
+                origins, directions = cam.get_pixel_rays(nx, ny, ns, rng, tile=(2, 5, 1, 3), stratified=stratified)
+                self.assertEqual(directions.shape, (3*2*ns, 3), msg='number of rays must agree with tile size')
+                # recover pixel coordinates from ray directions on the focus window
+                p = directions - cam._lower_left_corner
+                s = np.dot(p, cam._horizontal) / np.dot(cam._horizontal, cam._horizontal)
+                t = np.dot(p, cam._vertical) / np.dot(cam._vertical, cam._vertical)
+                i, j = np.meshgrid(np.arange(2, 5), np.arange(1, 3), indexing='ij')
+                self.assertTrue(np.array_equal(np.floor(s*nx), np.repeat(i.reshape(-1), ns)),
+                    msg='rays must be ordered by pixel')
+                self.assertTrue(np.array_equal(np.floor(t*ny), np.repeat(j.reshape(-1), ns)),
+                    msg='rays must be ordered by pixel')
+
+    def test_stratified_layout(self):
+
+        rng = np.random.default_rng(42)
+        for ns in [9, 7]:
+            strata, shape = stratified_layout(3, ns, rng)
+            self.assertEqual(strata.shape, (3*ns, 2))
+            for k in range(3):
+                # each pixel covers every row and column of the strata grid equally
+                for d in range(2):
+                    counts = np.bincount(strata[k*ns:(k + 1)*ns, d], minlength=shape[d])
+                    self.assertTrue(np.all(counts == ns // shape[d]), msg='samples must be stratified')
+
+
+if __name__ == '__main__':
+    unittest.main()
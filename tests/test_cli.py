@@ -0,0 +1,71 @@
+import unittest
+import json
+import os
+import subprocess
+import tempfile
+import numpy as np
+import sys
+sys.path.append('../')
+from engine import cli
+from engine.scenefile import save_scene
+from engine.service import scene_from_spec
+from test_service import make_job, render_reference
+
+
+class TestCLI(unittest.TestCase):
+
+    def test_batch_render(self):
+
+        jobs = [make_job(16, 8, seed=k) for k in range(2)]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            jobs_path = os.path.join(tmpdir, 'jobs.json')
+            with open(jobs_path, 'w') as f:
+                json.dump(jobs, f)
+            # scene file rendered with the camera and image settings of the command line
+            scene_path = os.path.join(tmpdir, 'scene.bin')
+            save_scene(scene_path, scene_from_spec(jobs[0]['scene']))
+            args = [jobs_path, scene_path, '--camera', json.dumps(jobs[0]['camera']),
+                    '--nx', '16', '--ny', '8', '--ns', '2', '--max-depth', '5', '--seed', '7', '--workers', '2']
+
+            cli.main(args + ['--format', 'npy', '--output-dir', os.path.join(tmpdir, 'npy')])
+            self.assertEqual(sorted(os.listdir(os.path.join(tmpdir, 'npy'))), ['jobs_000.npy', 'jobs_001.npy', 'scene.npy'])
+            for k, job in enumerate(jobs):
+                im = np.load(os.path.join(tmpdir, 'npy', 'jobs_{:03d}.npy'.format(k)))
+                self.assertTrue(np.array_equal(im, render_reference(job)))
+            im = np.load(os.path.join(tmpdir, 'npy', 'scene.npy'))
+            self.assertTrue(np.array_equal(im, render_reference(dict(jobs[0], tile_size=32, seed=7))),
+                msg='scene file must be rendered with the command-line settings')
+
+            cli.main(args + ['--format', 'npz', '--output-dir', tmpdir])
+            with np.load(os.path.join(tmpdir, 'renders.npz')) as archive:
+                self.assertEqual(sorted(archive.files), ['jobs_000', 'jobs_001', 'scene'])
+                self.assertTrue(np.array_equal(archive['scene'], im))
+
+            # scene file without camera
+            with self.assertRaises(ValueError):
+                cli.load_jobs([scene_path], {'nx': 16, 'ny': 8, 'ns': 2})
+
+            # output names must be unique
+            os.mkdir(os.path.join(tmpdir, 'other'))
+            other_path = os.path.join(tmpdir, 'other', 'scene.bin')
+            save_scene(other_path, scene_from_spec(jobs[0]['scene']))
+            defaults = {'camera': jobs[0]['camera'], 'nx': 16, 'ny': 8, 'ns': 2}
+            with self.assertRaises(ValueError):
+                cli.load_jobs([scene_path, other_path], defaults)
+            with open(jobs_path, 'w') as f:
+                json.dump([dict(job, output='same') for job in jobs], f)
+            with self.assertRaises(ValueError):
+                cli.load_jobs([jobs_path], defaults)
+
+    def test_lazy_imports(self):
+
+        code = ('import sys; import engine; loaded = [m for m in sys.modules if m.startswith("engine.")]; '
+                'engine.Camera; print(loaded, "engine.camera" in sys.modules, "engine.service" in sys.modules)')
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        out = subprocess.run([sys.executable, '-c', code], cwd=root, capture_output=True, text=True, check=True).stdout
+        self.assertEqual(out.split(), ['[]', 'True', 'False'],
+            msg='submodules must only be imported on first access')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+import numpy as np
+import sys
+sys.path.append('../')
+from engine.surface import SurfaceAssembly, Sphere
+from engine.material import Lambertian, Dielectric
+from engine.camera import Camera
+from engine.samplers import SobolSampler
+from engine.denoise import render_buffers, denoise
+
+
+class TestDenoise(unittest.TestCase):
+
+    def test_render_buffers(self):
+
+        nx = 24
+        ny = 16
+        scene = SurfaceAssembly()
+        scene.add_object(Sphere(np.array([0., 0., -2.]), 0.5, Lambertian(np.array([0.1, 0.2, 0.5]))))
+        scene.add_object(Sphere(np.array([1.5, 0., -2.]), 0.5, Dielectric(1.5)))
+        cam = Camera(np.zeros(3), np.array([0., 0., -1.]), np.array([0., 1., 0.]), np.pi/2, nx / ny, 0., 1.)
+        col, aov = render_buffers(nx, ny, 4, scene, cam, tile_size=8, max_depth=5, rng=np.random.default_rng(42))
+        self.assertEqual(col.shape, (nx, ny, 3))
+        self.assertEqual(aov['depth'].shape, (nx, ny))
+        self.assertEqual(aov['variance'].shape, (nx, ny))
+        # pixel at the image center sees the front of the diffuse sphere
+        c = (nx // 2, ny // 2)
+        self.assertTrue(np.allclose(aov['albedo'][c], [0.1, 0.2, 0.5]))
+        self.assertGreater(aov['normal'][c][2], 0.9)
+        self.assertAlmostEqual(aov['depth'][c], 1.5, delta=0.05)
+        # glass appears white in the albedo buffer
+        g = (int(nx*(0.5 + 0.75*ny/nx/2)), ny // 2)
+        self.assertTrue(np.allclose(aov['albedo'][g], 1.))
+        # corner pixel sees the sky
+        self.assertTrue(np.array_equal(aov['normal'][0, -1], np.zeros(3)))
+        self.assertTrue(np.allclose(aov['albedo'][0, -1], col[0, -1]), msg='sky albedo must be the sky color')
+
+    def test_denoise(self):
+
+        nx = 64
+        ny = 32
+        rng = np.random.default_rng(42)
+        # two surfaces with different albedo and orientation, separated by a vertical edge
+        left = np.arange(nx) < nx // 2
+        albedo = np.where(left[:, None, None], np.array([0.8, 0.2, 0.2]), np.array([0.2, 0.2, 0.8])) * np.ones((nx, ny, 3))
+        normal = np.where(left[:, None, None], np.array([0., 0., 1.]), np.array([1., 0., 0.])) * np.ones((nx, ny, 3))
+        depth = np.full((nx, ny), 2.)
+        ns = 4
+        samples = albedo[:, :, None, :] * rng.exponential(size=(nx, ny, ns, 1))
+        col = samples.mean(axis=2)
+        variance = (samples @ np.array([0.2126, 0.7152, 0.0722])).var(axis=2, ddof=1) / ns
+        for var in [variance, None]:
+            filtered = denoise(col, albedo, normal, depth, var)
+            err_noisy = np.sqrt(np.mean((col - albedo)**2))
+            err_filtered = np.sqrt(np.mean((filtered - albedo)**2))
+            self.assertLess(err_filtered, 0.25*err_noisy, msg='denoising must reduce the error')
+            # no blurring across the edge
+            self.assertTrue(np.allclose(filtered[nx//2 - 1].mean(axis=0), [0.8, 0.2, 0.2], atol=0.1))
+            self.assertTrue(np.allclose(filtered[nx//2].mean(axis=0),     [0.2, 0.2, 0.8], atol=0.1))
+
+        # converged input must be preserved
+        filtered = denoise(albedo, albedo, normal, depth, np.zeros((nx, ny)))
+        self.assertTrue(np.allclose(filtered, albedo))
+
+    def test_convergence(self):
+
+        nx = 80
+        ny = 40
+        scene = SurfaceAssembly()
+        scene.add_object(Sphere(np.array([0., 0., -1.]), 0.5, Lambertian(np.array([0.1, 0.2, 0.5]))))
+        scene.add_object(Sphere(np.array([0., -100.5, -1.]), 100., Lambertian(np.array([0.8, 0.8, 0.0]))))
+        cam = Camera(np.zeros(3), np.array([0., 0., -1.]), np.array([0., 1., 0.]), np.pi/2, nx / ny, 0., 1.)
+        ref, _ = render_buffers(nx, ny, 256, scene, cam, max_depth=5, sampler=SobolSampler(1))
+        col, aov = render_buffers(nx, ny, 4, scene, cam, max_depth=5, rng=np.random.default_rng(42))
+        filtered = denoise(col, aov['albedo'], aov['normal'], aov['depth'], aov['variance'])
+        err_noisy = np.sqrt(np.mean((col - ref)**2))
+        err_filtered = np.sqrt(np.mean((filtered - ref)**2))
+        # remaining error mostly due to antialiasing of silhouettes
+        self.assertLess(err_filtered, 0.75*err_noisy)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+import numpy as np
+import sys
+sys.path.append('../')
+from engine.surface import SurfaceAssembly, Sphere
+from engine.material import Lambertian, Metal
+from engine.camera import Camera
+from engine.bvh import BVH
+from engine.gbuffer import PrimaryHitCache, render_image_cached
+from engine import instrumentation
+
+
+def make_scene(fuzz):
+    scene = SurfaceAssembly()
+    scene.add_object(Sphere(np.array([ 0.5, 0., -1.]), 0.5, Metal(np.array([0.8, 0.6, 0.2]), fuzz)))
+    scene.add_object(Sphere(np.array([-0.5, 0., -1.]), 0.5, Lambertian(np.array([0.1, 0.2, 0.5]))))
+    scene.add_object(Sphere(np.array([0., -100.5, -1.]), 100., Lambertian(np.array([0.8, 0.8, 0.0]))))
+    return scene
+
+
+class TestGBuffer(unittest.TestCase):
+
+    def test_render_image_cached(self):
+
+        nx = 16
+        ny = 12
+        cam = Camera(np.zeros(3), np.array([0., 0., -1.]), np.array([0., 1., 0.]), np.pi/2, nx / ny, 0.1, 1.)
+
+        cache = PrimaryHitCache()
+        im1 = render_image_cached(nx, ny, 4, make_scene(0.3), cam, cache, seed=42, tile_size=8, max_depth=5)
+        self.assertEqual((cache.hits, cache.misses), (0, 4))
+
+        # changed material parameter
+        with instrumentation.collect() as stats:
+            im2 = render_image_cached(nx, ny, 4, make_scene(0.8), cam, cache, seed=42, tile_size=8, max_depth=5)
+        self.assertEqual((cache.hits, cache.misses), (4, 4), msg='primary hits must be reused')
+        self.assertEqual(stats.camera_rays, 0, msg='camera rays must not be generated again')
+        self.assertEqual(stats.intersection_tests, 3 * (stats.traced_rays - stats.rays_per_depth[0]),
+            msg='primary rays must not be intersected again')
+        self.assertFalse(np.array_equal(im1, im2))
+        im2_ref = render_image_cached(nx, ny, 4, make_scene(0.8), cam, PrimaryHitCache(), seed=42, tile_size=8, max_depth=5)
+        self.assertTrue(np.array_equal(im2, im2_ref), msg='rendered image must not depend on caching')
+
+        # changed camera and geometry invalidate the cache
+        cam2 = Camera(np.array([0., 0.1, 0.]), np.array([0., 0., -1.]), np.array([0., 1., 0.]), np.pi/2, nx / ny, 0.1, 1.)
+        render_image_cached(nx, ny, 4, make_scene(0.8), cam2, cache, seed=42, tile_size=8, max_depth=5)
+        self.assertEqual((cache.hits, cache.misses), (4, 8))
+        render_image_cached(nx, ny, 4, BVH(make_scene(0.8)), cam2, cache, seed=42, tile_size=8, max_depth=5)
+        self.assertEqual((cache.hits, cache.misses), (4, 12))
+
+    def test_eviction(self):
+
+        cache = PrimaryHitCache(max_bytes=1000)
+        for k in range(5):
+            cache.put(k, (np.zeros(50),))
+        self.assertEqual(len(cache), 2, msg='least recently used entries must be evicted')
+        self.assertLessEqual(cache.nbytes, cache.max_bytes)
+        self.assertIsNone(cache.get(2))
+        self.assertIsNotNone(cache.get(3))
+        cache.put(5, (np.zeros(50),))
+        self.assertIsNotNone(cache.get(3), msg='recently used entry must be retained')
+        self.assertIsNone(cache.get(4))
+
+
+if __name__ == '__main__':
+    unittest.main()
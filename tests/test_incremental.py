@@ -0,0 +1,119 @@
+import unittest
+import numpy as np
+import sys
+sys.path.append('../')
+from engine.surface import SurfaceAssembly, Sphere, Disk
+from engine.material import Lambertian, Metal
+from engine.camera import Camera
+from engine.samplers import IndependentSampler
+from engine.wavefront import render_image_wavefront
+from engine.incremental import IncrementalRenderer
+
+
+def make_scene(offset, albedo):
+    scene = SurfaceAssembly()
+    scene.add_object(Sphere(np.array([0., -100.5, -1.]), 100., Lambertian(np.array([0.8, 0.8, 0.0]))))
+    scene.add_object(Sphere(np.array([0.8, 0., -1.5]), 0.5, Metal(np.array([0.8, 0.6, 0.2]), 0.1)))
+    for k in range(5):
+        scene.add_object(Sphere(np.array([-1. + 0.3*k, -0.4, -1.]), 0.1, Lambertian(np.array([0.1, 0.2, 0.5]))))
+    # edited sphere
+    scene.add_object(Sphere(np.array([-1.2, 0.4, -1.5]) + offset, 0.1, Lambertian(albedo)))
+    return scene
+
+
+class TestIncremental(unittest.TestCase):
+
+    def test_update(self):
+
+        nx = 40
+        ny = 30
+        ns = 4
+        cam = Camera(np.zeros(3), np.array([0., 0., -1.]), np.array([0., 1., 0.]), np.pi/2, nx / ny, 0.05, 1.)
+        sampler = IndependentSampler(42)
+        renderer = IncrementalRenderer(nx, ny, ns, make_scene(np.zeros(3), np.array([0.9, 0.1, 0.1])), cam, max_depth=5, sampler=sampler)
+        ref = render_image_wavefront(nx, ny, ns, make_scene(np.zeros(3), np.array([0.9, 0.1, 0.1])), cam,
+                                     tile_size=8, max_depth=5, sampler=sampler)
+        self.assertTrue(np.array_equal(renderer.image(), ref), msg='initial image must agree with wavefront rendering')
+
+        # re-color the last sphere
+        scene = make_scene(np.zeros(3), np.array([0.1, 0.9, 0.1]))
+        report = renderer.update(scene, [7])
+        self.assertEqual(report.changed_objects, 1)
+        self.assertGreater(report.rerendered_pixels, 0)
+        self.assertLess(report.rerendered_pixels, 0.2 * nx*ny, msg='only pixels near the edited sphere must be re-rendered')
+        ref = render_image_wavefront(nx, ny, ns, scene, cam, tile_size=8, max_depth=5, sampler=sampler)
+        self.assertTrue(np.array_equal(renderer.image(), ref), msg='re-colored image must agree with complete rendering')
+
+        # move the sphere
+        scene = make_scene(np.array([0.5, -0.1, 0.]), np.array([0.1, 0.9, 0.1]))
+        report = renderer.update(scene, [7])
+        self.assertLess(report.rerendered_pixels, 0.3 * nx*ny)
+        ref = render_image_wavefront(nx, ny, ns, scene, cam, tile_size=8, max_depth=5, sampler=sampler)
+        # new position of the sphere must be visible
+        center = scene.compile().centers[7]
+        bounds = renderer.screen_bounds(center - 0.1, center + 0.1)
+        self.assertTrue(np.array_equal(renderer.image()[bounds[0]:bounds[1], ny - bounds[3]:ny - bounds[2]],
+                                       ref[bounds[0]:bounds[1], ny - bounds[3]:ny - bounds[2]]))
+        # secondary hits of the new position are not detected
+        self.assertLess(np.count_nonzero(np.any(renderer.image() != ref, axis=2)), 0.05 * nx*ny)
+
+        # added object
+        scene.add_object(Sphere(np.array([0.2, 0.3, -1.]), 0.05, Lambertian(np.array([0.5, 0.5, 0.5]))))
+        report = renderer.update(scene, [])
+        self.assertEqual(report.changed_objects, 1)
+        with self.assertRaises(ValueError):
+            renderer.update(make_scene(np.zeros(3), np.ones(3)), [0])
+
+    def test_update_mixed_primitives(self):
+
+        nx = 40
+        ny = 30
+        ns = 2
+        cam = Camera(np.zeros(3), np.array([0., 0., -1.]), np.array([0., 1., 0.]), np.pi/2, nx / ny, 0., 1.)
+        sampler = IndependentSampler(7)
+
+        def make_mixed_scene(disk_albedo, spheres):
+            scene = SurfaceAssembly()
+            scene.add_object(Disk(np.array([-0.6, 0., -1.5]), np.array([0., 0., 1.]), 0.3, Lambertian(disk_albedo)))
+            scene.add_object(Sphere(np.array([0., -100.5, -1.]), 100., Lambertian(np.array([0.8, 0.8, 0.0]))))
+            for center in spheres:
+                scene.add_object(Sphere(np.array(center), 0.2, Lambertian(np.array([0.1, 0.2, 0.5]))))
+            return scene
+
+        renderer = IncrementalRenderer(nx, ny, ns, make_mixed_scene(np.array([0.9, 0.1, 0.1]), []), cam, max_depth=5, sampler=sampler)
+        # added sphere precedes the disk in the compiled assembly
+        scene = make_mixed_scene(np.array([0.9, 0.1, 0.1]), [[0.6, 0., -1.5]])
+        report = renderer.update(scene, [])
+        self.assertEqual(report.changed_objects, 1)
+        ref = render_image_wavefront(nx, ny, ns, scene, cam, tile_size=8, max_depth=5, sampler=sampler)
+        i0, i1, j0, j1 = renderer.screen_bounds(np.array([0.4, -0.2, -1.7]), np.array([0.8, 0.2, -1.3]))
+        self.assertTrue(np.array_equal(renderer.image()[i0:i1, ny - j1:ny - j0], ref[i0:i1, ny - j1:ny - j0]),
+            msg='added sphere must be rendered')
+        # re-color the disk, which has been shifted to another compiled index by the added sphere
+        scene = make_mixed_scene(np.array([0.1, 0.9, 0.1]), [[0.6, 0., -1.5]])
+        report = renderer.update(scene, [0])
+        self.assertLess(report.rerendered_pixels, 0.2 * nx*ny, msg='only pixels near the disk must be re-rendered')
+        ref = render_image_wavefront(nx, ny, ns, scene, cam, tile_size=8, max_depth=5, sampler=sampler)
+        i0, i1, j0, j1 = renderer.screen_bounds(np.array([-0.9, -0.3, -1.5]), np.array([-0.3, 0.3, -1.5]))
+        self.assertTrue(np.array_equal(renderer.image()[i0:i1, ny - j1:ny - j0], ref[i0:i1, ny - j1:ny - j0]),
+            msg='re-colored disk must be rendered')
+
+    def test_screen_bounds(self):
+
+        nx = 40
+        ny = 30
+        cam = Camera(np.zeros(3), np.array([0., 0., -1.]), np.array([0., 1., 0.]), np.pi/2, nx / ny, 0., 1.)
+        renderer = IncrementalRenderer(nx, ny, 1, SurfaceAssembly(), cam)
+        # box centered in the image
+        i0, i1, j0, j1 = renderer.screen_bounds(np.array([-0.5, -0.5, -2.5]), np.array([0.5, 0.5, -1.5]))
+        self.assertLessEqual(abs(i0 + i1 - nx), 1)
+        self.assertLessEqual(abs(j0 + j1 - ny), 1)
+        self.assertLess(i1 - i0, nx // 2)
+        # box behind the camera
+        self.assertEqual(renderer.screen_bounds(np.array([-0.5, -0.5, 0.5]), np.array([0.5, 0.5, 1.5])), (0, nx, 0, ny))
+        # unbounded plane
+        self.assertEqual(renderer.screen_bounds(np.array([-np.inf, -1., -np.inf]), np.array([np.inf, -1., np.inf])), (0, nx, 0, ny))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+import numpy as np
+import sys
+sys.path.append('../')
+from engine.surface import SurfaceAssembly, Sphere
+from engine.material import Lambertian, Metal, Dielectric
+from engine.camera import Camera
+from engine.rendering import render_image
+from engine.wavefront import render_image_wavefront
+from engine import instrumentation
+
+
+class TestInstrumentation(unittest.TestCase):
+
+    def setUp(self):
+        self.nx = 12
+        self.ny = 8
+        self.cam = Camera(np.zeros(3), np.array([0., 0., -1.]), np.array([0., 1., 0.]), np.pi/2, self.nx / self.ny, 0., 1.)
+        self.scene = SurfaceAssembly()
+        self.scene.add_object(Sphere(np.array([ 0., 0., -1.]), 0.5, Lambertian(np.array([0.1, 0.2, 0.5]))))
+        self.scene.add_object(Sphere(np.array([ 1., 0., -1.]), 0.5, Metal(np.array([0.8, 0.6, 0.2]), 0.3)))
+        self.scene.add_object(Sphere(np.array([-1., 0., -1.]), 0.5, Dielectric(1.5)))
+        self.scene.add_object(Sphere(np.array([0., -100.5, -1.]), 100., Lambertian(np.array([0.8, 0.8, 0.0]))))
+
+    def check_stats(self, rs, ns):
+        nrays = self.nx * self.ny * ns
+        self.assertEqual(rs.camera_rays, nrays, msg='one camera ray per sample must be counted')
+        self.assertEqual(rs.rays_per_depth[0], nrays, msg='all camera rays must be traced')
+        self.assertEqual(rs.escaped_paths + rs.absorbed_paths + rs.terminated_paths, nrays,
+            msg='each path must end exactly once')
+        self.assertEqual(rs.traced_rays, rs.escaped_paths + sum(rs.material_hits.values()) + rs.terminated_paths,
+            msg='each traced ray must either escape, scatter or be terminated')
+        self.assertEqual(rs.intersection_tests, 4 * rs.traced_rays,
+            msg='each traced ray must be tested against all spheres')
+        self.assertEqual(set(rs.material_hits.keys()), {'Lambertian', 'Metal', 'Dielectric'})
+        self.assertTrue(all(t >= 0 for t in rs.stage_time.values()))
+
+    def test_render_image(self):
+
+        im, rs = render_image(self.nx, self.ny, 2, self.scene, self.cam, max_depth=5, stats=True)
+        self.assertEqual(im.shape, (self.nx, self.ny, 3), msg='rendered image must have shape (nx, ny, 3)')
+        self.check_stats(rs, 2)
+        self.assertEqual(len(rs.tiles), 1)
+        self.assertIsNone(instrumentation.current, msg='instrumentation must be disabled after rendering')
+
+    def test_render_image_wavefront(self):
+
+        rng = np.random.default_rng(42)
+        im, rs = render_image_wavefront(self.nx, self.ny, 4, self.scene, self.cam, tile_size=4, max_depth=5,
+                                        rng=rng, stats=True)
+        self.assertEqual(im.shape, (self.nx, self.ny, 3), msg='rendered image must have shape (nx, ny, 3)')
+        self.check_stats(rs, 4)
+        self.assertEqual(len(rs.tiles), 6, msg='timings must be recorded per tile')
+        self.assertIsNone(instrumentation.current, msg='instrumentation must be disabled after rendering')
+
+        # disabled instrumentation must not change the random number stream
+        im_ref = render_image_wavefront(self.nx, self.ny, 4, self.scene, self.cam, tile_size=4, max_depth=5,
+                                        rng=np.random.default_rng(42))
+        self.assertTrue(np.array_equal(im, im_ref), msg='instrumentation must not change the rendered image')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+import numpy as np
+import sys
+sys.path.append('../')
+from engine.surface import SurfaceAssembly, Sphere
+from engine.material import Lambertian, Metal, Dielectric
+from engine.camera import Camera
+from engine.rendering import render_image
+from engine.wavefront import render_image_wavefront, radiance_to_image
+from engine import kernels
+from engine import sampling
+
+
+class TestKernels(unittest.TestCase):
+
+    def setUp(self):
+        self.nx = 24
+        self.ny = 16
+        self.cam = Camera(np.zeros(3), np.array([0., 0., -1.]), np.array([0., 1., 0.]), np.pi/2, self.nx / self.ny, 0.1, 1.)
+        self.scene = SurfaceAssembly()
+        self.scene.add_object(Sphere(np.array([ 0., 0., -1.]), 0.5, Lambertian(np.array([0.1, 0.2, 0.5]))))
+        self.scene.add_object(Sphere(np.array([ 1., 0., -1.]), 0.5, Metal(np.array([0.8, 0.6, 0.2]), 0.3)))
+        self.scene.add_object(Sphere(np.array([-1., 0., -1.]), 0.5, Dielectric(1.5)))
+        self.scene.add_object(Sphere(np.array([0., -100.5, -1.]), 100., Lambertian(np.array([0.8, 0.8, 0.0]))))
+
+    @unittest.skipUnless(kernels.have_numba(), 'requires numba')
+    def test_numba(self):
+
+        col1 = kernels.render_image_numba(self.nx, self.ny, 16, self.scene, self.cam, max_depth=10, seed=42)
+        col2 = kernels.render_image_numba(self.nx, self.ny, 16, self.scene, self.cam, max_depth=10, seed=42)
+        self.assertTrue(np.array_equal(col1, col2), msg='rendering must be reproducible')
+
+        im = radiance_to_image(col1).astype(float)
+        im_ref = render_image_wavefront(self.nx, self.ny, 16, self.scene, self.cam, max_depth=10,
+                                        rng=np.random.default_rng(42))
+        self.assertLess(np.mean(np.abs(im - im_ref)), 8,
+            msg='compiled kernels must agree with wavefront rendering up to noise')
+
+    def test_fallback(self):
+
+        numba = kernels.numba
+        kernels.numba = None
+        try:
+            sampling.seed(42)
+            with self.assertWarns(UserWarning):
+                im = render_image(self.nx, self.ny, 2, self.scene, self.cam, max_depth=10, backend='numba')
+        finally:
+            kernels.numba = numba
+        sampling.seed(42)
+        im_ref = render_image(self.nx, self.ny, 2, self.scene, self.cam, max_depth=10, backend='numpy')
+        self.assertTrue(np.array_equal(im, im_ref), msg='numba backend must fall back to numpy backend')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,11 +1,11 @@
 import unittest
 import numpy as np
 import sys
-sys.path.append('../engine/')
-from ray import Ray
-from hit_record import HitRecord
-from material import Dielectric
-from utils import unit_vector
+sys.path.append('../')
+from engine.ray import Ray
+from engine.hit_record import HitRecord
+from engine.material import Dielectric, reflect, refract
+from engine.utils import unit_vector
 
 
 class TestMaterial(unittest.TestCase):
@@ -35,6 +35,44 @@ class TestMaterial(unittest.TestCase):
         self.assertAlmostEqual(min(err_reflect, err_refract), 0, delta=1e-14,
             msg='direction of scattered ray must agree with reference')
 
+    def test_dielectric_scatter_batch(self):
+
+        # same ray direction and surface normal as in test_dielectric_scatter,
+        # with ray hitting the surface from either side
+        directions = np.array([[0.1, -0.05, -1.1], [0.1, -0.05, -1.1]])
+        points = np.array([[0.3, 0.4, -0.5], [0.3, 0.4, -0.5]])
+        normal = unit_vector(np.array([0.2, 0.9, -0.1]))
+        normals = np.array([normal, -normal])
+
+        scattered, att, valid = Dielectric.scatter_batch(directions, points, normals, np.random.default_rng(42), ref_idx=0.2)
+
+        self.assertTrue(np.all(valid), msg='dielectric material must always scatter')
+        self.assertEqual(np.linalg.norm(att - 1), 0, msg='dielectric material must not attenuate')
+
+        nraydir = unit_vector(directions[0])
+        # exiting and entering the medium
+        refract_ref = [refract(nraydir, -normal, 0.2), refract(nraydir, -normal, 1 / 0.2)]
+        for k in range(2):
+            candidates = [reflect(nraydir, normals[k])]
+            if refract_ref[k] is not None:
+                candidates.append(refract_ref[k])
+            err = min(np.linalg.norm(scattered[k] - c) for c in candidates)
+            self.assertAlmostEqual(err, 0, delta=1e-14,
+                msg='direction of scattered ray must agree with reflected or refracted direction')
+
+    def test_refract_batch(self):
+
+        v = unit_vector(np.array([[0.1, -0.05, -1.1], [1., -0.02, 0.]]))
+        n = np.array([[0., 0., 1.], [0., 1., 0.]])
+        refracted = refract(v, n, np.array([0.7, 1.5]))
+        for k in range(2):
+            ref = refract(v[k], n[k], [0.7, 1.5][k])
+            if ref is None:
+                self.assertTrue(np.all(np.isnan(refracted[k])), msg='rays without refraction must be NaN')
+            else:
+                self.assertAlmostEqual(np.linalg.norm(refracted[k] - ref), 0, delta=1e-15,
+                    msg='batched refraction must agree with single-ray refraction')
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,35 @@
+import unittest
+import numpy as np
+import sys
+sys.path.append('../')
+from engine.surface import SurfaceAssembly, Sphere
+from engine.material import Lambertian, Metal, Dielectric
+from engine.camera import Camera
+from engine.parallel import render_image_parallel
+
+
+class TestParallel(unittest.TestCase):
+
+    def test_reproducible(self):
+
+        nx = 24
+        ny = 16
+        cam = Camera(np.zeros(3), np.array([0., 0., -1.]), np.array([0., 1., 0.]), np.pi/2, nx / ny, 0.1, 1.)
+
+        scene = SurfaceAssembly()
+        scene.add_object(Sphere(np.array([ 0., 0., -1.]), 0.5, Lambertian(np.array([0.1, 0.2, 0.5]))))
+        scene.add_object(Sphere(np.array([ 1., 0., -1.]), 0.5, Metal(np.array([0.8, 0.6, 0.2]), 0.3)))
+        scene.add_object(Sphere(np.array([-1., 0., -1.]), 0.5, Dielectric(1.5)))
+        scene.add_object(Sphere(np.array([0., -100.5, -1.]), 100., Lambertian(np.array([0.8, 0.8, 0.0]))))
+
+        im1 = render_image_parallel(nx, ny, 4, scene, cam, tile_size=8, max_workers=1, seed=42)
+        im2 = render_image_parallel(nx, ny, 4, scene, cam, tile_size=8, max_workers=3, seed=42)
+        im3 = render_image_parallel(nx, ny, 4, scene, cam, tile_size=8, max_workers=1, seed=43)
+
+        self.assertEqual(im1.shape, (nx, ny, 3), msg='rendered image must have shape (nx, ny, 3)')
+        self.assertTrue(np.array_equal(im1, im2), msg='rendered image must not depend on number of workers')
+        self.assertFalse(np.array_equal(im1, im3), msg='rendered image must depend on seed')
+
+
+if __name__ == '__main__':
+    unittest.main()
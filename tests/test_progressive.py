@@ -0,0 +1,51 @@
+import unittest
+import os
+import tempfile
+import numpy as np
+import sys
+sys.path.append('../')
+from engine.surface import SurfaceAssembly, Sphere
+from engine.material import Lambertian, Dielectric
+from engine.camera import Camera
+from engine.progressive import ProgressiveRenderer
+
+
+class TestProgressive(unittest.TestCase):
+
+    def test_checkpoint_resume(self):
+
+        nx = 16
+        ny = 8
+        cam = Camera(np.zeros(3), np.array([0., 0., -1.]), np.array([0., 1., 0.]), np.pi/2, nx / ny, 0., 1.)
+
+        scene = SurfaceAssembly()
+        scene.add_object(Sphere(np.array([ 0., 0., -1.]), 0.5, Lambertian(np.array([0.1, 0.2, 0.5]))))
+        scene.add_object(Sphere(np.array([-1., 0., -1.]), 0.5, Dielectric(1.5)))
+        scene.add_object(Sphere(np.array([0., -100.5, -1.]), 100., Lambertian(np.array([0.8, 0.8, 0.0]))))
+
+        # uninterrupted reference rendering
+        ref = ProgressiveRenderer(nx, ny, scene, cam, tile_size=8, seed=42)
+        ref.render(4, samples_per_pass=1)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'checkpoint.npz')
+            renderer = ProgressiveRenderer(nx, ny, scene, cam, tile_size=8, seed=42)
+            renderer.render_pass()
+            renderer.render_pass()
+            renderer.save_checkpoint(path)
+            preview = renderer.preview()
+            self.assertEqual(preview.shape, (nx, ny, 3), msg='preview image must have shape (nx, ny, 3)')
+            del renderer
+            # resume from checkpoint
+            renderer = ProgressiveRenderer.resume(path, scene, cam)
+            self.assertEqual(renderer.passes, 2, msg='number of passes must be restored')
+            self.assertTrue(np.array_equal(renderer.preview(), preview), msg='accumulation buffer must be restored')
+            renderer.render(4, samples_per_pass=1)
+
+        self.assertTrue(np.all(renderer.samples == 4), msg='each pixel must have accumulated the target number of samples')
+        self.assertTrue(np.array_equal(renderer.radiance, ref.radiance),
+            msg='resumed rendering must agree with uninterrupted rendering')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+import numpy as np
+import sys
+sys.path.append('../')
+from engine.surface import SurfaceAssembly, Sphere
+from engine.material import Lambertian, Metal, Dielectric
+from engine.ray import Ray
+from engine.camera import Camera
+from engine.rendering import ray_color, trace_path, render_image
+from engine import sampling
+
+
+class TestRendering(unittest.TestCase):
+
+    def setUp(self):
+        self.scene = SurfaceAssembly()
+        self.scene.add_object(Sphere(np.array([ 0., 0., -1.]), 0.5, Lambertian(np.array([0.8, 0.3, 0.3]))))
+        self.scene.add_object(Sphere(np.array([ 1., 0., -1.]), 0.5, Metal(np.array([0.8, 0.6, 0.2]), 0.5)))
+        self.scene.add_object(Sphere(np.array([-1., 0., -1.]), 0.5, Dielectric(1.5)))
+        self.scene.add_object(Sphere(np.array([0., -100.5, -1.]), 100., Lambertian(np.array([0.8, 0.8, 0.8]))))
+        self.ray = Ray(np.zeros(3), np.array([0.1, -0.2, -1.]))
+
+    def test_trace_path(self):
+
+        sampling.seed(42)
+        col_ref = [ray_color(self.ray, self.scene, 50) for _ in range(20)]
+        sampling.seed(42)
+        col = [trace_path(self.ray, self.scene, 50) for _ in range(20)]
+        self.assertAlmostEqual(np.linalg.norm(np.array(col) - np.array(col_ref)), 0, delta=1e-14,
+            msg='iterative path tracing must agree with recursive ray color')
+
+    def test_russian_roulette(self):
+
+        sampling.seed(42)
+        nsamples = 4000
+        col_ref = np.array([trace_path(self.ray, self.scene, 50) for _ in range(nsamples)])
+        col = np.array([trace_path(self.ray, self.scene, 50, roulette_depth=1) for _ in range(nsamples)])
+        # difference of means must be compatible with statistical fluctuations
+        stderr = np.sqrt((col_ref.var(axis=0) + col.var(axis=0)) / nsamples)
+        self.assertTrue(np.all(np.abs(col.mean(axis=0) - col_ref.mean(axis=0)) < 4*stderr),
+            msg='Russian roulette must not change expected ray color')
+
+    def test_release(self):
+
+        nx = 12
+        ny = 8
+        for aperture in [0., 0.1]:
+            cam = Camera(np.zeros(3), np.array([0., 0., -1.]), np.array([0., 1., 0.]), np.pi/2, nx / ny, aperture, 1.)
+            sampling.seed(42)
+            im_ref = render_image(nx, ny, 2, self.scene, cam)
+            sampling.seed(42)
+            im = render_image(nx, ny, 2, self.scene, cam, backend='release')
+            self.assertTrue(np.array_equal(im, im_ref), msg='release path must agree with default scalar path')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+import numpy as np
+import sys
+sys.path.append('../')
+from engine.surface import SurfaceAssembly, Sphere
+from engine.material import Lambertian
+from engine.camera import Camera
+from engine.wavefront import PackedScene, render_tile, render_image_wavefront
+from engine.samplers import IndependentSampler, StratifiedSampler, HaltonSampler, SobolSampler
+
+
+class TestSamplers(unittest.TestCase):
+
+    def test_samples(self):
+
+        ns = 16
+        pixel = np.repeat(np.arange(20), ns)
+        index = np.tile(np.arange(ns), 20)
+        for sampler in [IndependentSampler(42), StratifiedSampler(ns, 42), HaltonSampler(42), SobolSampler(42)]:
+            name = type(sampler).__name__
+            samples = sampler.tile_samples(0, 4, 0, 5, 5, ns)
+            u = samples.random((3, len(index)))
+            self.assertTrue(np.all((0 <= u) & (u < 1)), msg='{} samples must lie in [0, 1)'.format(name))
+            self.assertEqual(samples.dim, 3, msg='each row must consume one dimension')
+            # subsets of paths must receive the same samples
+            sub = samples.select(slice(5, 37), 1)
+            self.assertTrue(np.array_equal(sub.random(32), u[1, 5:37]), msg='{} samples must not depend on batching'.format(name))
+            if isinstance(sampler, (StratifiedSampler, SobolSampler)):
+                for dim in [0, 6]:
+                    x = sampler.sample(dim, pixel, index)
+                    y = sampler.sample(dim + 1, pixel, index)
+                    cells = (np.floor(4*x)*4 + np.floor(4*y)).reshape((20, ns))
+                    self.assertTrue(all(len(np.unique(c)) == ns for c in cells),
+                        msg='{} samples of each pixel must be stratified'.format(name))
+
+    def test_convergence(self):
+
+        nx = 16
+        ny = 8
+        cam = Camera(np.zeros(3), np.array([0., 0., -1.]), np.array([0., 1., 0.]), np.pi/2, nx / ny, 0., 1.)
+        scene = SurfaceAssembly()
+        scene.add_object(Sphere(np.array([0., 0., -1.]), 0.5, Lambertian(0.5)))
+        scene.add_object(Sphere(np.array([0., -100.5, -1.]), 100., Lambertian(0.5)))
+        packed = PackedScene(scene)
+
+        def radiance(ns, sampler):
+            return render_tile(0, nx, 0, ny, nx, ny, ns, packed, cam, 5, sampler.tile_samples(0, nx, 0, ny, ny, ns))
+
+        ref = radiance(512, SobolSampler(1))
+        err = {}
+        for sampler in [IndependentSampler(42), SobolSampler(42)]:
+            err[type(sampler).__name__] = np.sqrt(np.mean((radiance(16, sampler) - ref)**2))
+        self.assertLess(err['SobolSampler'], 0.8*err['IndependentSampler'],
+            msg='low-discrepancy samples must converge faster than independent samples')
+
+        im1 = render_image_wavefront(nx, ny, 4, scene, cam, tile_size=8, max_depth=5, sampler=HaltonSampler(3))
+        im2 = render_image_wavefront(nx, ny, 4, scene, cam, tile_size=16, max_depth=5, sampler=HaltonSampler(3))
+        self.assertTrue(np.array_equal(im1, im2), msg='rendered image must not depend on the tile size')
+
+
+if __name__ == '__main__':
+    unittest.main()
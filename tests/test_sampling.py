@@ -0,0 +1,47 @@
+import unittest
+import numpy as np
+import sys
+sys.path.append('../')
+from engine import sampling
+
+
+class TestSampling(unittest.TestCase):
+
+    def test_in_unit_sphere(self):
+
+        p = sampling.in_unit_sphere(np.random.default_rng(42), 20000)
+        r = np.linalg.norm(p, axis=1)
+        self.assertEqual(p.shape, (20000, 3), msg='samples must have shape (n, 3)')
+        self.assertTrue(np.all(r < 1), msg='samples must lie within unit sphere')
+        # fraction of points within sphere of radius 1/2 must be 1/8
+        self.assertAlmostEqual(np.mean(r < 0.5), 1/8, delta=0.01, msg='samples must be uniformly distributed')
+        self.assertAlmostEqual(np.linalg.norm(p.mean(axis=0)), 0, delta=0.02, msg='samples must be isotropic')
+
+    def test_in_unit_disk(self):
+
+        p = sampling.in_unit_disk(np.random.default_rng(42), 20000)
+        r = np.linalg.norm(p, axis=1)
+        self.assertEqual(p.shape, (20000, 2), msg='samples must have shape (n, 2)')
+        self.assertTrue(np.all(r < 1), msg='samples must lie within unit disk')
+        # fraction of points within disk of radius 1/2 must be 1/4
+        self.assertAlmostEqual(np.mean(r < 0.5), 1/4, delta=0.01, msg='samples must be uniformly distributed')
+
+    def test_streams(self):
+
+        a = sampling.stream(42, 3).random(10)
+        b = sampling.stream(42, 3).random(10)
+        c = sampling.stream(42, 4).random(10)
+        self.assertTrue(np.array_equal(a, b), msg='streams must be reproducible')
+        self.assertFalse(np.array_equal(a, c), msg='streams with different keys must be independent')
+
+    def test_sample_pool(self):
+
+        pool = sampling.SamplePool(np.random.default_rng(42), size=16)
+        u = np.array([pool.uniform() for _ in range(40)])
+        self.assertEqual(len(np.unique(u)), 40, msg='pool must not hand out a sample twice')
+        self.assertEqual(pool.in_unit_sphere().shape, (3,), msg='single sample must be a point')
+        self.assertEqual(pool.in_unit_disk(100).shape, (100, 2), msg='pool must hand out multiple samples')
+
+
+if __name__ == '__main__':
+    unittest.main()
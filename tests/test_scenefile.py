@@ -0,0 +1,77 @@
+import unittest
+import os
+import pickle
+import tempfile
+import numpy as np
+import sys
+sys.path.append('../')
+from engine.surface import SurfaceAssembly, Sphere
+from engine.material import Lambertian, Metal, Dielectric
+from engine.camera import Camera
+from engine.bvh import BVH
+from engine.wavefront import render_image_wavefront
+from engine.scenefile import save_scene, load_scene, write_scene, material_table
+
+
+class TestSceneFile(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'scene.rts')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_roundtrip(self):
+
+        nx = 16
+        ny = 12
+        cam = Camera(np.zeros(3), np.array([0., 0., -1.]), np.array([0., 1., 0.]), np.pi/2, nx / ny, 0., 1.)
+
+        scene = SurfaceAssembly()
+        scene.add_object(Sphere(np.array([ 0., 0., -1.]), 0.5, Lambertian(np.array([0.1, 0.2, 0.5]))))
+        scene.add_object(Sphere(np.array([ 1., 0., -1.]), 0.5, Metal(np.array([0.8, 0.6, 0.2]), 0.3)))
+        scene.add_object(Sphere(np.array([-1., 0., -1.]), 0.5, Dielectric(1.5)))
+        scene.add_object(Sphere(np.array([0., -100.5, -1.]), 100., Lambertian(0.5)))
+        save_scene(self.path, scene)
+        loaded = load_scene(self.path)
+
+        compiled = scene.compile()
+        self.assertTrue(isinstance(loaded.centers, np.memmap), msg='geometry must be memory-mapped')
+        self.assertTrue(np.array_equal(loaded.centers, compiled.centers))
+        self.assertTrue(np.array_equal(loaded.radii, compiled.radii))
+        self.assertTrue(np.array_equal(loaded.material_index, compiled.material_index))
+        self.assertEqual([type(m) for m in loaded.materials], [type(m) for m in compiled.materials])
+
+        im_ref = render_image_wavefront(nx, ny, 2, compiled, cam, max_depth=5, rng=np.random.default_rng(42))
+        for geometry in [loaded, BVH(loaded), pickle.loads(pickle.dumps(loaded))]:
+            im = render_image_wavefront(nx, ny, 2, geometry, cam, max_depth=5, rng=np.random.default_rng(42))
+            self.assertTrue(np.array_equal(im, im_ref), msg='loaded scene must render identically')
+
+        # pickling must only transfer the file path
+        self.assertLess(len(pickle.dumps(loaded)), 1000)
+
+        table = material_table(compiled.materials)
+        self.assertEqual(list(table['material_type']), [0, 1, 2, 0])
+        self.assertEqual(list(table['fuzz']), [0., 0.3, 0., 0.])
+        self.assertEqual(list(table['ref_idx']), [0., 0., 1.5, 0.])
+
+    def test_write_arrays(self):
+
+        rng = np.random.default_rng(42)
+        n = 1000
+        centers = rng.normal(size=(n, 3))
+        radii = rng.uniform(0.1, 0.2, size=n)
+        material_index = rng.integers(2, size=n)
+        write_scene(self.path, centers, radii, material_index, [Lambertian(np.array([0.5, 0.5, 0.5])), Dielectric(1.5)])
+        loaded = load_scene(self.path)
+        self.assertEqual(len(loaded), n)
+        self.assertTrue(np.array_equal(loaded.centers, centers))
+        self.assertTrue(np.array_equal(loaded.material_index, material_index))
+
+        with self.assertRaises(ValueError):
+            write_scene(self.path, centers, radii, material_index + 1, [Lambertian(0.5), Dielectric(1.5)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import unittest
+import asyncio
+import json
+import numpy as np
+import sys
+sys.path.append('../')
+from engine.surface import SurfaceAssembly, Sphere
+from engine.material import Lambertian, Metal, Dielectric
+from engine.parallel import render_image_parallel
+from engine.service import RenderService, RenderClient, scene_spec, scene_from_spec, camera_from_spec, _render_job_tile_task
+
+
+def make_job(nx, ny, **kwargs):
+    scene = SurfaceAssembly()
+    scene.add_object(Sphere(np.array([ 0.5, 0., -1.]), 0.5, Metal(np.array([0.8, 0.6, 0.2]), 0.3)))
+    scene.add_object(Sphere(np.array([-0.5, 0., -1.]), 0.5, Dielectric(1.5)))
+    scene.add_object(Sphere(np.array([0., -100.5, -1.]), 100., Lambertian(np.array([0.8, 0.8, 0.0]))))
+    camera = {'lookfrom': [0., 0., 0.], 'lookat': [0., 0., -1.], 'vfov': np.pi/2, 'aperture': 0.1, 'focus_dist': 1.}
+    spec = {'nx': nx, 'ny': ny, 'ns': 2, 'scene': scene_spec(scene), 'camera': camera, 'tile_size': 8, 'max_depth': 5, 'seed': 42}
+    spec.update(kwargs)
+    return spec
+
+
+def render_reference(spec):
+    cam = camera_from_spec(spec['camera'], spec['nx'] / spec['ny'])
+    return render_image_parallel(spec['nx'], spec['ny'], spec['ns'], scene_from_spec(spec['scene']), cam,
+                                 tile_size=spec['tile_size'], max_workers=1, seed=spec['seed'], max_depth=spec['max_depth'])
+
+
+class TestService(unittest.IsolatedAsyncioTestCase):
+
+    async def test_render_service(self):
+
+        async with RenderService(max_workers=2) as service:
+            spec = make_job(20, 12)
+            job = service.submit(spec)
+            tiles = []
+            async for tile, pixels in job.stream():
+                self.assertEqual(pixels.shape, (tile[1] - tile[0], tile[3] - tile[2], 3))
+                tiles.append(tile)
+            self.assertEqual(job.status, 'done')
+            self.assertEqual(sorted(tiles), sorted(job.tiles), msg='each tile must be reported once')
+            im = await service.submit(spec).result()
+            self.assertTrue(np.array_equal(im, await asyncio.to_thread(render_reference, spec)),
+                msg='rendered image must agree with render_image_parallel')
+
+            # priorities and cancellation
+            service.lookahead = 1
+            low = service.submit(make_job(32, 32, priority=0))
+            cancelled = service.submit(make_job(32, 32, priority=1))
+            high = service.submit(make_job(8, 8, priority=2))
+            self.assertTrue(service.cancel(cancelled.id))
+            self.assertFalse(service.cancel(cancelled.id))
+            finished = []
+            async def wait(job):
+                await job.result()
+                finished.append(job.id)
+            await asyncio.gather(wait(low), wait(cancelled), wait(high))
+            self.assertEqual(finished, [cancelled.id, high.id, low.id], msg='jobs must be rendered in order of priority')
+            self.assertEqual(cancelled.status, 'cancelled')
+
+            with self.assertRaises(ValueError):
+                service.submit({'nx': 8, 'ny': 8})
+
+    async def test_render_client(self):
+
+        async with RenderService(max_workers=2) as service:
+            server = await service.serve('127.0.0.1', 0)
+            port = server.sockets[0].getsockname()[1]
+            async with server:
+                async with await RenderClient.connect('127.0.0.1', port) as client:
+                    spec = make_job(20, 12)
+                    tiles = []
+                    im = await client.render(spec, on_tile=lambda tile, pixels: tiles.append(tile))
+                    self.assertEqual(len(tiles), 6)
+                    self.assertTrue(np.array_equal(im, await asyncio.to_thread(render_reference, spec)))
+
+                    # concurrent jobs on the same connection
+                    ims = await asyncio.gather(*[client.render(make_job(12, 8, seed=s)) for s in range(3)])
+                    for s, im in enumerate(ims):
+                        self.assertTrue(np.array_equal(im, await asyncio.to_thread(render_reference, make_job(12, 8, seed=s))))
+
+                    # cancellation
+                    task = asyncio.ensure_future(client.render(make_job(64, 64, ns=8), job_id='big'))
+                    await asyncio.sleep(0.1)
+                    await client.cancel('big')
+                    self.assertIsNone(await task)
+
+                    # invalid job
+                    with self.assertRaises(RuntimeError):
+                        await client.render(dict(make_job(8, 8), scene={'materials': [{'type': 'unknown'}]}))
+                    for spec in [make_job(8, 0), make_job(8, 8, ns=2.5), make_job(8, 8, seed=-1), make_job(8, 8, camera=None)]:
+                        with self.assertRaises(RuntimeError):
+                            await client.render(spec)
+
+                # malformed requests are answered with an error, keeping the connection open
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+                for line in [b'[1, 2]', b'"render"', b'{"type": "render", "spec": [1, 2]}', b'not json']:
+                    writer.write(line + b'\n')
+                    await writer.drain()
+                    self.assertEqual(json.loads(await reader.readline())['type'], 'error')
+                writer.close()
+                await writer.wait_closed()
+
+    def test_worker_scene_cache(self):
+
+        spec = make_job(8, 8)
+        args = (spec['camera'], 0, (0, 8, 0, 8), 8, 8, spec['ns'], spec['max_depth'], spec['seed'])
+        # without the scene specification, an unknown scene is requested again
+        self.assertIsNone(_render_job_tile_task('test-scene', None, *args))
+        col = _render_job_tile_task('test-scene', spec['scene'], *args)
+        self.assertEqual(col.shape, (8, 8, 3))
+        # cached scene
+        self.assertTrue(np.array_equal(_render_job_tile_task('test-scene', None, *args), col))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+import os
+import tempfile
+import numpy as np
+import sys
+sys.path.append('../')
+from engine.surface import SurfaceAssembly, Sphere
+from engine.material import Lambertian, Metal
+from engine.camera import Camera
+from engine.sampling import stream
+from engine.wavefront import PackedScene, render_tile, render_image_wavefront
+from engine.streaming import render_image_streaming, tonemap
+
+
+class TestStreaming(unittest.TestCase):
+
+    def setUp(self):
+        self.nx = 24
+        self.ny = 16
+        self.cam = Camera(np.zeros(3), np.array([0., 0., -1.]), np.array([0., 1., 0.]), np.pi/2, self.nx / self.ny, 0., 1.)
+        self.scene = SurfaceAssembly()
+        self.scene.add_object(Sphere(np.array([ 0.5, 0., -1.]), 0.5, Lambertian(np.array([0.1, 0.2, 0.5]))))
+        self.scene.add_object(Sphere(np.array([-1.,  0., -1.]), 0.5, Metal(np.array([0.8, 0.6, 0.2]), 0.3)))
+        self.scene.add_object(Sphere(np.array([0., -100.5, -1.]), 100., Lambertian(np.array([0.8, 0.8, 0.0]))))
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.hdr_path = os.path.join(self.tmpdir.name, 'image.npy')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_single_tile(self):
+
+        hdr = render_image_streaming(self.nx, self.ny, 4, self.scene, self.cam, self.hdr_path,
+                                     tile_size=32, max_depth=5, seed=42)
+        self.assertEqual(hdr.shape, (self.ny, self.nx, 3))
+        self.assertEqual(hdr.dtype, np.float32)
+        col = render_tile(0, self.nx, 0, self.ny, self.nx, self.ny, 4, PackedScene(self.scene), self.cam, 5, stream(42, 0))
+        self.assertTrue(np.allclose(np.load(self.hdr_path), col.transpose((1, 0, 2))[::-1], rtol=1e-6, atol=1e-7),
+            msg='radiance buffer must store rows from top to bottom')
+
+    def test_tiles(self):
+
+        render_image_streaming(self.nx, self.ny, 16, self.scene, self.cam, self.hdr_path,
+                               tile_size=5, max_depth=5, seed=42)
+        im = tonemap(self.hdr_path, chunk_rows=3)
+        out_path = os.path.join(self.tmpdir.name, 'image_ldr.npy')
+        self.assertTrue(np.array_equal(tonemap(self.hdr_path, out_path=out_path), im),
+            msg='memory-mapped output must agree with in-memory output')
+        self.assertTrue(np.array_equal(np.load(out_path), im))
+
+        im_ref = render_image_wavefront(self.nx, self.ny, 16, self.scene, self.cam, max_depth=5,
+                                        rng=np.random.default_rng(42)).transpose((1, 0, 2))
+        self.assertLess(np.mean(np.abs(im.astype(float) - im_ref)), 8,
+            msg='streamed image must agree with wavefront rendering up to noise')
+
+
+if __name__ == '__main__':
+    unittest.main()
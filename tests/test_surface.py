@@ -1,9 +1,11 @@
 import unittest
 import numpy as np
 import sys
-sys.path.append('../engine/')
-from surface import Sphere
-from ray import Ray
+sys.path.append('../')
+from engine.surface import SurfaceAssembly, CompiledSurfaceAssembly, Sphere, Plane, Disk, Box
+from engine.material import Lambertian, Dielectric
+from engine.ray import Ray
+from engine.bvh import BVH
 
 
 class TestSurface(unittest.TestCase):
@@ -24,6 +26,116 @@ class TestSurface(unittest.TestCase):
         self.assertAlmostEqual(abs(np.linalg.norm(rec.point - sphere.center) - sphere.radius), 0, delta=1e-14,
             msg='distance between hit point and sphere center must be equal to sphere radius')
 
+    def test_compiled_assembly_hit(self):
+
+        rng = np.random.default_rng(42)
+
+        scene = SurfaceAssembly()
+        scene.add_object(Sphere(np.array([ 0.,  0.,  -1.]),  0.5,  Lambertian(np.array([0.1, 0.2, 0.5]))))
+        # imitate hollow glass sphere
+        scene.add_object(Sphere(np.array([-1.,  0.,  -1.]),  0.5,  Dielectric(1.5)))
+        scene.add_object(Sphere(np.array([-1.,  0.,  -1.]), -0.45, Dielectric(1.5)))
+        scene.add_object(Sphere(np.array([0., -100.5, -1.]), 100., Lambertian(0.5)))
+        compiled = scene.compile()
+
+        origins = rng.uniform(-1.5, 0.5, size=(100, 3))
+        directions = rng.normal(size=(100, 3))
+        index, t = compiled.hit_batch(origins, directions, 0.001, 1e6)
+
+        for k in range(len(origins)):
+            ray = Ray(origins[k], directions[k])
+            rec_ref, t_ref = scene.hit(ray, 0.001, 1e6)
+            rec, t_single = compiled.hit(ray, 0.001, 1e6)
+            if rec_ref is None:
+                self.assertIsNone(rec, msg='ray must not hit any sphere')
+                self.assertEqual(index[k], -1, msg='ray must not hit any sphere')
+                continue
+            self.assertIs(rec.material, rec_ref.material,
+                msg='closest hit sphere must agree with surface assembly')
+            self.assertIs(scene._objects[index[k]].material, rec_ref.material,
+                msg='closest hit sphere must agree with surface assembly')
+            self.assertAlmostEqual(t_single, t_ref, delta=1e-12,
+                msg='ray parameter must agree with surface assembly')
+            self.assertAlmostEqual(t[k], t_ref, delta=1e-12,
+                msg='ray parameter must agree with surface assembly')
+            self.assertAlmostEqual(np.linalg.norm(rec.normal - rec_ref.normal), 0, delta=1e-12,
+                msg='surface normal must agree with surface assembly')
+
+    def test_plane_disk_box_hit(self):
+
+        plane = Plane(np.array([0., -0.5, 0.]), np.array([0., 2., 0.]), None)
+        disk = Disk(np.array([0., 0., -2.]), np.array([0., 0., 1.]), 0.5, None)
+        box = Box(np.array([-1., -1., -4.]), np.array([1., 1., -3.]), None)
+
+        ray = Ray(np.array([0.1, 0.2, 0.]), np.array([0., -0.1, -1.]))
+        rec, t = plane.hit(ray, 0.001, 1e6)
+        self.assertAlmostEqual(t, 7., delta=1e-12, msg='ray must hit plane at height -0.5')
+        self.assertAlmostEqual(np.linalg.norm(rec.normal - [0., 1., 0.]), 0, delta=1e-14, msg='plane normal must be normalized')
+        rec, t = disk.hit(ray, 0.001, 1e6)
+        self.assertAlmostEqual(t, 2., delta=1e-12)
+        rec, t = box.hit(ray, 0.001, 1e6)
+        self.assertAlmostEqual(t, 3., delta=1e-12, msg='ray must enter box at its front face')
+        self.assertAlmostEqual(np.linalg.norm(rec.normal - [0., 0., 1.]), 0, delta=1e-14)
+        # ray starting inside the box hits its back face
+        rec, t = box.hit(Ray(np.array([0., 0., -3.5]), np.array([0., 0., -1.])), 0.001, 1e6)
+        self.assertAlmostEqual(t, 0.5, delta=1e-12)
+        self.assertAlmostEqual(np.linalg.norm(rec.normal - [0., 0., -1.]), 0, delta=1e-14)
+        # ray passing next to the disk and parallel to the plane
+        self.assertIsNone(disk.hit(Ray(np.array([0.6, 0., 0.]), np.array([0., 0., -1.])), 0.001, 1e6)[0])
+        self.assertIsNone(plane.hit(Ray(np.zeros(3), np.array([1., 0., 0.])), 0.001, 1e6)[0])
+
+    def test_bounding_box(self):
+
+        scene = SurfaceAssembly()
+        scene.add_object(Sphere(np.array([0., 1., 0.]), -0.5, None))
+        scene.add_object(Disk(np.array([2., 0., 0.]), np.array([1., 0., 0.]), 1., None))
+        scene.add_object(Box(np.array([-1., -1., -1.]), np.array([0., 0., 0.]), None))
+        box_min, box_max = scene.bounding_box()
+        self.assertTrue(np.allclose(box_min, [-1., -1., -1.]) and np.allclose(box_max, [2., 1.5, 1.]))
+        for bounds in (scene.compile().bounding_box(), BVH(scene).bounding_box()):
+            self.assertTrue(np.allclose(bounds[0], box_min) and np.allclose(bounds[1], box_max),
+                msg='bounding box must agree with surface assembly')
+        # floor plane is unbounded except along its normal
+        scene.add_object(Plane(np.array([0., -2., 0.]), np.array([0., 1., 0.]), None))
+        box_min, box_max = scene.bounding_box()
+        self.assertTrue(np.array_equal(box_min, [-np.inf, -2., -np.inf]) and np.array_equal(box_max, [np.inf, 1.5, np.inf]))
+        self.assertTrue(np.array_equal(BVH(scene).bounding_box()[0], box_min))
+        # empty box
+        box_min, box_max = SurfaceAssembly().bounding_box()
+        self.assertTrue(np.all(box_min > box_max))
+
+    def test_compiled_primitives_hit(self):
+
+        rng = np.random.default_rng(7)
+
+        scene = SurfaceAssembly()
+        scene.add_object(Plane(np.array([0., -1., 0.]), np.array([0., 1., 0.]), Lambertian(0.5)))
+        for _ in range(5):
+            scene.add_object(Sphere(rng.uniform(-2, 2, size=3), rng.uniform(0.2, 0.5), Lambertian(rng.random(3))))
+        scene.add_object(Disk(np.array([0., 0., -3.]), np.array([0.3, 0., 1.]), 1., Lambertian(rng.random(3))))
+        scene.add_object(Box(np.array([1., -1., -1.]), np.array([2., 0., 0.]), Lambertian(rng.random(3))))
+        compiled = scene.compile()
+        self.assertEqual(len(compiled), 8)
+        # spheres first, followed by the plane, disk and box
+        self.assertEqual(list(compiled.object_index), [5, 0, 1, 2, 3, 4, 6, 7])
+
+        origins = rng.uniform(-1, 1, size=(200, 3)) + np.array([0., 0., 3.])
+        directions = rng.normal(size=(200, 3))
+        index, t = compiled.hit_batch(origins, directions, 0.001, 1e6, chunk_size=64)
+        hit = index >= 0
+        normals = compiled.normals(index[hit], origins[hit] + t[hit, None]*directions[hit])
+        for k, n in zip(np.nonzero(hit)[0], normals):
+            rec_ref, t_ref = scene.hit(Ray(origins[k], directions[k]), 0.001, 1e6)
+            self.assertAlmostEqual(t[k], t_ref, delta=1e-12, msg='ray parameter must agree with surface assembly')
+            self.assertIs(compiled.materials[compiled.material_index[index[k]]], rec_ref.material)
+            self.assertAlmostEqual(np.linalg.norm(n - rec_ref.normal / np.linalg.norm(rec_ref.normal)), 0, delta=1e-12,
+                msg='surface normal must agree with surface assembly')
+        for k in np.nonzero(~hit)[0]:
+            self.assertIsNone(scene.hit(Ray(origins[k], directions[k]), 0.001, 1e6)[0])
+        # nested assemblies cannot be compiled
+        with self.assertRaises(TypeError):
+            CompiledSurfaceAssembly([scene])
+
 
 if __name__ == '__main__':
     unittest.main()
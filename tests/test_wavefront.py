@@ -0,0 +1,99 @@
+import unittest
+import numpy as np
+import sys
+sys.path.append('../')
+from engine.surface import SurfaceAssembly, CompiledSurfaceAssembly, Sphere
+from engine.material import Lambertian, Metal, Dielectric
+from engine.utils import unit_vector
+from engine.camera import Camera
+from engine.bvh import BVH
+from engine.samplers import IndependentSampler
+from engine.wavefront import PackedScene, pack_scene, scatter, render_tile, render_image_wavefront, compiled_geometry
+
+
+class TestWavefront(unittest.TestCase):
+
+    def test_scatter(self):
+
+        rng = np.random.default_rng(42)
+
+        scene = SurfaceAssembly()
+        scene.add_object(Sphere(np.zeros(3), 1., Dielectric(0.2)))
+        scene.add_object(Sphere(np.ones(3),  1., Lambertian(np.array([0.1, 0.2, 0.5]))))
+        scene.add_object(Sphere(np.ones(3),  2., Metal(np.array([0.8, 0.6, 0.2]), 0.)))
+        scene.add_object(Sphere(np.zeros(3), 2., Lambertian(0.5)))
+        packed = PackedScene(scene)
+        self.assertEqual(len(packed.material_types), 3, msg='packed scene must group materials by type')
+
+        # material indices in random order
+        index = rng.integers(4, size=40)
+        # same ray direction and surface normal as in test_material
+        directions = np.tile(np.array([0.1, -0.05, -1.1]), (40, 1))
+        points = rng.normal(size=(40, 3))
+        normals = np.tile(unit_vector(np.array([0.2, 0.9, -0.1])), (40, 1))
+
+        scattered, att, valid = scatter(packed, index, directions, points, normals, rng)
+
+        reflect_ref = np.array([0.054686541501393009, -0.20612619488986597, -0.97699609720757918])
+        refract_ref = np.array([0.22585143494322246,   0.92588833091527412, -0.30285628276298776])
+        for k in range(len(index)):
+            mat = scene._objects[index[k]].material
+            if isinstance(mat, Dielectric):
+                self.assertTrue(valid[k], msg='dielectric material must always scatter')
+                self.assertEqual(np.linalg.norm(att[k] - 1), 0, msg='dielectric material must not attenuate')
+                err = min(np.linalg.norm(scattered[k] - reflect_ref), np.linalg.norm(scattered[k] - refract_ref))
+                self.assertAlmostEqual(err, 0, delta=1e-14, msg='direction of scattered ray must agree with reference')
+            elif isinstance(mat, Metal):
+                self.assertAlmostEqual(np.linalg.norm(unit_vector(scattered[k]) - reflect_ref), 0, delta=1e-14,
+                    msg='metal without fuzziness must reflect ray')
+                self.assertEqual(np.linalg.norm(att[k] - mat._albedo), 0, msg='attenuation must agree with albedo')
+            else:
+                self.assertLess(np.linalg.norm(scattered[k] - normals[k]), 1,
+                    msg='diffuse scattering must be within unit sphere around normal')
+                self.assertEqual(np.linalg.norm(att[k] - mat._albedo), 0, msg='attenuation must agree with albedo')
+
+    def test_single_precision(self):
+
+        scene = SurfaceAssembly()
+        scene.add_object(Sphere(np.array([ 0., 0., -1.]), 0.5, Lambertian(np.array([0.8, 0.3, 0.3]))))
+        scene.add_object(Sphere(np.array([ 1., 0., -1.]), 0.5, Metal(np.array([0.8, 0.6, 0.2]), 0.5)))
+        scene.add_object(Sphere(np.array([-1., 0., -1.]), 0.5, Dielectric(1.5)))
+        scene.add_object(Sphere(np.array([0., -100.5, -1.]), 100., Lambertian(np.array([0.8, 0.8, 0.8]))))
+        nx, ny, ns = 40, 20, 4
+        cam = Camera(np.array([0., 0., 1.]), np.array([0., 0., -1.]), np.array([0., 1., 0.]), np.pi/2, nx / ny, 0.1, 2.)
+
+        for geometry in (scene.compile(), BVH(scene)):
+            packed = PackedScene(geometry, 'float32')
+            self.assertEqual(packed.geometry.dtype, np.float32)
+            self.assertIs(pack_scene(packed), packed)
+            with self.assertRaises(ValueError):
+                pack_scene(packed, 'float64')
+            sampler = IndependentSampler(3)
+            col = render_tile(0, nx, 0, ny, nx, ny, ns, packed, cam, 10, sampler.tile_samples(0, nx, 0, ny, ny, ns))
+            self.assertEqual(col.dtype, np.float32, msg='radiance must be accumulated in single precision')
+            im32 = render_image_wavefront(nx, ny, ns, packed, cam, max_depth=10, sampler=sampler)
+            im64 = render_image_wavefront(nx, ny, ns, geometry, cam, max_depth=10, sampler=sampler)
+            # paths may diverge after rounding, but only for few pixels
+            diff = np.any(im32 != im64, axis=2)
+            self.assertLess(np.count_nonzero(diff), 0.02 * nx*ny,
+                msg='image rendered in single precision must agree with double precision for most pixels')
+
+        # conservative bounds of the converted hierarchy
+        bvh32 = BVH(scene).astype(np.float32)
+        geom32 = bvh32.geometry
+        self.assertTrue(np.all(bvh32.box_min[0] <= geom32.centers - geom32.radii[:, None]))
+        self.assertTrue(np.all(bvh32.box_max[0] >= geom32.centers + geom32.radii[:, None]))
+
+    def test_compiled_geometry(self):
+
+        scene = SurfaceAssembly()
+        scene.add_object(Sphere(np.array([0., 0., -1.]), 0.5, Lambertian(np.array([0.8, 0.3, 0.3]))))
+        compiled = scene.compile()
+        self.assertIsInstance(compiled_geometry(scene), CompiledSurfaceAssembly)
+        bvh = BVH(compiled)
+        for wrapped in (compiled, bvh, PackedScene(compiled), PackedScene(bvh)):
+            self.assertIs(compiled_geometry(wrapped), compiled)
+
+
+if __name__ == '__main__':
+    unittest.main()